@@ -1,8 +1,13 @@
+import json
+from typing import Optional
+
 import typer
 
 from .config import settings
 from .database import Base, SessionLocal, engine
+from .services.audit import ensure_audit_indexes
 from .services.known_tags import persist_db_to_json, sync_json_to_db
+from .services.tag_search import ensure_tag_search
 from .services.users import create_user, ensure_admin_exists
 
 app = typer.Typer(help="nixstrav-mng management CLI")
@@ -11,6 +16,8 @@ app = typer.Typer(help="nixstrav-mng management CLI")
 @app.command("init-db")
 def init_db(create_default_admin: bool = typer.Option(False, help="Create admin:admin if DB empty")):
     Base.metadata.create_all(bind=engine)
+    ensure_audit_indexes(engine)
+    ensure_tag_search(engine)
     session = SessionLocal()
     try:
         sync_json_to_db(session, settings.nixstrav_known_tags_json)
@@ -39,5 +46,58 @@ def cli_create_user(
         session.close()
 
 
+@app.command("events-explain")
+def events_explain(
+    db: Optional[str] = typer.Option(None, help="Database to inspect (default: NIXSTRAV_EVENTS_DB)"),
+    replica: bool = typer.Option(False, help="Inspect EVENTS_REPLICA_DB instead"),
+    as_json: bool = typer.Option(False, "--json", help="Print the full report as JSON"),
+    strict: bool = typer.Option(False, help="Exit with status 1 if any query scans the table"),
+):
+    """
+    Report EXPLAIN QUERY PLAN for every events query and flag full scans.
+    """
+    from .services.events_index import explain_queries
+
+    if replica and not db and not settings.events_replica_db:
+        typer.echo("EVENTS_REPLICA_DB is not set", err=True)
+        raise typer.Exit(code=1)
+    target = db or (settings.events_replica_db if replica else str(settings.nixstrav_events_db))
+    plans = explain_queries(target)
+    if as_json:
+        typer.echo(json.dumps([p.to_dict() for p in plans], indent=2))
+    else:
+        for plan in plans:
+            flag = "FULL SCAN" if plan.full_scan else ("TEMP SORT" if plan.temp_btree else "ok")
+            typer.echo(f"{flag:9}  {plan.name}: {'; '.join(plan.plan)}")
+    scans = sum(1 for p in plans if p.full_scan)
+    typer.echo(f"{len(plans)} queries, {scans} full table scans ({target})", err=True)
+    if strict and scans:
+        raise typer.Exit(code=1)
+
+
+@app.command("events-replica-sync")
+def events_replica_sync(
+    rebuild: bool = typer.Option(False, help="Drop and copy the replica from scratch"),
+):
+    """
+    Build or advance the sidecar indexed replica (EVENTS_REPLICA_DB).
+    """
+    from .services.events_index import sync_replica
+
+    if not settings.events_replica_db:
+        typer.echo("EVENTS_REPLICA_DB is not set", err=True)
+        raise typer.Exit(code=1)
+    result = sync_replica(
+        str(settings.nixstrav_events_db),
+        settings.events_replica_db,
+        batch_size=settings.events_replica_batch_size,
+        rebuild=rebuild,
+    )
+    typer.echo(
+        f"Replica {settings.events_replica_db}: copied {result['copied']} rows, "
+        f"last id {result['last_id']}" + (" (rebuilt)" if result["rebuilt"] else "")
+    )
+
+
 if __name__ == "__main__":
     app()
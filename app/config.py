@@ -25,13 +25,49 @@ class Settings(BaseSettings):
     nixstrav_known_tags_json: Path = Path("data/known_tags.json")
     nixstrav_config_json: Path = Path("data/config.json")
 
+    # mng.db storage profile, applied to every new SQLite connection
+    mng_journal_mode: Literal["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY"] = "WAL"
+    mng_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    mng_busy_timeout_ms: int = 5000
+    mng_cache_size_kib: int = 8192
+    mng_mmap_size: int = 134217728
+    mng_temp_store: Literal["DEFAULT", "FILE", "MEMORY"] = "MEMORY"
+
     # Security / sessions
     session_secret: str = "changeme-session-secret"
     security: SecuritySettings = SecuritySettings()
+    # Authenticated users are cached in memory for this long (0 = off)
+    user_cache_ttl_sec: float = 30.0
+    user_cache_size: int = 256
 
     # CF601
     cf601_mode: Literal["keyboard", "service", "webserial"] = "keyboard"
     cf601d_url: str = "http://127.0.0.1:8888"
+    # Shared keep-alive client for cf601d calls made by the server
+    cf601d_timeout_sec: float = 5.0
+    cf601d_max_connections: int = 4
+    cf601d_retries: int = 2
+    cf601d_retry_backoff_sec: float = 0.1
+    # Fail fast for breaker_reset_sec after this many consecutive failures
+    cf601d_breaker_threshold: int = 5
+    cf601d_breaker_reset_sec: float = 10.0
+    # Server-side enrollment stream (GET /api/v1/cf601/stream); off when the
+    # bridge runs on the operator PC and the server cannot reach it
+    cf601_server_stream: bool = False
+    cf601d_tags_endpoint: str = "/GetTagInfo"
+    enroll_stream_poll_sec: float = 0.3
+    enroll_confirm_reads: int = 3
+    enroll_confirm_window_sec: float = 3.0
+
+    # known_tags.json writes within this window are coalesced (0 = write immediately)
+    known_tags_flush_window_sec: float = 1.0
+    tags_bulk_max_rows: int = 10000
+
+    # Live event tail (SSE/WebSocket): one shared poller per events.db
+    event_stream_poll_sec: float = 1.0
+    event_stream_batch_size: int = 500
+    event_stream_queue_size: int = 500
+    event_stream_keepalive_sec: float = 15.0
 
     # Misc
     debug: bool = False
@@ -41,6 +77,54 @@ class Settings(BaseSettings):
     timezone: str = "UTC"
     reader_warn_sec: int = 90
     reader_offline_sec: int = 300
+    # Per-reader event counters are advanced from events.db at most this often
+    reader_state_refresh_sec: float = 2.0
+    # Per-tag last-seen index (/tags) is advanced from events.db at most this often
+    last_seen_refresh_sec: float = 2.0
+
+    # systemd units probed in the background for /system (comma-separated)
+    service_probe_units: str = "rfid-server.service,nixstrav-mng.service"
+    service_probe_interval_sec: float = 10.0
+    service_probe_history_size: int = 200
+    # "stub" reports every unit active (tests, hosts without systemd)
+    service_probe_backend: Literal["systemctl", "stub"] = "systemctl"
+
+    # Heartbeats are staged in memory and upserted once per window (0 = immediately)
+    heartbeat_flush_window_sec: float = 2.0
+
+    # Audit log: "async" queues entries for a background batch writer,
+    # "sync" commits each entry on the request's session
+    audit_mode: Literal["async", "sync"] = "async"
+    audit_batch_size: int = 200
+    audit_flush_interval_sec: float = 0.5
+    audit_queue_size: int = 10000
+
+    # Worker pools for blocking calls from async handlers
+    blocking_pool_workers: int = 8
+    cpu_pool_workers: int = 2
+
+    # events.db
+    events_count_cache_sec: int = 30
+    # Dashboard panels are rebuilt on new events, or after this long at most
+    dashboard_snapshot_max_age_sec: float = 60.0
+    events_pool_size: int = 4
+    events_cache_size_kib: int = 16384
+    events_mmap_size: int = 268435456
+    events_cached_statements: int = 128
+    rollup_batch_size: int = 50000
+    # Sidecar indexed copy of events.db, read instead of it once synced ("" = off)
+    events_replica_db: str = ""
+    events_replica_sync_sec: float = 5.0
+    events_replica_batch_size: int = 50000
+    # Log EXPLAIN QUERY PLAN full scans for events queries at startup
+    events_plan_check: bool = True
+
+    # Request/query timings at /api/v1/system/metrics (Prometheus text format)
+    metrics_enabled: bool = True
+    # Bearer token for scrapers; without it the endpoint needs a logged-in user
+    metrics_token: str = ""
+    # Queries slower than this are logged with EXPLAIN QUERY PLAN (0 = off)
+    slow_query_ms: float = 200.0
 
 
 @lru_cache()
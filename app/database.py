@@ -1,19 +1,54 @@
 from pathlib import Path
-from typing import Generator
+from typing import Generator, List
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
-from .config import settings
+from .config import Settings, settings
+from .services.metrics import instrument_engine
 
 db_path = settings.mng_db
 db_path.parent.mkdir(parents=True, exist_ok=True)
 
 DATABASE_URL = f"sqlite:///{db_path}"
 
+
+def storage_pragmas(config: Settings) -> List[str]:
+    """
+    PRAGMAs of the mng.db storage profile, in the order they are applied.
+    """
+    return [
+        f"PRAGMA busy_timeout = {int(config.mng_busy_timeout_ms)}",
+        f"PRAGMA journal_mode = {config.mng_journal_mode}",
+        f"PRAGMA synchronous = {config.mng_synchronous}",
+        f"PRAGMA cache_size = {-int(config.mng_cache_size_kib)}",
+        f"PRAGMA mmap_size = {int(config.mng_mmap_size)}",
+        f"PRAGMA temp_store = {config.mng_temp_store}",
+    ]
+
+
+def apply_storage_profile(target: Engine, config: Settings) -> None:
+    """
+    Run the storage profile PRAGMAs on every new DBAPI connection of target.
+    """
+    pragmas = storage_pragmas(config)
+
+    @event.listens_for(target, "connect")
+    def _set_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma).fetchall()
+        finally:
+            cursor.close()
+
+
 engine = create_engine(
     DATABASE_URL, connect_args={"check_same_thread": False}, future=True
 )
+apply_storage_profile(engine, settings)
+instrument_engine(engine)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 Base = declarative_base()
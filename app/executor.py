@@ -0,0 +1,132 @@
+"""
+Bounded thread pools for blocking work called from async route handlers.
+
+All synchronous SQLite/SQLAlchemy access, subprocess calls and file writes go
+through run_blocking; password hashing goes through run_cpu so a burst of
+logins cannot starve regular requests. Each pool tracks queue depth and the
+time tasks spend waiting for a worker.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, TypeVar
+
+from .config import settings
+
+T = TypeVar("T")
+
+
+class BlockingPool:
+    def __init__(self, name: str, max_workers: int) -> None:
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.wait_total_sec = 0.0
+        self.wait_max_sec = 0.0
+        self.run_total_sec = 0.0
+
+    def _on_done(self, future: Future) -> None:
+        if future.cancelled():
+            # Cancelled before a worker picked it up.
+            with self._lock:
+                self.queued -= 1
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        submitted = time.perf_counter()
+
+        def call() -> T:
+            started = time.perf_counter()
+            waited = started - submitted
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self.wait_total_sec += waited
+                self.wait_max_sec = max(self.wait_max_sec, waited)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+                    self.run_total_sec += time.perf_counter() - started
+
+        ctx = contextvars.copy_context()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=f"mng-{self.name}"
+                )
+            executor = self._executor
+            self.queued += 1
+        future = executor.submit(ctx.run, call)
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self.completed
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "queued": self.queued,
+                "active": self.active,
+                "completed": completed,
+                "wait_avg_ms": round(self.wait_total_sec / completed * 1000, 3) if completed else 0.0,
+                "wait_max_ms": round(self.wait_max_sec * 1000, 3),
+                "run_avg_ms": round(self.run_total_sec / completed * 1000, 3) if completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+blocking_pool = BlockingPool("blocking", settings.blocking_pool_workers)
+cpu_pool = BlockingPool("cpu", settings.cpu_pool_workers)
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    return await blocking_pool.run(func, *args, **kwargs)
+
+
+async def run_cpu(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    return await cpu_pool.run(func, *args, **kwargs)
+
+
+async def iterate_blocking(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """
+    Drive a blocking iterator (e.g. a sqlite cursor generator) on the blocking pool.
+    """
+    done = object()
+    try:
+        while True:
+            item = await run_blocking(next, iterator, done)
+            if item is done:
+                break
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            try:
+                close()
+            except ValueError:
+                # Still running in a worker; it is closed when collected.
+                pass
+
+
+def pool_stats() -> list[Dict[str, Any]]:
+    return [blocking_pool.stats(), cpu_pool.stats()]
+
+
+def shutdown_pools() -> None:
+    blocking_pool.shutdown()
+    cpu_pool.shutdown()
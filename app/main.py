@@ -1,3 +1,4 @@
+import threading
 from pathlib import Path
 
 from fastapi import FastAPI, Request
@@ -9,8 +10,21 @@ from fastapi.templating import Jinja2Templates
 
 from .config import settings
 from .database import Base, engine, SessionLocal
+from .executor import shutdown_pools
 from .routers import api, views
-from .services.known_tags import sync_json_to_db
+from .services.alias_generator import alias_allocator
+from .services.audit import audit_writer, ensure_audit_indexes
+from .services.cf601 import cf601_client
+from .services.events_index import ReplicaSyncer, check_query_plans
+from .services.heartbeats import heartbeat_buffer
+from .services.last_seen import reset_last_seen_indexes
+from .services.metrics import MetricsMiddleware
+from .services.reader_state import reset_reader_states
+from .services.rollups import ensure_rollup_state
+from .services.tag_search import ensure_tag_search
+from .services.service_probe import service_prober
+from .services.known_tags import known_tags_persister, sync_json_to_db
+from .services.sqlite_pool import close_all_pools
 from .services.users import ensure_admin_exists
 
 
@@ -18,7 +32,7 @@ Base.metadata.create_all(bind=engine)
 
 app = FastAPI(title="nixstrav-mng", version="0.1.0")
 
-# Order matters (tests expect TrustedHost -> CORS -> Session -> BaseHTTPMiddleware)
+# Order matters (tests expect TrustedHost -> CORS -> Metrics -> Session -> BaseHTTPMiddleware)
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
 
 # LAN-only, but keep a minimal CORS safe baseline
@@ -30,6 +44,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Times everything below it: sessions, CSRF and the route itself.
+app.add_middleware(MetricsMiddleware)
+
 session_https_only = settings.security.session_secure and not settings.dev_insecure_cookies
 
 app.add_middleware(
@@ -55,6 +72,9 @@ app.state.known_tags_path = settings.nixstrav_known_tags_json
 @app.on_event("startup")
 def on_startup() -> None:
     Base.metadata.create_all(bind=engine)
+    ensure_audit_indexes(engine)
+    ensure_tag_search(engine)
+    ensure_rollup_state(engine)
     app.state.events_db_path = settings.nixstrav_events_db
     app.state.known_tags_path = settings.nixstrav_known_tags_json
     session = SessionLocal()
@@ -63,6 +83,48 @@ def on_startup() -> None:
         ensure_admin_exists(session)
     finally:
         session.close()
+    # Rebuilt from the tags table on first allocation.
+    alias_allocator.reset()
+    heartbeat_buffer.reset()
+    reset_reader_states()
+    reset_last_seen_indexes()
+    events_db = str(settings.nixstrav_events_db)
+    app.state.replica_syncer = None
+    if settings.events_replica_db:
+        app.state.replica_syncer = ReplicaSyncer(
+            events_db,
+            settings.events_replica_db,
+            interval=settings.events_replica_sync_sec,
+            batch_size=settings.events_replica_batch_size,
+        )
+        app.state.replica_syncer.start()
+    elif settings.events_plan_check:
+        threading.Thread(
+            target=check_query_plans, args=(events_db,), name="mng-plan-check", daemon=True
+        ).start()
+
+
+@app.on_event("startup")
+async def start_service_probes() -> None:
+    service_prober.reset()
+    service_prober.start()
+
+
+@app.on_event("shutdown")
+async def stop_service_probes() -> None:
+    await service_prober.stop()
+    await cf601_client.aclose()
+
+
+@app.on_event("shutdown")
+def on_shutdown() -> None:
+    known_tags_persister.flush()
+    heartbeat_buffer.flush()
+    audit_writer.stop()
+    if getattr(app.state, "replica_syncer", None) is not None:
+        app.state.replica_syncer.stop()
+    shutdown_pools()
+    close_all_pools()
 
 
 async def add_csrf_token(request: Request, call_next):
@@ -81,7 +143,7 @@ from starlette.middleware.base import BaseHTTPMiddleware
 app.add_middleware(BaseHTTPMiddleware, dispatch=add_csrf_token)
 
 # Starlette stores middleware in reverse order of execution.
-# Tests (and readability) expect: TrustedHost -> CORS -> Session -> BaseHTTPMiddleware
+# Tests (and readability) expect: TrustedHost -> CORS -> Metrics -> Session -> BaseHTTPMiddleware
 app.user_middleware = list(reversed(app.user_middleware))
 app.middleware_stack = app.build_middleware_stack()
 
@@ -2,7 +2,7 @@ import enum
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .database import Base
@@ -42,6 +42,11 @@ class User(Base):
 
 class Tag(Base):
     __tablename__ = "tags"
+    __table_args__ = (
+        Index("ix_tags_status", "status"),
+        Index("ix_tags_alias_group", "alias_group"),
+        Index("ix_tags_room_number", "room_number"),
+    )
 
     epc: Mapped[str] = mapped_column(String(64), primary_key=True)
     alias: Mapped[str] = mapped_column(String(64), nullable=False, unique=True)
@@ -57,6 +62,12 @@ class Tag(Base):
 
 class AuditLog(Base):
     __tablename__ = "audit_log"
+    __table_args__ = (
+        Index("ix_audit_log_ts", "ts"),
+        Index("ix_audit_log_user_ts", "user", "ts"),
+        Index("ix_audit_log_action_ts", "action", "ts"),
+        Index("ix_audit_log_entity", "entity_type", "entity_id", "ts"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     ts: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
@@ -100,3 +111,23 @@ class SystemReader(Base):
     meta_json: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
 
     node: Mapped[Optional[SystemNode]] = relationship("SystemNode", back_populates="readers")
+
+
+class EventRollup(Base):
+    __tablename__ = "event_rollups"
+
+    dimension: Mapped[str] = mapped_column(String(16), primary_key=True)
+    key: Mapped[str] = mapped_column(String(128), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    fired_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_event: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+
+
+class RollupState(Base):
+    __tablename__ = "rollup_state"
+
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)
+    source: Mapped[str] = mapped_column(String(512), nullable=False)
+    source_file: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    last_event_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
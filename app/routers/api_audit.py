@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..executor import run_blocking
+from ..models import User, UserRole
+from ..security import require_role
+from ..services.audit import audit_writer, query_audit
+
+router = APIRouter()
+
+
+async def _current_admin(request: Request, db: Session = Depends(get_db)) -> User:
+    return await require_role(request, UserRole.admin, db)
+
+
+@router.get("")
+async def get_audit(
+    user: User = Depends(_current_admin),
+    db: Session = Depends(get_db),
+    audit_user: Optional[str] = Query(None, alias="user"),
+    action: Optional[str] = None,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[str] = None,
+    from_ts: Optional[datetime] = None,
+    to_ts: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = 50,
+):
+    # Entries still queued for the background writer belong in the result.
+    await run_blocking(audit_writer.flush)
+    return await run_blocking(
+        query_audit,
+        db,
+        user=audit_user,
+        action=action,
+        entity_type=entity_type,
+        entity_id=entity_id,
+        from_ts=from_ts,
+        to_ts=to_ts,
+        before_id=before_id,
+        limit=limit,
+    )
@@ -7,8 +7,9 @@ from sqlalchemy.orm import Session
 
 from ..config import settings
 from ..database import get_db
+from ..executor import run_blocking, run_cpu
 from ..models import User, UserRole
-from ..security import get_or_create_csrf, login_limiter
+from ..security import get_or_create_csrf, login_limiter, user_cache
 from ..services import audit
 from ..services.users import authenticate_user, get_user_by_username
 
@@ -47,15 +48,17 @@ async def login(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Account locked due to failed attempts. Try later.",
         )
-    user = authenticate_user(db, username, payload.password)
+    user = await run_cpu(authenticate_user, db, username, payload.password)
     if not user:
         login_limiter.register_failure(username, ip)
-        audit.log_action(db, user=None, action="login_failed", entity_id=username, ip=ip)
+        await run_blocking(
+            audit.log_action, db, user=None, action="login_failed", entity_id=username, ip=ip
+        )
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
     login_limiter.register_success(username, ip)
     _session_login(request, user)
-    audit.log_action(db, user, action="login", entity_id=user.username, ip=ip)
+    await run_blocking(audit.log_action, db, user, action="login", entity_id=user.username, ip=ip)
     return UserResponse(
         username=user.username,
         role=user.role,
@@ -68,11 +71,14 @@ async def login(
 async def logout(request: Request, db: Session = Depends(get_db)):
     user: Optional[User] = None
     if request.session.get("user_id"):
-        user = db.get(User, int(request.session["user_id"]))
+        user = await run_blocking(db.get, User, int(request.session["user_id"]))
+        user_cache.invalidate(int(request.session["user_id"]))
     request.session.clear()
     if settings.security.session_secure:
         request.session["__deleted"] = True
-    audit.log_action(db, user, action="logout", entity_id=user.username if user else None)
+    await run_blocking(
+        audit.log_action, db, user, action="logout", entity_id=user.username if user else None
+    )
     return {"status": "ok"}
 
 
@@ -81,7 +87,7 @@ async def me(request: Request, db: Session = Depends(get_db)):
     user_id = request.session.get("user_id")
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
-    user = db.get(User, int(user_id))
+    user = await run_blocking(db.get, User, int(user_id))
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
     return UserResponse(
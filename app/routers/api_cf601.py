@@ -1,4 +1,8 @@
+from typing import Any, Awaitable, Dict
+
+import httpx
 from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
@@ -7,6 +11,7 @@ from ..database import get_db
 from ..models import User, UserRole
 from ..security import csrf_protect, require_role
 from ..services import cf601
+from ..services.tag_reads import tag_read_events, tag_read_stream
 
 router = APIRouter()
 
@@ -19,11 +24,20 @@ class PortPayload(BaseModel):
     port: str
 
 
+async def _call(request: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+    try:
+        return await request
+    except cf601.Cf601Unavailable as exc:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc))
+    except httpx.HTTPError as exc:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"cf601d error: {exc}")
+
+
 @router.post("/getPorts")
 async def get_ports(user: User = Depends(_current_operator)):
     if settings.cf601_mode != "service":
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="CF601 not in service mode")
-    return await cf601.get_ports()
+    return await _call(cf601.get_ports())
 
 
 @router.post("/OpenDevice")
@@ -34,7 +48,7 @@ async def open_device(
 ):
     if settings.cf601_mode != "service":
         raise HTTPException(status_code=400, detail="CF601 not in service mode")
-    return await cf601.open_device(payload.port)
+    return await _call(cf601.open_device(payload.port))
 
 
 @router.post("/CloseDevice")
@@ -44,14 +58,14 @@ async def close_device(
 ):
     if settings.cf601_mode != "service":
         raise HTTPException(status_code=400, detail="CF601 not in service mode")
-    return await cf601.close_device()
+    return await _call(cf601.close_device())
 
 
 @router.post("/GetDevicePara")
 async def get_device_para(user: User = Depends(_current_operator)):
     if settings.cf601_mode != "service":
         raise HTTPException(status_code=400, detail="CF601 not in service mode")
-    return await cf601.get_device_params()
+    return await _call(cf601.get_device_params())
 
 
 @router.post("/StartCounting")
@@ -61,14 +75,14 @@ async def start_counting(
 ):
     if settings.cf601_mode != "service":
         raise HTTPException(status_code=400, detail="CF601 not in service mode")
-    return await cf601.start_counting()
+    return await _call(cf601.start_counting())
 
 
 @router.post("/GetTagInfo")
 async def get_tag_info(user: User = Depends(_current_operator)):
     if settings.cf601_mode != "service":
         raise HTTPException(status_code=400, detail="CF601 not in service mode")
-    return await cf601.get_tag_info()
+    return await _call(cf601.get_tag_info())
 
 
 @router.post("/InventoryStop")
@@ -78,4 +92,26 @@ async def inventory_stop(
 ):
     if settings.cf601_mode != "service":
         raise HTTPException(status_code=400, detail="CF601 not in service mode")
-    return await cf601.inventory_stop()
+    return await _call(cf601.inventory_stop())
+
+
+@router.get("/stats")
+async def client_stats(user: User = Depends(_current_operator)):
+    return cf601.cf601_client.stats()
+
+
+@router.get("/stream")
+async def tag_stream(user: User = Depends(_current_operator)):
+    """
+    Server-sent events with aggregated tag reads: "tags" carries EPCs whose
+    state (pending/confirmed/lost) or counters changed, "status" reports
+    whether cf601d is reachable.
+    """
+    if settings.cf601_mode != "service" or not settings.cf601_server_stream:
+        raise HTTPException(status_code=400, detail="CF601 server stream disabled")
+    queue = tag_read_stream.subscribe()
+    return StreamingResponse(
+        tag_read_events(tag_read_stream, queue, settings.event_stream_keepalive_sec),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,23 +1,26 @@
-import csv
-import io
+import asyncio
 from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, WebSocket
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.requests import HTTPConnection
+from starlette.websockets import WebSocketDisconnect
 
 from ..config import settings
-from ..database import get_db
+from ..database import SessionLocal, get_db
+from ..executor import iterate_blocking, run_blocking
 from ..models import User
-from ..security import require_user
-from ..services.events import (
-    EventFilters,
-    events_per_day,
-    events_per_hour,
-    export_events,
-    list_events,
-    top_readers,
-    top_reasons,
-    unknown_tags,
+from ..security import cached_session_user, get_session_user, require_user
+from ..services.event_export import EXPORT_FORMATS, encode_events
+from ..services.event_stream import backlog_for, get_broadcaster, sse_events
+from ..services.events import EventFilters, export_events, list_events, unknown_tags
+from ..services.rollups import (
+    refresh_rollups,
+    rollup_events_per_day,
+    rollup_events_per_hour,
+    rollup_top_readers,
+    rollup_top_reasons,
 )
 
 router = APIRouter()
@@ -38,7 +41,9 @@ async def get_events(
     tag: Optional[str] = None,
     page: int = 1,
     page_size: int = 50,
+    cursor: Optional[str] = None,
     export: Optional[str] = None,
+    gzip: bool = False,
 ):
     filters = EventFilters(
         from_ts=from_ts,
@@ -48,55 +53,161 @@ async def get_events(
         tag=tag,
         page=page,
         page_size=page_size,
+        cursor=cursor,
     )
     events_db = str(request.app.state.events_db_path)
     if export:
-        data = export_events(events_db, filters)
-        if export == "csv":
-            buf = io.StringIO()
-            writer = csv.DictWriter(
-                buf,
-                fieldnames=[
-                    "id",
-                    "reader_id",
-                    "tag",
-                    "ts_client",
-                    "received_at",
-                    "source_ip",
-                    "fired",
-                    "reason",
-                ],
-            )
-            writer.writeheader()
-            writer.writerows(data)
-            return Response(
-                content=buf.getvalue(),
-                media_type="text/csv",
-                headers={"Content-Disposition": "attachment; filename=events.csv"},
-            )
-        return data
-    items, total = list_events(events_db, filters)
-    return {"items": items, "total": total}
+        fmt = export if export in EXPORT_FORMATS else "json"
+        media_type, ext = EXPORT_FORMATS[fmt]
+        filename = f"events.{ext}"
+        headers = {}
+        if gzip:
+            media_type = "application/gzip"
+            filename += ".gz"
+        if fmt != "json" or gzip:
+            headers["Content-Disposition"] = f"attachment; filename={filename}"
+        return StreamingResponse(
+            iterate_blocking(encode_events(export_events(events_db, filters), fmt, gzip=gzip)),
+            media_type=media_type,
+            headers=headers,
+        )
+    try:
+        result = await run_blocking(list_events, events_db, filters)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {
+        "items": result.items,
+        "total": result.total,
+        "next_cursor": result.next_cursor,
+        "prev_cursor": result.prev_cursor,
+    }
 
 
-@router.get("/stats/overview")
-async def stats_overview(request: Request, user: User = Depends(_current_viewer)):
-    events_db = str(request.app.state.events_db_path)
+def _overview(db: Session) -> Dict[str, Any]:
     return {
-        "events_per_day": events_per_day(events_db),
-        "events_per_hour": events_per_hour(events_db),
-        "top_reasons": top_reasons(events_db),
-        "top_readers": top_readers(events_db),
+        "events_per_day": rollup_events_per_day(db),
+        "events_per_hour": rollup_events_per_hour(db),
+        "top_reasons": rollup_top_reasons(db),
+        "top_readers": rollup_top_readers(db),
     }
 
 
+@router.get("/stats/overview")
+async def stats_overview(
+    request: Request,
+    db: Session = Depends(get_db),
+    user: User = Depends(_current_viewer),
+):
+    events_db = str(request.app.state.events_db_path)
+    await run_blocking(refresh_rollups, db, events_db)
+    return await run_blocking(_overview, db)
+
+
 @router.get("/stats/unknown-tags")
 async def stats_unknown_tags(request: Request, user: User = Depends(_current_viewer)):
     events_db = str(request.app.state.events_db_path)
-    return unknown_tags(events_db)
+    return await run_blocking(unknown_tags, events_db)
 
 
 @router.get("/stats/readers")
-async def stats_readers(request: Request, user: User = Depends(_current_viewer)):
+async def stats_readers(
+    request: Request,
+    db: Session = Depends(get_db),
+    user: User = Depends(_current_viewer),
+):
     events_db = str(request.app.state.events_db_path)
-    return top_readers(events_db, limit=20)
+    await run_blocking(refresh_rollups, db, events_db)
+    return await run_blocking(rollup_top_readers, db, limit=20)
+
+
+def _session_user(conn: HTTPConnection) -> Optional[User]:
+    user = cached_session_user(conn)
+    if user is not None:
+        return user if user.is_active else None
+    # Long-lived streams must not hold a mng.db session open.
+    db = SessionLocal()
+    try:
+        user = get_session_user(conn, db)
+        return user if user and user.is_active else None
+    finally:
+        db.close()
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    reader_id: Optional[str] = None,
+    reason: Optional[str] = None,
+    tag: Optional[str] = None,
+    last_event_id: Optional[int] = Header(None),
+):
+    """
+    Server-Sent Events tail of new events, optionally filtered. Browsers
+    resume from Last-Event-ID after a reconnect; a "reset" event means
+    events were missed (events.db replaced, or too many to replay) and the
+    page should reload.
+    """
+    if not await run_blocking(_session_user, request):
+        raise HTTPException(status_code=401)
+    broadcaster = get_broadcaster(str(request.app.state.events_db_path))
+    sub = broadcaster.subscribe(reader_id=reader_id, reason=reason, tag=tag)
+    backlog = []
+    if last_event_id is not None:
+        backlog = await backlog_for(broadcaster, sub, last_event_id)
+    return StreamingResponse(
+        sse_events(broadcaster, sub, backlog, settings.event_stream_keepalive_sec),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stream/stats")
+async def stream_stats(request: Request, user: User = Depends(_current_viewer)):
+    return get_broadcaster(str(request.app.state.events_db_path)).stats()
+
+
+async def _wait_disconnect(websocket: WebSocket) -> None:
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+@router.websocket("/ws")
+async def events_ws(
+    websocket: WebSocket,
+    reader_id: Optional[str] = None,
+    reason: Optional[str] = None,
+    tag: Optional[str] = None,
+):
+    """
+    WebSocket variant of /stream: sends {"type": "event", "event": {...}},
+    {"type": "lagged", "dropped": n} and {"type": "reset", "reason": ...}
+    messages.
+    """
+    if not await run_blocking(_session_user, websocket):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    broadcaster = get_broadcaster(str(websocket.app.state.events_db_path))
+    sub = broadcaster.subscribe(reader_id=reader_id, reason=reason, tag=tag)
+    disconnected = asyncio.ensure_future(_wait_disconnect(websocket))
+    try:
+        while True:
+            dropped = sub.take_dropped()
+            if dropped:
+                await websocket.send_json({"type": "lagged", "dropped": dropped})
+            getter = asyncio.ensure_future(sub.queue.get())
+            await asyncio.wait({getter, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                getter.cancel()
+                break
+            reset = sub.take_reset()
+            if reset:
+                await websocket.send_json({"type": "reset", "reason": reset})
+            await websocket.send_json({"type": "event", "event": getter.result()})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        broadcaster.unsubscribe(sub)
+        disconnected.cancel()
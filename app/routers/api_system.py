@@ -1,15 +1,26 @@
-import json
+import secrets
 from datetime import datetime
 from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Request, Response
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
+from ..config import settings
 from ..database import get_db
-from ..models import SystemNode, SystemReader, User
+from ..executor import pool_stats, run_blocking
+from ..models import User
 from ..security import require_user
-from ..services.system_status import check_service_status, problems, reader_status_heuristic
+from ..services.audit import audit_writer
+from ..services.cf601 import cf601_client
+from ..services.dashboard import dashboard_cache
+from ..services.events import replica_for
+from ..services.events_index import explain_queries
+from ..services.heartbeats import heartbeat_buffer
+from ..services.known_tags import known_tags_persister
+from ..services.metrics import CONTENT_TYPE, Family, registry
+from ..services.service_probe import service_prober
+from ..services.system_status import problems, reader_status
 
 router = APIRouter()
 
@@ -40,47 +51,113 @@ class HeartbeatPayload(BaseModel):
 
 @router.get("/services")
 async def services_status(request: Request, user: User = Depends(_current_viewer)):
-    services = [
-        check_service_status("rfid-server.service"),
-        check_service_status("nixstrav-mng.service"),
-    ]
-    return services
+    return await service_prober.statuses()
+
+
+@router.get("/services/history")
+async def services_history(
+    request: Request, limit: int = 50, user: User = Depends(_current_viewer)
+):
+    return service_prober.transitions(limit=max(1, min(limit, 500)))
 
 
 @router.get("/readers")
 async def readers_status(request: Request, user: User = Depends(_current_viewer)):
     events_db = str(request.app.state.events_db_path)
-    return reader_status_heuristic(events_db)
+    heartbeats = await run_blocking(heartbeat_buffer.readers)
+    return await run_blocking(reader_status, events_db, heartbeats)
+
+
+@router.get("/nodes")
+async def nodes_status(user: User = Depends(_current_viewer)):
+    return await run_blocking(heartbeat_buffer.nodes)
 
 
 @router.get("/problems")
 async def problems_view(request: Request, user: User = Depends(_current_viewer)):
     events_db = str(request.app.state.events_db_path)
-    return problems(events_db)
+    return await run_blocking(problems, events_db)
+
+
+@router.get("/executor")
+async def executor_status(user: User = Depends(_current_viewer)):
+    return pool_stats()
+
+
+@router.get("/events-plan")
+async def events_plan(request: Request, user: User = Depends(_current_viewer)):
+    """
+    EXPLAIN QUERY PLAN for the events queries on the database actually read
+    (the sidecar replica when active), plus replica sync status.
+    """
+    events_db = str(request.app.state.events_db_path)
+    target = replica_for(events_db) or events_db
+    plans = await run_blocking(explain_queries, target)
+    syncer = getattr(request.app.state, "replica_syncer", None)
+    return {
+        "database": target,
+        "full_scans": sum(1 for p in plans if p.full_scan),
+        "queries": [p.to_dict() for p in plans],
+        "replica": syncer.stats() if syncer is not None else None,
+    }
+
+
+def _service_metrics() -> List[Family]:
+    """
+    Counters the services already keep, read at scrape time.
+    """
+    cf601 = cf601_client.stats()
+    endpoints = cf601["endpoints"].items()
+    pools = pool_stats()
+    audit = audit_writer.stats()
+    dashboard = dashboard_cache.stats()
+    return [
+        ("nixstrav_cf601d_calls_total", "counter", "cf601d calls by endpoint.",
+         [({"endpoint": name}, s["calls"]) for name, s in endpoints]),
+        ("nixstrav_cf601d_errors_total", "counter", "Failed cf601d calls by endpoint.",
+         [({"endpoint": name}, s["errors"]) for name, s in endpoints]),
+        ("nixstrav_cf601d_retries_total", "counter", "cf601d retries by endpoint.",
+         [({"endpoint": name}, s["retries"]) for name, s in endpoints]),
+        ("nixstrav_cf601d_circuit_open", "gauge", "1 while the cf601d circuit breaker is open or half-open.",
+         [({}, 0 if cf601["circuit"] == "closed" else 1)]),
+        ("nixstrav_known_tags_writes_total", "counter", "known_tags.json rewrites.",
+         [({}, known_tags_persister.writes)]),
+        ("nixstrav_executor_queued", "gauge", "Calls waiting for a worker.",
+         [({"pool": p["name"]}, p["queued"]) for p in pools]),
+        ("nixstrav_executor_active", "gauge", "Calls running on a worker.",
+         [({"pool": p["name"]}, p["active"]) for p in pools]),
+        ("nixstrav_executor_completed_total", "counter", "Calls completed.",
+         [({"pool": p["name"]}, p["completed"]) for p in pools]),
+        ("nixstrav_audit_pending", "gauge", "Audit entries queued for the writer.",
+         [({}, audit["pending"])]),
+        ("nixstrav_audit_written_total", "counter", "Audit entries written.",
+         [({}, audit["written"])]),
+        ("nixstrav_audit_errors_total", "counter", "Failed audit batches.",
+         [({}, audit["errors"])]),
+        ("nixstrav_audit_dropped_total", "counter", "Audit entries dropped after a row-by-row retry.",
+         [({}, audit["dropped"])]),
+        ("nixstrav_dashboard_cache_hits_total", "counter", "Dashboard snapshots served from cache.",
+         [({}, dashboard["hits"])]),
+        ("nixstrav_dashboard_cache_builds_total", "counter", "Dashboard snapshots built.",
+         [({}, dashboard["builds"])]),
+    ]
+
+
+@router.get("/metrics")
+async def metrics(request: Request, db: Session = Depends(get_db)):
+    """
+    Prometheus text format. Scrapers send METRICS_TOKEN as a bearer token;
+    otherwise a logged-in user is required.
+    """
+    token = settings.metrics_token
+    authorization = request.headers.get("authorization", "")
+    if not (token and secrets.compare_digest(authorization, f"Bearer {token}")):
+        await require_user(request, db)
+    body = registry.render(_service_metrics())
+    return Response(content=body, media_type=CONTENT_TYPE)
 
 
 @router.post("/heartbeat")
-async def heartbeat(
-    payload: HeartbeatPayload,
-    request: Request,
-    db: Session = Depends(get_db),
-):
-    node = db.get(SystemNode, payload.node_id) or SystemNode(node_id=payload.node_id)
-    node.hostname = payload.hostname
-    node.ip = payload.ip
-    node.last_seen = datetime.utcnow()
-    node.meta_json = json.dumps(payload.meta) if payload.meta else node.meta_json
-    db.add(node)
-    db.commit()
-
-    for reader in payload.readers:
-        r = db.get(SystemReader, reader.reader_id) or SystemReader(reader_id=reader.reader_id)
-        r.node_id = payload.node_id
-        r.type = reader.type or r.type
-        r.conn = reader.conn or r.conn
-        r.last_seen = datetime.utcnow()
-        r.last_read_at = reader.last_read_at or r.last_read_at
-        r.meta_json = json.dumps(reader.meta) if reader.meta else r.meta_json
-        db.add(r)
-    db.commit()
+async def heartbeat(payload: HeartbeatPayload):
+    await run_blocking(heartbeat_buffer.record, payload.dict())
     return {"status": "ok"}
@@ -1,19 +1,23 @@
-from typing import List, Optional
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from pydantic import BaseModel, Field
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from ..config import settings
 from ..database import get_db
+from ..executor import run_blocking
 from ..models import Tag, User, UserRole
 from ..security import csrf_protect, require_user, require_role
 from ..services import audit
-from ..services.alias_generator import generate_alias
+from ..services.alias_generator import alias_allocator
 from ..services.epc import normalize_epc
-from ..services.events import last_seen_for_tags
-from ..services.known_tags import persist_db_to_json
+from ..services.last_seen import get_last_seen_index
+from ..services.known_tags import known_tags_persister
+from ..services.tag_import import BulkPayloadError, import_tags, parse_bulk_payload
+from ..services.tag_search import TagFilters, TagPage, search_tags
 
 router = APIRouter()
 
@@ -37,6 +41,7 @@ class TagUpdate(TagBase):
 class TagResponse(TagBase):
     epc: str
     last_seen: Optional[str] = None
+    last_reader_id: Optional[str] = None
 
     class Config:
         orm_mode = True
@@ -52,31 +57,74 @@ async def _current_viewer(request: Request, db: Session = Depends(get_db)) -> Us
     return await require_user(request, db)
 
 
+def _tag_response(tag: Tag, seen: Optional[Dict[str, Any]] = None) -> TagResponse:
+    return TagResponse(
+        epc=tag.epc,
+        alias=tag.alias,
+        alias_group=tag.alias_group,
+        room_number=tag.room_number,
+        notes=tag.notes,
+        status=tag.status,
+        last_seen=seen["last_seen"] if seen else None,
+        last_reader_id=seen["reader_id"] if seen else None,
+    )
+
+
+def _alias_taken(db: Session, alias: str) -> bool:
+    return db.scalar(select(Tag.epc).where(Tag.alias == alias)) is not None
+
+
 @router.get("", response_model=List[TagResponse])
 async def list_tags(
     request: Request,
+    response: Response,
+    q: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    alias_group: Optional[str] = None,
+    room_number: Optional[str] = None,
+    sort: str = "alias",
+    order: str = "asc",
+    page: Optional[int] = None,
+    page_size: Optional[int] = None,
     db: Session = Depends(get_db),
     user: User = Depends(_current_viewer),
 ):
-    tags = db.scalars(select(Tag)).all()
+    """
+    Tags matching the filters. Without page or page_size every match is
+    returned, as before pagination existed; with either, one page (50 tags
+    by default) and a Link rel="next" header while more pages follow.
+    X-Total-Count is always the number of matches.
+    """
+    if page is not None and page_size is None:
+        page_size = TagFilters.page_size
+    filters = TagFilters(
+        q=q,
+        status=status_filter,
+        alias_group=alias_group,
+        room_number=room_number,
+        sort=sort,
+        order=order,
+        page=page or 1,
+        page_size=page_size,
+    )
     events_db = str(
         getattr(request.app.state, "events_db_path", None) or settings.nixstrav_events_db
     )
-    last_seen_map = last_seen_for_tags(events_db, tags=[t.epc for t in tags])
-    response = []
-    for tag in tags:
-        response.append(
-            TagResponse(
-                epc=tag.epc,
-                alias=tag.alias,
-                alias_group=tag.alias_group,
-                room_number=tag.room_number,
-                notes=tag.notes,
-                status=tag.status,
-                last_seen=last_seen_map.get(tag.epc),
-            )
-        )
-    return response
+    try:
+        items, result = await run_blocking(_list_tags, db, filters, events_db)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    response.headers["X-Total-Count"] = str(result.total)
+    if result.page_size is not None and result.page < result.pages:
+        next_url = request.url.include_query_params(page=result.page + 1, page_size=result.page_size)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return items
+
+
+def _list_tags(db: Session, filters: TagFilters, events_db: str) -> Tuple[List[TagResponse], TagPage]:
+    result = search_tags(db, filters)
+    seen = get_last_seen_index(events_db).lookup([t.epc for t in result.items])
+    return [_tag_response(tag, seen.get(tag.epc)) for tag in result.items], result
 
 
 @router.get("/alias-suggest")
@@ -85,8 +133,7 @@ async def suggest_alias(
     db: Session = Depends(get_db),
     user: User = Depends(_current_operator),
 ):
-    existing_aliases = [a for (a,) in db.query(Tag.alias).all()]
-    alias = generate_alias(group or "male_tree", existing_aliases)
+    alias = await run_blocking(alias_allocator.suggest, db, group)
     return {"alias": alias}
 
 
@@ -101,15 +148,21 @@ async def create_tag(
     canonical_epc = normalize_epc(payload.epc)
     if not canonical_epc:
         raise HTTPException(status_code=400, detail="Invalid EPC")
-    existing_aliases = [a for (a,) in db.query(Tag.alias).all()]
-    alias_group_value = payload.alias_group or "male_tree"
-    alias = payload.alias or generate_alias(alias_group_value, existing_aliases)
-    if alias in existing_aliases:
+    return await run_blocking(
+        _create_tag, db, user, canonical_epc, payload, request.app.state.known_tags_path
+    )
+
+
+def _create_tag(
+    db: Session, user: User, canonical_epc: str, payload: TagCreate, known_tags_path: Path
+) -> TagResponse:
+    if payload.alias and _alias_taken(db, payload.alias):
         raise HTTPException(status_code=400, detail="Alias already exists")
 
     if db.get(Tag, canonical_epc):
         raise HTTPException(status_code=400, detail="Tag already exists")
 
+    alias = payload.alias or alias_allocator.allocate(db, payload.alias_group)
     tag = Tag(
         epc=canonical_epc,
         alias=alias,
@@ -119,18 +172,68 @@ async def create_tag(
         status=payload.status,
     )
     db.add(tag)
-    db.commit()
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        if not payload.alias:
+            alias_allocator.release(alias)
+        raise
+    alias_allocator.claim(alias)
     db.refresh(tag)
-    persist_db_to_json(db, request.app.state.known_tags_path)
+    known_tags_persister.schedule(known_tags_path)
+    response = _tag_response(tag)
     audit.log_action(db, user, "tag_create", entity_type="tag", entity_id=tag.epc, after=payload.dict())
-    return TagResponse(
-        epc=tag.epc,
-        alias=tag.alias,
-        alias_group=tag.alias_group,
-        room_number=tag.room_number,
-        notes=tag.notes,
-        status=tag.status,
+    return response
+
+
+def _bulk_import(
+    db: Session,
+    user: User,
+    rows: List[Dict[str, Any]],
+    upsert: bool,
+    dry_run: bool,
+    known_tags_path: Path,
+) -> List[Dict[str, Any]]:
+    results = import_tags(db, user, rows, upsert=upsert, dry_run=dry_run)
+    if not dry_run and any(r["status"] in ("created", "updated") for r in results):
+        known_tags_persister.schedule(known_tags_path)
+        known_tags_persister.flush()
+    return results
+
+
+@router.post("/bulk")
+async def bulk_import(
+    request: Request,
+    upsert: bool = False,
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    user: User = Depends(_current_operator),
+    _: None = Depends(csrf_protect),
+):
+    body = (await request.body()).decode("utf-8-sig", errors="replace")
+    try:
+        rows = parse_bulk_payload(
+            body, request.headers.get("content-type", ""), settings.tags_bulk_max_rows
+        )
+    except BulkPayloadError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    results = await run_blocking(
+        _bulk_import, db, user, rows, upsert, dry_run, request.app.state.known_tags_path
     )
+    summary = {"created": 0, "updated": 0, "unchanged": 0, "error": 0}
+    for r in results:
+        summary[r["status"]] += 1
+    return {**summary, "dry_run": dry_run, "results": results}
+
+
+@router.post("/flush")
+async def flush_known_tags(
+    user: User = Depends(_current_operator),
+    _: None = Depends(csrf_protect),
+):
+    written = await run_blocking(known_tags_persister.flush)
+    return {"status": "ok", "written": written}
 
 
 @router.get("/{epc}", response_model=TagResponse)
@@ -141,22 +244,18 @@ async def get_tag(
     user: User = Depends(_current_viewer),
 ):
     canonical_epc = normalize_epc(epc) or epc
-    tag = db.get(Tag, canonical_epc)
-    if not tag:
-        raise HTTPException(status_code=404, detail="Tag not found")
     events_db = str(
         getattr(request.app.state, "events_db_path", None) or settings.nixstrav_events_db
     )
-    last_seen_map = last_seen_for_tags(events_db, tags=[tag.epc])
-    return TagResponse(
-        epc=tag.epc,
-        alias=tag.alias,
-        alias_group=tag.alias_group,
-        room_number=tag.room_number,
-        notes=tag.notes,
-        status=tag.status,
-        last_seen=last_seen_map.get(tag.epc),
-    )
+    return await run_blocking(_get_tag, db, canonical_epc, events_db)
+
+
+def _get_tag(db: Session, epc: str, events_db: str) -> TagResponse:
+    tag = db.get(Tag, epc)
+    if not tag:
+        raise HTTPException(status_code=404, detail="Tag not found")
+    seen = get_last_seen_index(events_db).lookup([tag.epc])
+    return _tag_response(tag, seen.get(tag.epc))
 
 
 @router.put("/{epc}", response_model=TagResponse)
@@ -169,7 +268,15 @@ async def update_tag(
     _: None = Depends(csrf_protect),
 ):
     canonical_epc = normalize_epc(epc) or epc
-    tag = db.get(Tag, canonical_epc)
+    return await run_blocking(
+        _update_tag, db, user, canonical_epc, payload, request.app.state.known_tags_path
+    )
+
+
+def _update_tag(
+    db: Session, user: User, epc: str, payload: TagUpdate, known_tags_path: Path
+) -> TagResponse:
+    tag = db.get(Tag, epc)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
     before = {
@@ -197,7 +304,9 @@ async def update_tag(
     db.add(tag)
     db.commit()
     db.refresh(tag)
-    persist_db_to_json(db, request.app.state.known_tags_path)
+    alias_allocator.rename(before["alias"], tag.alias)
+    known_tags_persister.schedule(known_tags_path)
+    response = _tag_response(tag)
     audit.log_action(
         db,
         user,
@@ -207,14 +316,7 @@ async def update_tag(
         before=before,
         after=payload.dict(),
     )
-    return TagResponse(
-        epc=tag.epc,
-        alias=tag.alias,
-        alias_group=tag.alias_group,
-        room_number=tag.room_number,
-        notes=tag.notes,
-        status=tag.status,
-    )
+    return response
 
 
 @router.delete("/{epc}")
@@ -226,7 +328,14 @@ async def delete_tag(
     _: None = Depends(csrf_protect),
 ):
     canonical_epc = normalize_epc(epc) or epc
-    tag = db.get(Tag, canonical_epc)
+    await run_blocking(
+        _deactivate_tag, db, user, canonical_epc, request.app.state.known_tags_path
+    )
+    return {"status": "inactive"}
+
+
+def _deactivate_tag(db: Session, user: User, epc: str, known_tags_path: Path) -> None:
+    tag = db.get(Tag, epc)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
     before = {
@@ -239,7 +348,7 @@ async def delete_tag(
     tag.status = "inactive"
     db.add(tag)
     db.commit()
-    persist_db_to_json(db, request.app.state.known_tags_path)
+    known_tags_persister.schedule(known_tags_path)
     audit.log_action(
         db,
         user,
@@ -249,4 +358,3 @@ async def delete_tag(
         before=before,
         after={"status": "inactive"},
     )
-    return {"status": "inactive"}
@@ -1,6 +1,6 @@
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from fastapi import APIRouter, Depends, Form, HTTPException, Request, status
 from fastapi.responses import HTMLResponse, RedirectResponse
@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 
 from ..config import settings
 from ..database import get_db
+from ..executor import run_blocking, run_cpu
 from ..models import Tag, User, UserRole
 from ..security import (
     csrf_protect,
@@ -17,20 +18,19 @@ from ..security import (
     login_limiter,
     require_role,
     require_user,
+    user_cache,
 )
 from ..services import audit
-from ..services.alias_generator import generate_alias
+from ..services.alias_generator import alias_allocator
+from ..services.dashboard import dashboard_cache
 from ..services.epc import normalize_epc
-from ..services.events import (
-    EventFilters,
-    events_for_reader,
-    events_for_tag,
-    latest_events,
-    list_events,
-    unknown_tags,
-)
-from ..services.known_tags import persist_db_to_json
-from ..services.system_status import check_service_status, reader_status_heuristic
+from ..services.events import EventFilters, events_for_reader, events_for_tag, list_events
+from ..services.heartbeats import heartbeat_buffer
+from ..services.known_tags import known_tags_persister
+from ..services.last_seen import get_last_seen_index
+from ..services.service_probe import service_prober
+from ..services.system_status import reader_status
+from ..services.tag_search import TagFilters, TagPage, search_tags
 from ..services.users import authenticate_user, create_user, get_user_by_username
 
 router = APIRouter()
@@ -55,6 +55,66 @@ def _redirect(path: str) -> RedirectResponse:
     return RedirectResponse(url=path, status_code=status.HTTP_302_FOUND)
 
 
+def _tags_page(
+    db: Session, filters: TagFilters, events_db: str
+) -> Tuple[TagPage, Dict[str, Dict[str, Any]]]:
+    result = search_tags(db, filters)
+    return result, get_last_seen_index(events_db).lookup([t.epc for t in result.items])
+
+
+def _all_users(db: Session) -> list[User]:
+    return list(db.scalars(select(User)).all())
+
+
+def _tag_fields(tag: Tag) -> Dict[str, Any]:
+    return {
+        "alias": tag.alias,
+        "alias_group": tag.alias_group,
+        "room_number": tag.room_number,
+        "notes": tag.notes,
+        "status": tag.status,
+    }
+
+
+def _add_tag(
+    db: Session,
+    known_tags_path: Path,
+    epc: str,
+    alias: Optional[str],
+    alias_group: Optional[str],
+    room_number: Optional[str],
+    notes: Optional[str],
+    status_value: str,
+) -> Tuple[Optional[str], Dict[str, Any]]:
+    """
+    Insert a new tag and rewrite known_tags.json. Returns (error, stored fields).
+    """
+    if alias and db.scalar(select(Tag.epc).where(Tag.alias == alias)) is not None:
+        return "Alias już istnieje", {}
+    if db.get(Tag, epc):
+        return "Tag już istnieje", {}
+    use_alias = alias or alias_allocator.allocate(db, alias_group)
+    tag = Tag(
+        epc=epc,
+        alias=use_alias,
+        alias_group=alias_group,
+        room_number=room_number,
+        notes=notes,
+        status=status_value,
+    )
+    db.add(tag)
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        if not alias:
+            alias_allocator.release(use_alias)
+        raise
+    alias_allocator.claim(use_alias)
+    known_tags_persister.schedule(known_tags_path)
+    return None, _tag_fields(tag)
+
+
 @router.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request) -> HTMLResponse:
     if request.session.get("user_id"):
@@ -85,10 +145,10 @@ async def login_submit(
             },
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
         )
-    user = authenticate_user(db, username_clean, password)
+    user = await run_cpu(authenticate_user, db, username_clean, password)
     if not user:
         login_limiter.register_failure(username_clean, ip)
-        audit.log_action(db, None, "login_failed", entity_id=username_clean, ip=ip)
+        await run_blocking(audit.log_action, db, None, "login_failed", entity_id=username_clean, ip=ip)
         return templates.TemplateResponse(
             "login.html",
             {
@@ -103,7 +163,7 @@ async def login_submit(
     request.session["user_id"] = user.id
     request.session["role"] = user.role
     request.session["csrf_token"] = get_or_create_csrf(request)
-    audit.log_action(db, user, "login", entity_id=user.username, ip=ip)
+    await run_blocking(audit.log_action, db, user, "login", entity_id=user.username, ip=ip)
     return _redirect("/")
 
 
@@ -115,28 +175,28 @@ async def logout(
 ):
     user = None
     if request.session.get("user_id"):
-        user = db.get(User, int(request.session["user_id"]))
+        user = await run_blocking(db.get, User, int(request.session["user_id"]))
+        user_cache.invalidate(int(request.session["user_id"]))
     request.session.clear()
-    audit.log_action(db, user, "logout", entity_id=user.username if user else None)
+    await run_blocking(audit.log_action, db, user, "logout", entity_id=user.username if user else None)
     return _redirect("/login")
 
 
 @router.get("/", response_class=HTMLResponse)
 async def dashboard(request: Request, user: User = Depends(current_user)):
     events_db = str(request.app.state.events_db_path)
-    overview_events = latest_events(events_db, limit=20)
-    unknown = unknown_tags(events_db, limit=10)
-    reader_state = reader_status_heuristic(events_db)
-    problems = [e for e in overview_events if e.get("reason") in ("relay_error", "unknown_tag")]
+    snapshot = await dashboard_cache.get(events_db)
+    heartbeats = await run_blocking(heartbeat_buffer.readers)
+    reader_state = await run_blocking(reader_status, events_db, heartbeats)
     return templates.TemplateResponse(
         "dashboard.html",
         {
             "request": request,
             "user": user,
-            "events": overview_events,
-            "unknown": unknown,
+            "events": snapshot["events"],
+            "unknown": snapshot["unknown"],
             "readers": reader_state,
-            "problems": problems,
+            "problems": snapshot["problems"],
             "csrf_token": get_or_create_csrf(request),
         },
     )
@@ -145,19 +205,39 @@ async def dashboard(request: Request, user: User = Depends(current_user)):
 @router.get("/tags", response_class=HTMLResponse)
 async def tags_list(
     request: Request,
+    q: Optional[str] = None,
     status_filter: Optional[str] = None,
+    alias_group: Optional[str] = None,
+    room_number: Optional[str] = None,
+    sort: str = "alias",
+    order: str = "asc",
+    page: int = 1,
     db: Session = Depends(get_db),
     user: User = Depends(current_user),
 ):
-    stmt = select(Tag)
-    if status_filter:
-        stmt = stmt.where(Tag.status == status_filter)
-    tags = db.scalars(stmt).all()
+    filters = TagFilters(
+        q=q or None,
+        status=status_filter or None,
+        alias_group=alias_group or None,
+        room_number=room_number or None,
+        sort=sort,
+        order=order,
+        page=page,
+        page_size=50,
+    )
+    events_db = str(request.app.state.events_db_path)
+    try:
+        result, last_seen = await run_blocking(_tags_page, db, filters, events_db)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sort")
     return templates.TemplateResponse(
         "tags.html",
         {
             "request": request,
-            "tags": tags,
+            "tags": result.items,
+            "page": result,
+            "last_seen": last_seen,
+            "filters": filters,
             "user": user,
             "status_filter": status_filter or "",
             "csrf_token": get_or_create_csrf(request),
@@ -196,24 +276,20 @@ async def tags_create(
     _: None = Depends(csrf_protect),
 ):
     canonical_epc = normalize_epc(epc)
-    if not canonical_epc:
-        return templates.TemplateResponse(
-            "tag_form.html",
-            {
-                "request": request,
-                "tag": None,
-                "mode": "create",
-                "user": user,
-                "error": "Nieprawidłowy EPC",
-                "csrf_token": get_or_create_csrf(request),
-            },
-            status_code=400,
+    error = None if canonical_epc else "Nieprawidłowy EPC"
+    if not error:
+        error, fields = await run_blocking(
+            _add_tag,
+            db,
+            request.app.state.known_tags_path,
+            canonical_epc,
+            alias,
+            alias_group or None,
+            room_number,
+            notes,
+            status_value,
         )
-    existing_aliases = [a for (a,) in db.query(Tag.alias).all()]
-    alias_group_value = alias_group or "male_tree"
-    use_alias = alias or generate_alias(alias_group_value, existing_aliases)
-    if use_alias in existing_aliases:
-        error = "Alias już istnieje"
+    if error:
         return templates.TemplateResponse(
             "tag_form.html",
             {
@@ -226,48 +302,31 @@ async def tags_create(
             },
             status_code=400,
         )
-    if db.get(Tag, canonical_epc):
-        error = "Tag już istnieje"
-        return templates.TemplateResponse(
-            "tag_form.html",
-            {
-                "request": request,
-                "tag": None,
-                "mode": "create",
-                "user": user,
-                "error": error,
-                "csrf_token": get_or_create_csrf(request),
-            },
-            status_code=400,
-        )
-    tag = Tag(
-        epc=canonical_epc,
-        alias=use_alias,
-        alias_group=alias_group or None,
-        room_number=room_number,
-        notes=notes,
-        status=status_value,
-    )
-    db.add(tag)
-    db.commit()
-    persist_db_to_json(db, request.app.state.known_tags_path)
-    audit.log_action(
+    await run_blocking(
+        audit.log_action,
         db,
         user,
         "tag_create",
         entity_type="tag",
-        entity_id=tag.epc,
-        after={
-            "alias": tag.alias,
-            "alias_group": tag.alias_group,
-            "room_number": tag.room_number,
-            "notes": tag.notes,
-            "status": tag.status,
-        },
+        entity_id=canonical_epc,
+        after=fields,
     )
     return _redirect("/tags")
 
 
+def _tag_detail(
+    db: Session, epc: str, events_db: str
+) -> Tuple[Optional[Tag], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    tag = db.get(Tag, epc)
+    if not tag:
+        return None, [], []
+    tag_events = events_for_tag(events_db, tag.epc, limit=20)
+    reader_events = []
+    if tag_events:
+        reader_events = events_for_reader(events_db, tag_events[0]["reader_id"], limit=20)
+    return tag, tag_events, reader_events
+
+
 @router.get("/tags/{epc}", response_class=HTMLResponse)
 async def tag_detail(
     epc: str,
@@ -275,14 +334,10 @@ async def tag_detail(
     db: Session = Depends(get_db),
     user: User = Depends(current_user),
 ):
-    tag = db.get(Tag, epc)
+    events_db = str(request.app.state.events_db_path)
+    tag, tag_events, reader_events = await run_blocking(_tag_detail, db, epc, events_db)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
-    events_db = str(request.app.state.events_db_path)
-    tag_events = events_for_tag(events_db, tag.epc, limit=20)
-    reader_events = []
-    if tag_events:
-        reader_events = events_for_reader(events_db, tag_events[0]["reader_id"], limit=20)
     return templates.TemplateResponse(
         "tag_detail.html",
         {
@@ -296,6 +351,41 @@ async def tag_detail(
     )
 
 
+def _update_tag(
+    db: Session,
+    known_tags_path: Path,
+    epc: str,
+    alias: Optional[str],
+    alias_group: Optional[str],
+    room_number: Optional[str],
+    notes: Optional[str],
+    status_value: str,
+) -> Tuple[Optional[Tag], Optional[str], Dict[str, Any], Dict[str, Any]]:
+    """
+    Apply a form update. Returns (tag, error, before, after).
+    """
+    tag = db.get(Tag, epc)
+    if not tag:
+        return None, None, {}, {}
+    before = _tag_fields(tag)
+    if alias and alias != tag.alias:
+        existing = (
+            db.query(Tag).filter(Tag.alias == alias, Tag.epc != epc).first()
+        )
+        if existing:
+            return tag, "Alias już istnieje", before, {}
+        tag.alias = alias
+    tag.alias_group = alias_group or None
+    tag.room_number = room_number
+    tag.notes = notes
+    tag.status = status_value
+    db.add(tag)
+    db.commit()
+    alias_allocator.rename(before["alias"], tag.alias)
+    known_tags_persister.schedule(known_tags_path)
+    return tag, None, before, _tag_fields(tag)
+
+
 @router.post("/tags/{epc}")
 async def tag_update(
     epc: str,
@@ -309,61 +399,61 @@ async def tag_update(
     user: User = Depends(current_operator),
     _: None = Depends(csrf_protect),
 ):
-    tag = db.get(Tag, epc)
+    tag, error, before, after = await run_blocking(
+        _update_tag,
+        db,
+        request.app.state.known_tags_path,
+        epc,
+        alias,
+        alias_group,
+        room_number,
+        notes,
+        status_value,
+    )
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
-    before = {
-        "alias": tag.alias,
-        "alias_group": tag.alias_group,
-        "room_number": tag.room_number,
-        "notes": tag.notes,
-        "status": tag.status,
-    }
-    if alias and alias != tag.alias:
-        existing = (
-            db.query(Tag).filter(Tag.alias == alias, Tag.epc != epc).first()
+    if error:
+        return templates.TemplateResponse(
+            "tag_detail.html",
+            {
+                "request": request,
+                "tag": tag,
+                "tag_events": [],
+                "reader_events": [],
+                "user": user,
+                "error": error,
+                "csrf_token": get_or_create_csrf(request),
+            },
+            status_code=400,
         )
-        if existing:
-            error = "Alias już istnieje"
-            return templates.TemplateResponse(
-                "tag_detail.html",
-                {
-                    "request": request,
-                    "tag": tag,
-                    "tag_events": [],
-                    "reader_events": [],
-                    "user": user,
-                    "error": error,
-                    "csrf_token": get_or_create_csrf(request),
-                },
-                status_code=400,
-            )
-        tag.alias = alias
-    tag.alias_group = alias_group or None
-    tag.room_number = room_number
-    tag.notes = notes
-    tag.status = status_value
-    db.add(tag)
-    db.commit()
-    persist_db_to_json(db, request.app.state.known_tags_path)
-    audit.log_action(
+    await run_blocking(
+        audit.log_action,
         db,
         user,
         "tag_update",
         entity_type="tag",
-        entity_id=tag.epc,
+        entity_id=epc,
         before=before,
-        after={
-            "alias": tag.alias,
-            "alias_group": tag.alias_group,
-            "room_number": tag.room_number,
-            "notes": tag.notes,
-            "status": tag.status,
-        },
+        after=after,
     )
     return _redirect(f"/tags/{epc}")
 
 
+def _deactivate_tag(db: Session, known_tags_path: Path, epc: str) -> Optional[str]:
+    """
+    Mark a tag inactive. Returns its previous status, or None when missing.
+    """
+    tag = db.get(Tag, epc)
+    if not tag:
+        return None
+    previous = tag.status
+    tag.status = "inactive"
+    db.add(tag)
+    db.commit()
+    known_tags_persister.schedule(known_tags_path)
+    return previous
+
+
 @router.post("/tags/{epc}/deactivate")
 async def tag_deactivate(
     epc: str,
@@ -372,22 +462,20 @@ async def tag_deactivate(
     user: User = Depends(current_operator),
     _: None = Depends(csrf_protect),
 ):
-    tag = db.get(Tag, epc)
-    if not tag:
+    previous = await run_blocking(
+        _deactivate_tag, db, request.app.state.known_tags_path, epc
+    )
+    if previous is None:
         raise HTTPException(status_code=404, detail="Tag not found")
-    before = {"status": tag.status}
-    tag.status = "inactive"
-    db.add(tag)
-    db.commit()
-    persist_db_to_json(db, request.app.state.known_tags_path)
-    audit.log_action(
+    await run_blocking(
+        audit.log_action,
         db,
         user,
         "tag_deactivate",
         entity_type="tag",
-        entity_id=tag.epc,
-        before=before,
-        after={"status": tag.status},
+        entity_id=epc,
+        before={"status": previous},
+        after={"status": "inactive"},
     )
     return _redirect(f"/tags/{epc}")
 
@@ -421,35 +509,20 @@ async def enroll_submit(
     _: None = Depends(csrf_protect),
 ):
     canonical_epc = normalize_epc(epc)
-    if not canonical_epc:
-        return templates.TemplateResponse(
-            "enroll.html",
-            {
-                "request": request,
-                "user": user,
-                "cf601_mode": settings.cf601_mode,
-                "error": "Nieprawidłowy EPC",
-                "csrf_token": get_or_create_csrf(request),
-            },
-            status_code=400,
+    error = None if canonical_epc else "Nieprawidłowy EPC"
+    if not error:
+        error, fields = await run_blocking(
+            _add_tag,
+            db,
+            request.app.state.known_tags_path,
+            canonical_epc,
+            alias,
+            alias_group or "male_tree",
+            room_number,
+            notes,
+            "active",
         )
-    existing_aliases = [a for (a,) in db.query(Tag.alias).all()]
-    alias_group_value = alias_group or "male_tree"
-    use_alias = alias or generate_alias(alias_group_value, existing_aliases)
-    if use_alias in existing_aliases:
-        return templates.TemplateResponse(
-            "enroll.html",
-            {
-                "request": request,
-                "user": user,
-                "cf601_mode": settings.cf601_mode,
-                "error": "Alias już istnieje",
-                "csrf_token": get_or_create_csrf(request),
-            },
-            status_code=400,
-        )
-    if db.get(Tag, canonical_epc):
-        error = "Tag już istnieje"
+    if error:
         return templates.TemplateResponse(
             "enroll.html",
             {
@@ -461,29 +534,15 @@ async def enroll_submit(
             },
             status_code=400,
         )
-    tag = Tag(
-        epc=canonical_epc,
-        alias=use_alias,
-        alias_group=alias_group_value,
-        room_number=room_number,
-        notes=notes,
-        status="active",
-    )
-    db.add(tag)
-    db.commit()
-    persist_db_to_json(db, request.app.state.known_tags_path)
-    audit.log_action(
+    fields.pop("status", None)
+    await run_blocking(
+        audit.log_action,
         db,
         user,
         "tag_enroll",
         entity_type="tag",
-        entity_id=tag.epc,
-        after={
-            "alias": tag.alias,
-            "alias_group": tag.alias_group,
-            "room_number": tag.room_number,
-            "notes": tag.notes,
-        },
+        entity_id=canonical_epc,
+        after=fields,
     )
     return _redirect(f"/tags/{epc}")
 
@@ -496,7 +555,7 @@ async def events_view(
     reader_id: Optional[str] = None,
     reason: Optional[str] = None,
     tag: Optional[str] = None,
-    page: int = 1,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     user: User = Depends(current_user),
 ):
@@ -506,18 +565,22 @@ async def events_view(
         reader_id=reader_id,
         reason=reason,
         tag=tag,
-        page=page,
         page_size=50,
+        cursor=cursor or None,
     )
     events_db = str(request.app.state.events_db_path)
-    events, total = list_events(events_db, filters)
+    try:
+        result = await run_blocking(list_events, events_db, filters)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     return templates.TemplateResponse(
         "events.html",
         {
             "request": request,
-            "events": events,
-            "total": total,
-            "page": page,
+            "events": result.items,
+            "total": result.total,
+            "next_cursor": result.next_cursor,
+            "prev_cursor": result.prev_cursor,
             "filters": filters,
             "user": user,
             "csrf_token": get_or_create_csrf(request),
@@ -531,17 +594,17 @@ async def system_view(
     user: User = Depends(current_user),
 ):
     events_db = str(request.app.state.events_db_path)
-    readers = reader_status_heuristic(events_db)
-    services = [
-        check_service_status("rfid-server.service"),
-        check_service_status("nixstrav-mng.service"),
-    ]
+    heartbeats = await run_blocking(heartbeat_buffer.readers)
+    readers = await run_blocking(reader_status, events_db, heartbeats)
+    nodes = await run_blocking(heartbeat_buffer.nodes)
+    services = await service_prober.statuses()
     return templates.TemplateResponse(
         "system.html",
         {
             "request": request,
             "user": user,
             "readers": readers,
+            "nodes": nodes,
             "services": services,
             "csrf_token": get_or_create_csrf(request),
         },
@@ -554,7 +617,7 @@ async def users_view(
     db: Session = Depends(get_db),
     user: User = Depends(current_admin),
 ):
-    users = db.scalars(select(User)).all()
+    users = await run_blocking(_all_users, db)
     return templates.TemplateResponse(
         "users.html",
         {
@@ -576,9 +639,9 @@ async def users_new(
     user: User = Depends(current_admin),
     _: None = Depends(csrf_protect),
 ):
-    existing = get_user_by_username(db, username)
+    existing = await run_blocking(get_user_by_username, db, username)
     if existing:
-        users = db.scalars(select(User)).all()
+        users = await run_blocking(_all_users, db)
         return templates.TemplateResponse(
             "users.html",
             {
@@ -590,8 +653,9 @@ async def users_new(
             },
             status_code=400,
         )
-    create_user(db, username=username, password=password, role=UserRole(role))
-    audit.log_action(
+    await run_cpu(create_user, db, username=username, password=password, role=UserRole(role))
+    await run_blocking(
+        audit.log_action,
         db,
         user,
         "user_create",
@@ -1,13 +1,18 @@
 import secrets
+import threading
 import time
-from typing import Optional
+from collections import OrderedDict
+from typing import Optional, Tuple
 
 from fastapi import Depends, HTTPException, Request, status
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from starlette.requests import HTTPConnection
 
 from .config import settings
 from .database import get_db
+from .executor import run_blocking
 from .models import User, UserRole
 
 
@@ -69,15 +74,123 @@ login_limiter = LoginRateLimiter(
 )
 
 
-def get_session_user(request: Request, db: Session) -> Optional[User]:
-    user_id = request.session.get("user_id")
+class UserCache:
+    """
+    In-memory TTL/LRU cache of User snapshots keyed by id.
+
+    Entries are detached copies without the password hash. Any change to a
+    User row (edit, deactivation, role change, last login) and logout evict
+    it; a load that raced with an eviction is not stored.
+    """
+
+    def __init__(self, ttl_sec: float, max_size: int) -> None:
+        self.ttl_sec = ttl_sec
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, Tuple[float, User]]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def token(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def get(self, user_id: int) -> Optional[User]:
+        if self.ttl_sec <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user: User, token: int) -> None:
+        if self.ttl_sec <= 0:
+            return
+        snapshot = User(
+            id=user.id,
+            username=user.username,
+            password_hash="",
+            role=user.role,
+            is_active=user.is_active,
+            created_at=user.created_at,
+            last_login_at=user.last_login_at,
+        )
+        with self._lock:
+            if token != self._generation:
+                return
+            self._entries[user.id] = (time.monotonic() + self.ttl_sec, snapshot)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+user_cache = UserCache(settings.user_cache_ttl_sec, settings.user_cache_size)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target: User) -> None:
+    user_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _users_committed(session: Session) -> None:
+    # Evict again once the change is visible, in case a reader re-cached the
+    # old row between flush and commit.
+    for user_id in session.info.pop("changed_user_ids", ()):
+        user_cache.invalidate(user_id)
+
+
+def _session_user_id(conn: HTTPConnection) -> Optional[int]:
+    user_id = conn.session.get("user_id")
+    return int(user_id) if user_id else None
+
+
+def cached_session_user(conn: HTTPConnection) -> Optional[User]:
+    """
+    The session's user if it is in the cache; never touches the database.
+    """
+    user_id = _session_user_id(conn)
+    return user_cache.get(user_id) if user_id else None
+
+
+def get_session_user(request: HTTPConnection, db: Session) -> Optional[User]:
+    user_id = _session_user_id(request)
     if not user_id:
         return None
-    return db.get(User, int(user_id))
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    token = user_cache.token()
+    user = db.get(User, user_id)
+    if user is not None:
+        user_cache.put(user, token)
+    return user
 
 
 async def require_user(request: Request, db: Session = Depends(get_db)) -> User:
-    user = get_session_user(request, db)
+    user = cached_session_user(request)
+    if user is None:
+        user = await run_blocking(get_session_user, request, db)
     if not user or not user.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
     return user
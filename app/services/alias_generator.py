@@ -1,6 +1,13 @@
 from __future__ import annotations
 
-from typing import Iterable, Set
+import heapq
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models import Tag
 
 TREE_NAMES = [
     "Dab",
@@ -58,3 +65,140 @@ def generate_alias(alias_group: str, existing_aliases: Iterable[str]) -> str:
             if candidate not in existing:
                 return candidate
         suffix += 1
+
+
+GROUP_POOLS: Dict[str, List[str]] = {"male_tree": TREE_NAMES, "female_fruit": FRUIT_NAMES}
+_NAME_INDEX: Dict[str, Tuple[str, int]] = {
+    name: (group, idx) for group, pool in GROUP_POOLS.items() for idx, name in enumerate(pool)
+}
+
+
+def _pool_group(alias_group: Optional[str]) -> str:
+    # Same defaulting as the callers of generate_alias.
+    return "male_tree" if (alias_group or "male_tree") == "male_tree" else "female_fruit"
+
+
+def _position(alias: str) -> Optional[Tuple[str, int]]:
+    """
+    Map an alias to (group, position) in generate_alias order, e.g. for the
+    tree pool "Dab" -> 0, "Jesion" -> 1, "Dab-2" -> len(TREE_NAMES).
+    """
+    name, sep, suffix = alias.rpartition("-")
+    if not sep:
+        name, suffix_no = alias, 1
+    elif suffix.isdigit() and int(suffix) >= 2 and not suffix.startswith("0"):
+        suffix_no = int(suffix)
+    else:
+        return None
+    found = _NAME_INDEX.get(name)
+    if found is None:
+        return None
+    group, idx = found
+    return group, (suffix_no - 1) * len(GROUP_POOLS[group]) + idx
+
+
+def _candidate(group: str, position: int) -> str:
+    pool = GROUP_POOLS[group]
+    suffix, idx = divmod(position, len(pool))
+    return pool[idx] if suffix == 0 else f"{pool[idx]}-{suffix + 1}"
+
+
+class AliasAllocator:
+    """
+    In-memory alias index handing out the same alias generate_alias would,
+    in amortised O(1).
+
+    Per pool it keeps a frontier (every position below it is taken, except
+    those on the free heap) and a min-heap of released positions. The index
+    is built lazily from the tags table on first use and must be told about
+    aliases set or dropped outside allocate() via claim()/release().
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._used: Set[str] = set()
+        self._next: Dict[str, int] = {group: 0 for group in GROUP_POOLS}
+        self._free: Dict[str, List[int]] = {group: [] for group in GROUP_POOLS}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._loaded = False
+            self._used = set()
+            self._next = {group: 0 for group in GROUP_POOLS}
+            self._free = {group: [] for group in GROUP_POOLS}
+
+    def ensure_loaded(self, session: Session) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._used = {a for a in session.scalars(select(Tag.alias)) if a}
+            self._loaded = True
+
+    def _next_free(self, group: str) -> str:
+        # Caller holds the lock.
+        free = self._free[group]
+        while free:
+            candidate = _candidate(group, free[0])
+            if candidate not in self._used:
+                return candidate
+            heapq.heappop(free)
+        while _candidate(group, self._next[group]) in self._used:
+            self._next[group] += 1
+        return _candidate(group, self._next[group])
+
+    def suggest(self, session: Session, alias_group: Optional[str]) -> str:
+        """
+        Return the alias allocate() would hand out, without reserving it.
+        """
+        self.ensure_loaded(session)
+        with self._lock:
+            return self._next_free(_pool_group(alias_group))
+
+    def allocate(self, session: Session, alias_group: Optional[str]) -> str:
+        """
+        Reserve and return the first free alias for the group. Each candidate
+        is confirmed with an indexed lookup so another worker process cannot
+        hand out the same alias unnoticed.
+        """
+        self.ensure_loaded(session)
+        group = _pool_group(alias_group)
+        while True:
+            with self._lock:
+                alias = self._next_free(group)
+                self.claim(alias)
+            if session.scalar(select(Tag.epc).where(Tag.alias == alias)) is None:
+                return alias
+
+    def is_taken(self, alias: str) -> bool:
+        with self._lock:
+            return alias in self._used
+
+    def claim(self, alias: Optional[str]) -> None:
+        if not alias:
+            return
+        with self._lock:
+            self._used.add(alias)
+
+    def release(self, alias: Optional[str]) -> None:
+        if not alias:
+            return
+        with self._lock:
+            self._used.discard(alias)
+            found = _position(alias)
+            if found is not None:
+                group, position = found
+                if position < self._next[group]:
+                    heapq.heappush(self._free[group], position)
+
+    def rename(self, old: Optional[str], new: Optional[str]) -> None:
+        if old == new:
+            return
+        with self._lock:
+            self.claim(new)
+            self.release(old)
+
+
+alias_allocator = AliasAllocator()
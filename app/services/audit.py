@@ -1,13 +1,23 @@
 import json
-from typing import Any, Optional
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
+from sqlalchemy import insert, select
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 
+from ..config import settings
+from ..database import SessionLocal
 from ..models import AuditLog, User
 
+logger = logging.getLogger(__name__)
 
-def log_action(
-    session: Session,
+
+def _row(
     user: Optional[User],
     action: str,
     entity_type: Optional[str] = None,
@@ -15,8 +25,9 @@ def log_action(
     before: Any = None,
     after: Any = None,
     ip: Optional[str] = None,
-) -> None:
-    entry = AuditLog(
+) -> Dict[str, Any]:
+    return dict(
+        ts=datetime.utcnow(),
         user=user.username if user else None,
         user_id=user.id if user else None,
         action=action,
@@ -26,5 +37,249 @@ def log_action(
         after_json=json.dumps(after) if after is not None else None,
         ip=ip,
     )
-    session.add(entry)
-    session.commit()
+
+
+def _entry(user: Optional[User], action: str, **kwargs: Any) -> AuditLog:
+    return AuditLog(**_row(user, action, **kwargs))
+
+
+_FLUSH = object()
+_STOP = object()
+
+
+class AuditWriter:
+    """
+    Background writer that inserts queued audit rows in batches.
+
+    submit() only enqueues; a daemon thread, started on first use, collects
+    up to batch_size rows or waits interval_sec after the first one and
+    writes them with one multi-row INSERT and one commit. When the queue is
+    full the caller writes its row itself rather than dropping it. A failed
+    batch is retried row by row; rows that still fail are logged and counted
+    in dropped. flush() waits until everything queued so far is on disk;
+    stop() also ends the thread and is called on shutdown.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        batch_size: int,
+        interval_sec: float,
+        queue_size: int,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.interval_sec = interval_sec
+        self.written = 0
+        self.batches = 0
+        self.overflow = 0
+        self.errors = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_size))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="mng-audit", daemon=True)
+                self._thread.start()
+
+    def submit(self, row: Dict[str, Any]) -> None:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.overflow += 1
+            self._write([row])
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _collect(self) -> tuple:
+        # Returns (rows, markers) where markers are _FLUSH/_STOP seen.
+        rows: List[Dict[str, Any]] = []
+        markers: List[Any] = []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.interval_sec
+        while True:
+            if item is _FLUSH or item is _STOP:
+                markers.append(item)
+                break
+            rows.append(item)
+            if len(rows) >= self.batch_size:
+                break
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+        return rows, markers
+
+    def _run(self) -> None:
+        while True:
+            rows, markers = self._collect()
+            try:
+                if rows:
+                    self._write(rows)
+            finally:
+                for _ in range(len(rows) + len(markers)):
+                    self._queue.task_done()
+            if _STOP in markers:
+                return
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        session = self.session_factory()
+        try:
+            session.execute(insert(AuditLog), rows)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        try:
+            self._insert(rows)
+        except Exception:
+            self.errors += 1
+            logger.warning("Audit batch of %d rows failed, retrying row by row", len(rows), exc_info=True)
+        else:
+            self.written += len(rows)
+            self.batches += 1
+            return
+        for row in rows:
+            try:
+                self._insert([row])
+            except Exception:
+                self.dropped += 1
+                logger.exception("Audit row dropped: %r", row)
+            else:
+                self.written += 1
+        self.batches += 1
+
+    def flush(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(_FLUSH)
+        self._queue.join()
+
+    def stop(self) -> None:
+        with self._lock:
+            thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout=30)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self.pending(),
+            "written": self.written,
+            "batches": self.batches,
+            "overflow": self.overflow,
+            "errors": self.errors,
+            "dropped": self.dropped,
+        }
+
+
+audit_writer = AuditWriter(
+    SessionLocal,
+    batch_size=settings.audit_batch_size,
+    interval_sec=settings.audit_flush_interval_sec,
+    queue_size=settings.audit_queue_size,
+)
+
+
+def log_action(
+    session: Session,
+    user: Optional[User],
+    action: str,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[str] = None,
+    before: Any = None,
+    after: Any = None,
+    ip: Optional[str] = None,
+) -> None:
+    """
+    Record an audit entry. In the default async mode it is queued for the
+    background writer; AUDIT_MODE=sync commits it on session immediately.
+    """
+    row = _row(user, action, entity_type, entity_id, before, after, ip)
+    if settings.audit_mode == "sync":
+        session.add(AuditLog(**row))
+        session.commit()
+        return
+    audit_writer.submit(row)
+
+
+def add_actions(
+    session: Session, user: Optional[User], actions: Iterable[Dict[str, Any]]
+) -> None:
+    """
+    Stage several audit entries on the session; the caller commits them
+    together with the change they describe.
+    """
+    session.add_all([_entry(user, **action) for action in actions])
+
+
+def ensure_audit_indexes(bind: Engine) -> None:
+    """
+    create_all only indexes new tables; add the audit indexes to an
+    existing audit_log as well.
+    """
+    for index in AuditLog.__table__.indexes:
+        index.create(bind=bind, checkfirst=True)
+
+
+def query_audit(
+    session: Session,
+    user: Optional[str] = None,
+    action: Optional[str] = None,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[str] = None,
+    from_ts: Optional[datetime] = None,
+    to_ts: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = 50,
+) -> Dict[str, Any]:
+    """
+    Newest-first page of audit entries. Pass the returned next_before_id as
+    before_id for the next page.
+    """
+    limit = max(1, min(limit, 500))
+    stmt = select(AuditLog)
+    if user:
+        stmt = stmt.where(AuditLog.user == user)
+    if action:
+        stmt = stmt.where(AuditLog.action == action)
+    if entity_type:
+        stmt = stmt.where(AuditLog.entity_type == entity_type)
+    if entity_id:
+        stmt = stmt.where(AuditLog.entity_id == entity_id)
+    if from_ts:
+        stmt = stmt.where(AuditLog.ts >= from_ts)
+    if to_ts:
+        stmt = stmt.where(AuditLog.ts <= to_ts)
+    if before_id:
+        stmt = stmt.where(AuditLog.id < before_id)
+    rows = session.scalars(stmt.order_by(AuditLog.id.desc()).limit(limit + 1)).all()
+    items = [
+        {
+            "id": r.id,
+            "ts": r.ts,
+            "user": r.user,
+            "action": r.action,
+            "entity_type": r.entity_type,
+            "entity_id": r.entity_id,
+            "before": json.loads(r.before_json) if r.before_json else None,
+            "after": json.loads(r.after_json) if r.after_json else None,
+            "ip": r.ip,
+        }
+        for r in rows[:limit]
+    ]
+    next_before_id = items[-1]["id"] if len(rows) > limit else None
+    return {"items": items, "next_before_id": next_before_id}
@@ -1,18 +1,211 @@
 from __future__ import annotations
 
+import asyncio
+import time
 from typing import Any, Dict, Optional
 
 import httpx
 
 from ..config import settings
+from .metrics import cf601d_request_duration
+
+# cf601d calls that only read state; these are retried after read timeouts
+# and 5xx as well, the others only when the request never reached cf601d.
+SAFE_ENDPOINTS = {"/getPorts", "/GetDevicePara", "/GetTagInfo"}
+
+# Per-endpoint timeouts (seconds); others use CF601D_TIMEOUT_SEC.
+ENDPOINT_TIMEOUTS = {
+    "/GetTagInfo": 2.0,
+    "/OpenDevice": 10.0,
+}
+
+RETRY_STATUS = {502, 503, 504}
+
+
+class Cf601Unavailable(Exception):
+    """cf601d could not be reached, or the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after threshold consecutive failures; while open, calls fail fast
+    until reset_sec has passed, then one trial call is let through.
+    """
+
+    def __init__(self, threshold: int, reset_sec: float) -> None:
+        self.threshold = max(1, threshold)
+        self.reset_sec = reset_sec
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_sec:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "half-open":
+            # Let this call through as the trial; others wait for its outcome.
+            self.opened_at = time.monotonic()
+        return state != "open"
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+
+class EndpointStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def observe(self, elapsed_ms: float, ok: bool) -> None:
+        self.calls += 1
+        if not ok:
+            self.errors += 1
+        self.total_ms += elapsed_ms
+        self.last_ms = elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_ms": round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "last_ms": round(self.last_ms, 2),
+        }
+
+
+class Cf601Client:
+    """
+    One keep-alive httpx.AsyncClient shared by all cf601d calls, created on
+    first use and closed on shutdown. Transient failures are retried with
+    exponential backoff and feed a circuit breaker, so a stopped cf601d
+    answers in microseconds instead of a timeout per enrollment poll.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 5.0,
+        retries: int = 2,
+        backoff_sec: float = 0.1,
+        breaker_threshold: int = 5,
+        breaker_reset_sec: float = 10.0,
+        max_connections: int = 4,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self.backoff_sec = backoff_sec
+        self.max_connections = max_connections
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_sec)
+        self.endpoints: Dict[str, EndpointStats] = {}
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    def _transient(self, endpoint: str, exc: Exception) -> bool:
+        if isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+            return True
+        if endpoint not in SAFE_ENDPOINTS:
+            return False
+        if isinstance(exc, httpx.HTTPStatusError):
+            return exc.response.status_code in RETRY_STATUS
+        return isinstance(exc, (httpx.ReadTimeout, httpx.RemoteProtocolError, httpx.ReadError))
+
+    async def post(self, endpoint: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        stats = self.endpoints.setdefault(endpoint, EndpointStats())
+        if not self.breaker.allow():
+            stats.observe(0.0, ok=False)
+            cf601d_request_duration.observe(0.0, endpoint, "circuit_open")
+            raise Cf601Unavailable("cf601d circuit open")
+        timeout = ENDPOINT_TIMEOUTS.get(endpoint, self.timeout)
+        attempt = 0
+        started = time.perf_counter()
+        while True:
+            try:
+                resp = await self._http().post(endpoint, json=payload or {}, timeout=timeout)
+                resp.raise_for_status()
+                data = resp.json()
+            except httpx.HTTPError as exc:
+                if attempt < self.retries and self._transient(endpoint, exc):
+                    attempt += 1
+                    stats.retries += 1
+                    await asyncio.sleep(self.backoff_sec * 2 ** (attempt - 1))
+                    continue
+                elapsed = time.perf_counter() - started
+                stats.observe(elapsed * 1000, ok=False)
+                cf601d_request_duration.observe(elapsed, endpoint, "error")
+                if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code < 500:
+                    # cf601d answered; it is up even if it rejected the call.
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if isinstance(exc, httpx.TransportError):
+                    raise Cf601Unavailable(f"cf601d unreachable: {exc}") from exc
+                raise
+            self.breaker.record_success()
+            elapsed = time.perf_counter() - started
+            stats.observe(elapsed * 1000, ok=True)
+            cf601d_request_duration.observe(elapsed, endpoint, "ok")
+            return data
+
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "endpoints": {name: s.to_dict() for name, s in sorted(self.endpoints.items())},
+        }
+
+
+cf601_client = Cf601Client(
+    settings.cf601d_url,
+    timeout=settings.cf601d_timeout_sec,
+    retries=settings.cf601d_retries,
+    backoff_sec=settings.cf601d_retry_backoff_sec,
+    breaker_threshold=settings.cf601d_breaker_threshold,
+    breaker_reset_sec=settings.cf601d_breaker_reset_sec,
+    max_connections=settings.cf601d_max_connections,
+)
 
 
 async def _post(endpoint: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    url = settings.cf601d_url.rstrip("/") + endpoint
-    async with httpx.AsyncClient(timeout=5) as client:
-        resp = await client.post(url, json=payload or {})
-        resp.raise_for_status()
-        return resp.json()
+    return await cf601_client.post(endpoint, payload)
 
 
 async def get_ports() -> Dict[str, Any]:
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import settings
+from ..executor import run_blocking
+from .events import events_watermark, latest_events, unknown_tags
+
+PROBLEM_REASONS = ("relay_error", "unknown_tag")
+
+
+class DashboardCache:
+    """
+    The events.db panels of the dashboard (latest events, problems, unknown
+    tags), built once per events watermark and shared by every user.
+
+    A request first reads the events watermark, a stat and a MAX(id) index
+    lookup; while it matches the
+    cached snapshot nothing else touches events.db. On a change the panel
+    queries run concurrently on the blocking pool in a task of their own;
+    every request, the one that started it included, waits on that task
+    through a shield, so a cancelled request neither aborts the build nor
+    strands the others waiting for it. Snapshots are also rebuilt
+    after max_age_sec, in case rows were changed without new ids.
+    """
+
+    def __init__(self, max_age_sec: float) -> None:
+        self.max_age_sec = max_age_sec
+        self.hits = 0
+        self.builds = 0
+        self._entries: Dict[str, Tuple[Tuple[Optional[str], int], float, Dict[str, Any]]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def get(self, events_db: str) -> Dict[str, Any]:
+        watermark = await run_blocking(events_watermark, events_db)
+        entry = self._entries.get(events_db)
+        if (
+            entry is not None
+            and entry[0] == watermark
+            and time.monotonic() - entry[1] < self.max_age_sec
+        ):
+            self.hits += 1
+            return entry[2]
+        build = self._inflight.get(events_db)
+        if build is None or build.get_loop() is not asyncio.get_running_loop():
+            build = asyncio.ensure_future(self._build(events_db, watermark))
+            self._inflight[events_db] = build
+            build.add_done_callback(lambda task: self._build_done(events_db, task))
+        return await asyncio.shield(build)
+
+    def _build_done(self, events_db: str, task: asyncio.Task) -> None:
+        if self._inflight.get(events_db) is task:
+            del self._inflight[events_db]
+        if not task.cancelled():
+            # Mark it retrieved; if every waiter went away nobody else will.
+            task.exception()
+
+    async def _build(self, events_db: str, watermark: Tuple[Optional[str], int]) -> Dict[str, Any]:
+        latest, unknown = await asyncio.gather(
+            run_blocking(latest_events, events_db, limit=20),
+            run_blocking(unknown_tags, events_db, limit=10),
+        )
+        snapshot = {
+            "events": latest,
+            "unknown": unknown,
+            "problems": [e for e in latest if e.get("reason") in PROBLEM_REASONS],
+            "last_event_id": watermark[1],
+        }
+        self._entries[events_db] = (watermark, time.monotonic(), snapshot)
+        self.builds += 1
+        return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "builds": self.builds, "cached": len(self._entries)}
+
+
+dashboard_cache = DashboardCache(settings.dashboard_snapshot_max_age_sec)
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator
+
+from .events import EVENT_FIELDS
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "json": ("application/json", "json"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+
+def _buffered(chunks: Iterable[str], min_size: int) -> Iterator[bytes]:
+    """
+    Group small string chunks into byte blocks of at least min_size.
+    """
+    parts: list[str] = []
+    size = 0
+    for chunk in chunks:
+        parts.append(chunk)
+        size += len(chunk)
+        if size >= min_size:
+            yield "".join(parts).encode("utf-8")
+            parts = []
+            size = 0
+    if parts:
+        yield "".join(parts).encode("utf-8")
+
+
+def iter_csv(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EVENT_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+    tail = buf.getvalue()
+    if tail:
+        yield tail
+
+
+def iter_ndjson(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+def iter_json_array(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    yield "["
+    first = True
+    for row in rows:
+        yield ("" if first else ",") + json.dumps(row, ensure_ascii=False)
+        first = False
+    yield "]"
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    Compress a byte stream on the fly into gzip framing.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def encode_events(
+    rows: Iterable[Dict[str, Any]],
+    fmt: str,
+    gzip: bool = False,
+    chunk_size: int = 64 * 1024,
+) -> Iterator[bytes]:
+    """
+    Encode an event iterator as CSV, NDJSON or a JSON array, optionally gzipped.
+    """
+    if fmt == "csv":
+        text = iter_csv(rows)
+    elif fmt == "ndjson":
+        text = iter_ndjson(rows)
+    else:
+        text = iter_json_array(rows)
+    stream = _buffered(text, chunk_size)
+    if gzip:
+        stream = gzip_stream(stream)
+    return stream
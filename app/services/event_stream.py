@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from ..config import settings
+from ..executor import run_blocking
+from .events import events_after, events_watermark
+from .last_seen import get_last_seen_index
+from .reader_state import get_reader_state
+
+
+class Subscription:
+    """
+    One connected client: its filters and a bounded queue of matching events.
+
+    When the client falls behind and its queue is full, new events are
+    dropped and counted instead of blocking the shared poller; the client is
+    told how many it missed via take_dropped(). When the events it would need
+    can no longer be delivered in order (events.db was replaced, or a resume
+    backlog was cut short), take_reset() returns the reason once and the
+    client should reload rather than keep tailing.
+    """
+
+    def __init__(
+        self,
+        reader_id: Optional[str] = None,
+        reason: Optional[str] = None,
+        tag: Optional[str] = None,
+        queue_size: int = 500,
+    ) -> None:
+        self.reader_id = reader_id or None
+        self.reason = reason or None
+        self.tag = tag or None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self.dropped = 0
+        self.reset: Optional[str] = None
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        if self.reader_id and event.get("reader_id") != self.reader_id:
+            return False
+        if self.reason and event.get("reason") != self.reason:
+            return False
+        if self.tag and event.get("tag") != self.tag:
+            return False
+        return True
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def take_dropped(self) -> int:
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    def mark_reset(self, reason: str, clear: bool = False) -> None:
+        self.reset = reason
+        if clear:
+            # Queued rows belong to the old file; their ids mean nothing now.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+
+    def take_reset(self) -> Optional[str]:
+        reset, self.reset = self.reset, None
+        return reset
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Wait for the next event; None when nothing arrived within timeout.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBroadcaster:
+    """
+    Tails events.db by id watermark with a single poller and fans new rows
+    out to every subscription, so N open dashboards cost one query per poll.
+
+    The poller task starts with the first subscriber and exits when the last
+    one leaves. Each poll reads the events watermark (file id and MAX(id)):
+    if events.db was replaced or MAX(id) dropped below the watermark,
+    tailing restarts from the new end of the file and every subscription is
+    marked reset.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        poll_interval: float = 1.0,
+        batch_size: int = 500,
+        queue_size: int = 500,
+    ) -> None:
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self.batch_size = max(1, batch_size)
+        self.queue_size = queue_size
+        self.last_id: Optional[int] = None
+        self.source_file: Optional[str] = None
+        self.subscribers: Set[Subscription] = set()
+        self.polls = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.resets = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(
+        self,
+        reader_id: Optional[str] = None,
+        reason: Optional[str] = None,
+        tag: Optional[str] = None,
+    ) -> Subscription:
+        sub = Subscription(reader_id, reason, tag, queue_size=self.queue_size)
+        self.subscribers.add(sub)
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self.subscribers.discard(sub)
+
+    def publish(self, events: List[Dict[str, Any]]) -> None:
+        for event in events:
+            for sub in list(self.subscribers):
+                if not sub.matches(event):
+                    continue
+                before = sub.dropped
+                sub.offer(event)
+                if sub.dropped == before:
+                    self.delivered += 1
+                else:
+                    self.dropped += 1
+
+    async def poll_once(self) -> int:
+        """
+        Fetch one batch past the watermark, publish it and return its size.
+        """
+        source_file, current = await run_blocking(events_watermark, self.db_path)
+        if self.last_id is None:
+            self.source_file, self.last_id = source_file, current
+            return 0
+        self.polls += 1
+        if source_file is not None and self.source_file is None:
+            # events.db appeared after the poller started; tail it from the start.
+            self.source_file = source_file
+        elif source_file is not None and (
+            source_file != self.source_file or current < self.last_id
+        ):
+            # events.db was replaced or truncated: its ids no longer follow ours.
+            self.source_file, self.last_id = source_file, current
+            self.resets += 1
+            for sub in list(self.subscribers):
+                sub.mark_reset("rotated", clear=True)
+            return 0
+        after_id = self.last_id
+        if current <= after_id:
+            return 0
+        rows = await run_blocking(events_after, self.db_path, after_id, self.batch_size)
+        if rows:
+            self.last_id = rows[-1]["id"]
+            self.publish(rows)
+            get_reader_state(self.db_path).apply(after_id, rows)
+            get_last_seen_index(self.db_path).apply(after_id, rows)
+        return len(rows)
+
+    async def _run(self) -> None:
+        while self.subscribers:
+            try:
+                fetched = await self.poll_once()
+            except Exception:
+                self.errors += 1
+                fetched = 0
+            if fetched < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+        # Nobody is listening: the next subscriber starts from the current end.
+        self.last_id = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "db_path": self.db_path,
+            "subscribers": len(self.subscribers),
+            "last_id": self.last_id,
+            "polls": self.polls,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "resets": self.resets,
+        }
+
+
+_broadcasters: Dict[str, EventBroadcaster] = {}
+_broadcasters_lock = threading.Lock()
+
+
+def get_broadcaster(db_path: str) -> EventBroadcaster:
+    """
+    Return the shared broadcaster for db_path, creating it on first use.
+    """
+    key = os.path.abspath(db_path)
+    with _broadcasters_lock:
+        broadcaster = _broadcasters.get(key)
+        if broadcaster is None:
+            broadcaster = EventBroadcaster(
+                key,
+                poll_interval=settings.event_stream_poll_sec,
+                batch_size=settings.event_stream_batch_size,
+                queue_size=settings.event_stream_queue_size,
+            )
+            _broadcasters[key] = broadcaster
+    return broadcaster
+
+
+def format_sse(data: Any, event: Optional[str] = None, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def backlog_for(
+    broadcaster: EventBroadcaster, sub: Subscription, after_id: int
+) -> List[Dict[str, Any]]:
+    """
+    Events after a client's Last-Event-ID, for resuming a dropped connection.
+    At most one queue's worth is replayed; when more were missed the
+    subscription is marked reset so the client knows to reload.
+    """
+    limit = max(1, broadcaster.queue_size)
+    rows = await run_blocking(events_after, broadcaster.db_path, after_id, limit + 1)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        sub.mark_reset("backlog_truncated")
+    return [row for row in rows if sub.matches(row)]
+
+
+async def sse_events(
+    broadcaster: EventBroadcaster,
+    sub: Subscription,
+    backlog: List[Dict[str, Any]],
+    keepalive_sec: float,
+) -> AsyncIterator[str]:
+    """
+    Render a subscription as a text/event-stream body. Unsubscribes when the
+    client disconnects (the response cancels the generator).
+    """
+    last_sent = 0
+    try:
+        yield "retry: 3000\n\n"
+        reset = sub.take_reset()
+        if reset:
+            yield format_sse({"reason": reset}, "reset")
+        for row in backlog:
+            last_sent = row["id"]
+            yield format_sse(row, "event", row["id"])
+        while True:
+            dropped = sub.take_dropped()
+            if dropped:
+                yield format_sse({"dropped": dropped}, "lagged")
+            row = await sub.get(keepalive_sec)
+            reset = sub.take_reset()
+            if reset:
+                yield format_sse({"reason": reset}, "reset")
+                # Ids start over in the new file.
+                last_sent = 0
+            if row is None:
+                yield ": keepalive\n\n"
+                continue
+            if row["id"] <= last_sent:
+                continue
+            last_sent = row["id"]
+            yield format_sse(row, "event", row["id"])
+    finally:
+        broadcaster.unsubscribe(sub)
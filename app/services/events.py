@@ -1,31 +1,110 @@
 from __future__ import annotations
 
+import base64
+import json
+import os
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..config import settings
+from .metrics import timed_sqlite
+from .sqlite_pool import get_pool
+
+
+def _empty_events_db() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY,
+            reader_id TEXT,
+            tag TEXT,
+            ts_client TEXT,
+            received_at TEXT,
+            source_ip TEXT,
+            fired INTEGER,
+            reason TEXT
+        )
+        """
+    )
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+# events.db path -> synced sidecar replica with extra indexes (see events_index).
+_replicas: Dict[str, str] = {}
+# When set, SQL executed through _connect is appended here (see capture_queries).
+_query_log: ContextVar[Optional[List[str]]] = ContextVar("events_query_log", default=None)
+
 
+def set_replica(db_path: str, replica_path: Optional[str]) -> None:
+    key = os.path.abspath(db_path)
+    if replica_path:
+        _replicas[key] = os.path.abspath(replica_path)
+    else:
+        _replicas.pop(key, None)
 
-def _connect(db_path: str) -> sqlite3.Connection:
+
+def replica_for(db_path: str) -> Optional[str]:
+    if not _replicas:
+        return None
+    return _replicas.get(os.path.abspath(db_path))
+
+
+@contextmanager
+def capture_queries() -> Iterator[List[str]]:
+    """
+    Record the SQL (with bound values inlined) run by this module's functions
+    in the current context.
+    """
+    log: List[str] = []
+    token = _query_log.set(log)
     try:
-        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        yield log
+    finally:
+        _query_log.reset(token)
+
+
+@contextmanager
+def _connect(
+    db_path: str, query: str, replica: bool = True, stream: bool = False
+) -> Iterator[sqlite3.Connection]:
+    """
+    Borrow a pooled read-only connection to events.db, or to its indexed
+    replica when one is active, timed as the named query. Id-watermark reads
+    pass replica=False since they must see the newest rows and only need the
+    primary key. Streaming readers pass stream=True: they hold the
+    connection while the consumer iterates, so that time is not recorded as
+    query time. Falls back to an empty in-memory events table when the file
+    cannot be opened.
+    """
+    pool = get_pool((replica and replica_for(db_path)) or db_path)
+    try:
+        conn = pool.acquire()
     except sqlite3.OperationalError:
-        conn = sqlite3.connect(":memory:")
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS events (
-                id INTEGER PRIMARY KEY,
-                reader_id TEXT,
-                tag TEXT,
-                ts_client TEXT,
-                received_at TEXT,
-                source_ip TEXT,
-                fired INTEGER,
-                reason TEXT
-            )
-            """
-        )
-    conn.row_factory = sqlite3.Row
-    return conn
+        conn = _empty_events_db()
+        try:
+            yield conn
+        finally:
+            conn.close()
+        return
+    broken = False
+    try:
+        with timed_sqlite(conn, "events", query, _query_log.get(), timed=not stream):
+            yield conn
+    except sqlite3.DatabaseError:
+        broken = True
+        raise
+    finally:
+        if broken:
+            conn.close()
+        else:
+            pool.release(conn)
 
 
 @dataclass
@@ -37,9 +116,35 @@ class EventFilters:
     tag: Optional[str] = None
     page: int = 1
     page_size: int = 50
+    cursor: Optional[str] = None
 
 
-def list_events(db_path: str, filters: EventFilters) -> Tuple[List[Dict[str, Any]], int]:
+@dataclass
+class EventPage:
+    items: List[Dict[str, Any]]
+    total: int
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+EVENT_FIELDS = [
+    "id",
+    "reader_id",
+    "tag",
+    "ts_client",
+    "received_at",
+    "source_ip",
+    "fired",
+    "reason",
+]
+EVENT_COLUMNS = ", ".join(EVENT_FIELDS)
+
+# Cached COUNT(*) results keyed by (db_path, where, params).
+_count_cache: Dict[Tuple[str, str, Tuple[Any, ...]], Tuple[float, int]] = {}
+_count_cache_lock = threading.Lock()
+
+
+def _where(filters: EventFilters) -> Tuple[str, List[Any]]:
     conds = []
     params: list[Any] = []
     if filters.from_ts:
@@ -58,51 +163,120 @@ def list_events(db_path: str, filters: EventFilters) -> Tuple[List[Dict[str, Any
         conds.append("tag = ?")
         params.append(filters.tag)
     where = f"WHERE {' AND '.join(conds)}" if conds else ""
+    return where, params
 
-    query_base = f"FROM events {where}"
-    count_sql = f"SELECT COUNT(*) {query_base}"
-    sql = (
-        f"SELECT id, reader_id, tag, ts_client, received_at, source_ip, fired, reason "
-        f"{query_base} "
-        "ORDER BY received_at DESC LIMIT ? OFFSET ?"
-    )
-    page_size = max(1, min(filters.page_size, 200))
-    offset = max(0, filters.page - 1) * page_size
-    with _connect(db_path) as conn:
-        total = conn.execute(count_sql, params).fetchone()[0]
-        rows = conn.execute(sql, params + [page_size, offset]).fetchall()
-    return [dict(r) for r in rows], int(total)
+
+def encode_cursor(received_at: Optional[str], event_id: int, direction: str = "next") -> str:
+    """
+    Encode an opaque keyset cursor pointing at (received_at, id).
+    """
+    raw = json.dumps([received_at, event_id, direction], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
 
 
-def export_events(db_path: str, filters: EventFilters) -> List[Dict[str, Any]]:
+def decode_cursor(cursor: str) -> Tuple[Optional[str], int, str]:
     """
-    Export all events matching filters (no pagination).
+    Decode a cursor produced by encode_cursor. Raises ValueError when malformed.
     """
-    conds = []
-    params: list[Any] = []
-    if filters.from_ts:
-        conds.append("received_at >= ?")
-        params.append(filters.from_ts)
-    if filters.to_ts:
-        conds.append("received_at <= ?")
-        params.append(filters.to_ts)
-    if filters.reader_id:
-        conds.append("reader_id = ?")
-        params.append(filters.reader_id)
-    if filters.reason:
-        conds.append("reason = ?")
-        params.append(filters.reason)
-    if filters.tag:
-        conds.append("tag = ?")
-        params.append(filters.tag)
-    where = f"WHERE {' AND '.join(conds)}" if conds else ""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        received_at, event_id, direction = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+    if direction not in ("next", "prev") or not isinstance(event_id, int):
+        raise ValueError("Invalid cursor")
+    return received_at, event_id, direction
+
+
+def count_events(db_path: str, filters: EventFilters) -> int:
+    """
+    COUNT(*) for the given filters, cached for settings.events_count_cache_sec.
+    The total shown next to a cursor page is therefore approximate.
+    """
+    where, params = _where(filters)
+    key = (db_path, where, tuple(params))
+    ttl = settings.events_count_cache_sec
+    now = time.monotonic()
+    with _count_cache_lock:
+        cached = _count_cache.get(key)
+    if cached and now - cached[0] < ttl:
+        return cached[1]
+    with _connect(db_path, "count_events") as conn:
+        total = int(conn.execute(f"SELECT COUNT(*) FROM events {where}", params).fetchone()[0])
+    with _count_cache_lock:
+        if len(_count_cache) >= 256:
+            _count_cache.clear()
+        _count_cache[key] = (now, total)
+    return total
+
+
+def list_events(db_path: str, filters: EventFilters) -> EventPage:
+    """
+    Page through events newest first.
+
+    With a cursor (or on page 1) this uses keyset pagination on
+    (received_at, id), so every page costs the same regardless of depth.
+    A page number > 1 without a cursor falls back to LIMIT/OFFSET.
+    """
+    where, params = _where(filters)
+    page_size = max(1, min(filters.page_size, 200))
+    direction = "next"
+    keyset: list[str] = []
+    keyset_params: list[Any] = []
+    if filters.cursor:
+        received_at, event_id, direction = decode_cursor(filters.cursor)
+        op = "<" if direction == "next" else ">"
+        keyset.append(f"(received_at {op} ? OR (received_at = ? AND id {op} ?))")
+        keyset_params += [received_at, received_at, event_id]
+    if keyset:
+        where = f"{where} AND {keyset[0]}" if where else f"WHERE {keyset[0]}"
+    order = "DESC" if direction == "next" else "ASC"
     sql = (
-        "SELECT id, reader_id, tag, ts_client, received_at, source_ip, fired, reason "
-        f"FROM events {where} ORDER BY received_at DESC"
+        f"SELECT {EVENT_COLUMNS} FROM events {where} "
+        f"ORDER BY received_at {order}, id {order} LIMIT ? OFFSET ?"
     )
-    with _connect(db_path) as conn:
-        rows = conn.execute(sql, params).fetchall()
-    return [dict(r) for r in rows]
+    offset = 0
+    if not filters.cursor:
+        offset = max(0, filters.page - 1) * page_size
+    with _connect(db_path, "list_events") as conn:
+        rows = conn.execute(sql, params + keyset_params + [page_size + 1, offset]).fetchall()
+    items = [dict(r) for r in rows[:page_size]]
+    has_more = len(rows) > page_size
+    if direction == "prev":
+        items.reverse()
+        has_newer, has_older = has_more, True
+    else:
+        has_newer, has_older = bool(filters.cursor) or offset > 0, has_more
+    page = EventPage(items=items, total=count_events(db_path, filters))
+    if items and has_older:
+        last = items[-1]
+        page.next_cursor = encode_cursor(last["received_at"], last["id"], "next")
+    if items and has_newer:
+        first = items[0]
+        page.prev_cursor = encode_cursor(first["received_at"], first["id"], "prev")
+    return page
+
+
+def export_events(
+    db_path: str, filters: EventFilters, batch_size: int = 1000
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield all events matching filters (no pagination), fetched in batches so
+    memory stays constant regardless of the result size.
+    """
+    where, params = _where(filters)
+    sql = f"SELECT {EVENT_COLUMNS} FROM events {where} ORDER BY received_at DESC"
+    with _connect(db_path, "export_events", stream=True) as conn:
+        cur = conn.execute(sql, params)
+        try:
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                for r in rows:
+                    yield dict(r)
+        finally:
+            cur.close()
 
 
 def events_per_day(db_path: str, days: int = 14) -> List[Dict[str, Any]]:
@@ -113,7 +287,7 @@ def events_per_day(db_path: str, days: int = 14) -> List[Dict[str, Any]]:
         ORDER BY day DESC
         LIMIT ?
     """
-    with _connect(db_path) as conn:
+    with _connect(db_path, "events_per_day") as conn:
         rows = conn.execute(sql, (days,)).fetchall()
     return [dict(r) for r in rows]
 
@@ -126,7 +300,7 @@ def events_per_hour(db_path: str, days: int = 7) -> List[Dict[str, Any]]:
         GROUP BY hour
         ORDER BY hour
     """
-    with _connect(db_path) as conn:
+    with _connect(db_path, "events_per_hour") as conn:
         rows = conn.execute(sql, (f"-{days} days",)).fetchall()
     return [dict(r) for r in rows]
 
@@ -139,7 +313,7 @@ def top_reasons(db_path: str, limit: int = 5) -> List[Dict[str, Any]]:
         ORDER BY count DESC
         LIMIT ?
     """
-    with _connect(db_path) as conn:
+    with _connect(db_path, "top_reasons") as conn:
         rows = conn.execute(sql, (limit,)).fetchall()
     return [dict(r) for r in rows]
 
@@ -152,7 +326,7 @@ def top_readers(db_path: str, limit: int = 5) -> List[Dict[str, Any]]:
         ORDER BY count DESC
         LIMIT ?
     """
-    with _connect(db_path) as conn:
+    with _connect(db_path, "top_readers") as conn:
         rows = conn.execute(sql, (limit,)).fetchall()
     return [dict(r) for r in rows]
 
@@ -166,7 +340,7 @@ def unknown_tags(db_path: str, limit: int = 20) -> List[Dict[str, Any]]:
         ORDER BY last_seen DESC
         LIMIT ?
     """
-    with _connect(db_path) as conn:
+    with _connect(db_path, "unknown_tags") as conn:
         rows = conn.execute(sql, (limit,)).fetchall()
     return [dict(r) for r in rows]
 
@@ -180,7 +354,7 @@ def last_events_per_reader(db_path: str) -> List[Dict[str, Any]]:
         FROM events
         GROUP BY reader_id
     """
-    with _connect(db_path) as conn:
+    with _connect(db_path, "last_events_per_reader") as conn:
         rows = conn.execute(sql).fetchall()
     return [dict(r) for r in rows]
 
@@ -192,7 +366,7 @@ def latest_events(db_path: str, limit: int = 20) -> List[Dict[str, Any]]:
         ORDER BY received_at DESC
         LIMIT ?
     """
-    with _connect(db_path) as conn:
+    with _connect(db_path, "latest_events") as conn:
         rows = conn.execute(sql, (limit,)).fetchall()
     return [dict(r) for r in rows]
 
@@ -205,7 +379,7 @@ def events_for_tag(db_path: str, tag: str, limit: int = 20) -> List[Dict[str, An
         ORDER BY received_at DESC
         LIMIT ?
     """
-    with _connect(db_path) as conn:
+    with _connect(db_path, "events_for_tag") as conn:
         rows = conn.execute(sql, (tag, limit)).fetchall()
     return [dict(r) for r in rows]
 
@@ -218,22 +392,38 @@ def events_for_reader(db_path: str, reader_id: str, limit: int = 20) -> List[Dic
         ORDER BY received_at DESC
         LIMIT ?
     """
-    with _connect(db_path) as conn:
+    with _connect(db_path, "events_for_reader") as conn:
         rows = conn.execute(sql, (reader_id, limit)).fetchall()
     return [dict(r) for r in rows]
 
 
+# Well below SQLITE_MAX_VARIABLE_NUMBER (999 on older builds).
+LAST_SEEN_CHUNK = 500
+
+
+def last_seen_rows(db_path: str, tags: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Last received_at and reader_id per tag, queried in chunks of
+    LAST_SEEN_CHUNK tags. Tags never seen are left out.
+    """
+    # SQLite takes bare columns from the row holding MAX(received_at).
+    result: Dict[str, Dict[str, Any]] = {}
+    with _connect(db_path, "last_seen_rows") as conn:
+        for start in range(0, len(tags), LAST_SEEN_CHUNK):
+            chunk = tags[start : start + LAST_SEEN_CHUNK]
+            placeholders = ",".join("?" for _ in chunk)
+            sql = (
+                f"SELECT tag, MAX(received_at) AS last_seen, reader_id FROM events "
+                f"WHERE tag IN ({placeholders}) GROUP BY tag"
+            )
+            for r in conn.execute(sql, chunk).fetchall():
+                if r["last_seen"]:
+                    result[r["tag"]] = {"last_seen": r["last_seen"], "reader_id": r["reader_id"]}
+    return result
+
+
 def last_seen_for_tags(db_path: str, tags: List[str]) -> Dict[str, str]:
-    if not tags:
-        return {}
-    placeholders = ",".join("?" for _ in tags)
-    sql = (
-        f"SELECT tag, MAX(received_at) AS last_seen FROM events "
-        f"WHERE tag IN ({placeholders}) GROUP BY tag"
-    )
-    with _connect(db_path) as conn:
-        rows = conn.execute(sql, tags).fetchall()
-    return {r["tag"]: r["last_seen"] for r in rows if r["last_seen"]}
+    return {tag: row["last_seen"] for tag, row in last_seen_rows(db_path, tags).items()}
 
 
 def recent_errors(db_path: str, limit: int = 10) -> List[Dict[str, Any]]:
@@ -244,6 +434,72 @@ def recent_errors(db_path: str, limit: int = 10) -> List[Dict[str, Any]]:
         ORDER BY received_at DESC
         LIMIT ?
     """
-    with _connect(db_path) as conn:
+    with _connect(db_path, "recent_errors") as conn:
         rows = conn.execute(sql, (limit,)).fetchall()
     return [dict(r) for r in rows]
+
+
+def max_event_id(db_path: str) -> int:
+    with _connect(db_path, "max_event_id", replica=False) as conn:
+        row = conn.execute("SELECT MAX(id) FROM events").fetchone()
+    return int(row[0] or 0)
+
+
+def events_watermark(db_path: str) -> Tuple[Optional[str], int]:
+    """
+    (file id, MAX(id)) of events.db. The file id, device and inode, changes
+    when the file is replaced even if the new MAX(id) happens to match, so
+    caches and incremental indexes over events.id compare both.
+    """
+    try:
+        st = os.stat(db_path)
+        file_id: Optional[str] = f"{st.st_dev}:{st.st_ino}"
+    except OSError:
+        file_id = None
+    return file_id, max_event_id(db_path)
+
+
+def events_after(db_path: str, after_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+    """
+    Return up to limit events with id > after_id in id order.
+    """
+    sql = f"SELECT {EVENT_COLUMNS} FROM events WHERE id > ? ORDER BY id LIMIT ?"
+    with _connect(db_path, "events_after", replica=False) as conn:
+        rows = conn.execute(sql, (after_id, limit)).fetchall()
+    return [dict(r) for r in rows]
+
+
+def aggregate_event_range(db_path: str, after_id: int, upto_id: int) -> List[Dict[str, Any]]:
+    """
+    Aggregate events with after_id < id <= upto_id per (hour, reader, reason).
+    """
+    sql = """
+        SELECT strftime('%Y-%m-%d %H', received_at) AS hour,
+               reader_id,
+               reason,
+               COUNT(*) AS count,
+               SUM(CASE WHEN fired = 1 THEN 1 ELSE 0 END) AS fired_count,
+               MAX(received_at) AS last_event
+        FROM events
+        WHERE id > ? AND id <= ?
+        GROUP BY hour, reader_id, reason
+    """
+    with _connect(db_path, "aggregate_event_range", replica=False) as conn:
+        rows = conn.execute(sql, (after_id, upto_id)).fetchall()
+    return [dict(r) for r in rows]
+
+
+def last_seen_event_range(db_path: str, after_id: int, upto_id: int) -> List[Dict[str, Any]]:
+    """
+    Last received_at and its reader_id per tag for events with
+    after_id < id <= upto_id.
+    """
+    sql = """
+        SELECT tag, MAX(received_at) AS last_seen, reader_id
+        FROM events
+        WHERE id > ? AND id <= ?
+        GROUP BY tag
+    """
+    with _connect(db_path, "last_seen_event_range", replica=False) as conn:
+        rows = conn.execute(sql, (after_id, upto_id)).fetchall()
+    return [dict(r) for r in rows]
@@ -0,0 +1,337 @@
+"""
+Query-plan advisor and sidecar index replica for events.db.
+
+events.db belongs to the nixstrav core and is opened read-only, so its indexes
+are whatever the core created. explain_queries() runs every query in
+services/events.py against a schema-only copy to capture the SQL, then asks the
+real database for EXPLAIN QUERY PLAN and flags full table scans and temporary
+sort B-trees. sync_replica() keeps an indexed copy of the events table,
+appended to by id, which services/events.py reads from once it is active.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import events
+from .events import EventFilters, capture_queries, set_replica
+from .sqlite_pool import close_pool
+
+logger = logging.getLogger(__name__)
+
+# Cover every filter and ORDER BY used in services/events.py.
+REPLICA_INDEXES: Dict[str, str] = {
+    "ix_events_received_at": "received_at, id",
+    "ix_events_reader_received_at": "reader_id, received_at, id",
+    "ix_events_reason_received_at": "reason, received_at, id",
+    "ix_events_tag_received_at": "tag, received_at",
+}
+
+
+@dataclass
+class QueryPlan:
+    name: str
+    sql: str
+    plan: List[str]
+    full_scan: bool
+    temp_btree: bool
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _workload() -> List[Tuple[str, Callable[[str], Any]]]:
+    cursor = events.encode_cursor("2024-01-01T00:00:00", 1)
+    return [
+        ("list_events", lambda p: events.list_events(p, EventFilters())),
+        ("list_events cursor", lambda p: events.list_events(p, EventFilters(cursor=cursor))),
+        ("list_events reader_id", lambda p: events.list_events(p, EventFilters(reader_id="r"))),
+        ("list_events reason", lambda p: events.list_events(p, EventFilters(reason="ok"))),
+        ("list_events tag", lambda p: events.list_events(p, EventFilters(tag="E"))),
+        (
+            "list_events range",
+            lambda p: events.list_events(
+                p, EventFilters(from_ts="2024-01-01T00:00:00", to_ts="2024-01-02T00:00:00")
+            ),
+        ),
+        ("export_events", lambda p: list(events.export_events(p, EventFilters()))),
+        ("events_per_day", events.events_per_day),
+        ("events_per_hour", events.events_per_hour),
+        ("top_reasons", events.top_reasons),
+        ("top_readers", events.top_readers),
+        ("unknown_tags", events.unknown_tags),
+        ("last_events_per_reader", events.last_events_per_reader),
+        ("latest_events", events.latest_events),
+        ("events_for_tag", lambda p: events.events_for_tag(p, "E")),
+        ("events_for_reader", lambda p: events.events_for_reader(p, "r")),
+        ("last_seen_for_tags", lambda p: events.last_seen_for_tags(p, ["E1", "E2"])),
+        ("recent_errors", events.recent_errors),
+        ("max_event_id", events.max_event_id),
+        ("events_after", lambda p: events.events_after(p, 0)),
+        ("aggregate_event_range", lambda p: events.aggregate_event_range(p, 0, 1)),
+        ("last_seen_event_range", lambda p: events.last_seen_event_range(p, 0, 1)),
+    ]
+
+
+def _open_ro(db_path: str) -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+
+def _is_full_scan(detail: str) -> bool:
+    return detail.startswith("SCAN ") and " USING " not in detail and "CONSTANT ROW" not in detail
+
+
+def _capture_sql(schema: List[str]) -> List[Tuple[str, str]]:
+    tmp = tempfile.mkdtemp(prefix="mng-plan-")
+    clone = os.path.join(tmp, "schema.db")
+    try:
+        conn = sqlite3.connect(clone)
+        for sql in schema:
+            conn.execute(sql)
+        conn.commit()
+        conn.close()
+        captured: List[Tuple[str, str]] = []
+        for name, run in _workload():
+            with capture_queries() as log:
+                run(clone)
+            captured.extend((name, sql) for sql in log)
+        return captured
+    finally:
+        close_pool(clone)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def explain_queries(db_path: str) -> List[QueryPlan]:
+    """
+    EXPLAIN QUERY PLAN for every query services/events.py issues, as planned
+    against db_path's own indexes and statistics.
+    """
+    conn = _open_ro(db_path)
+    try:
+        schema = [
+            sql
+            for (sql,) in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE sql IS NOT NULL "
+                "AND name NOT LIKE 'sqlite_%' ORDER BY type = 'index'"
+            )
+        ]
+        if not schema:
+            return []
+        plans: List[QueryPlan] = []
+        seen = set()
+        for name, sql in _capture_sql(schema):
+            if sql in seen:
+                continue
+            seen.add(sql)
+            detail = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+            plans.append(
+                QueryPlan(
+                    name=name,
+                    sql=" ".join(sql.split()),
+                    plan=detail,
+                    full_scan=any(_is_full_scan(d) for d in detail),
+                    temp_btree=any("TEMP B-TREE" in d for d in detail),
+                )
+            )
+        return plans
+    finally:
+        conn.close()
+
+
+def check_query_plans(db_path: str) -> List[QueryPlan]:
+    """
+    Startup check: log one warning listing the events queries that scan the table.
+    """
+    try:
+        plans = explain_queries(db_path)
+    except sqlite3.Error as exc:
+        logger.warning("events query plan check skipped for %s: %s", db_path, exc)
+        return []
+    scans = sorted({plan.name for plan in plans if plan.full_scan})
+    if scans:
+        logger.warning(
+            "%d events queries do full table scans on %s (%s); run `events-explain` "
+            "for plans or set EVENTS_REPLICA_DB to read from an indexed replica",
+            len(scans),
+            db_path,
+            ", ".join(scans),
+        )
+    return plans
+
+
+def _file_id(path: str) -> str:
+    st = os.stat(path)
+    return f"{st.st_dev}:{st.st_ino}"
+
+
+def _meta(conn: sqlite3.Connection, schema: str = "main") -> Dict[str, str]:
+    exists = conn.execute(
+        f"SELECT 1 FROM {schema}.sqlite_master WHERE type = 'table' AND name = 'replica_meta'"
+    ).fetchone()
+    if not exists:
+        return {}
+    return dict(conn.execute(f"SELECT key, value FROM {schema}.replica_meta").fetchall())
+
+
+def replica_matches(source: str, replica: str) -> bool:
+    """
+    True when replica exists and was built from the current source file.
+    """
+    if not os.path.exists(replica) or not os.path.exists(source):
+        return False
+    conn = _open_ro(replica)
+    try:
+        meta = _meta(conn)
+    except sqlite3.Error:
+        return False
+    finally:
+        conn.close()
+    return meta.get("source") == os.path.abspath(source) and meta.get("source_file") == _file_id(
+        source
+    )
+
+
+def sync_replica(
+    source: str, replica: str, batch_size: int = 50000, rebuild: bool = False
+) -> Dict[str, Any]:
+    """
+    Create or advance the sidecar replica of source's events table.
+
+    Rows are appended by id in batches of batch_size. The replica is rebuilt
+    when events.db is replaced (new inode) or its MAX(id) goes backwards, and
+    rows the core pruned from the start of the table are pruned here too.
+    Indexes are created after the initial bulk copy.
+    """
+    source = os.path.abspath(source)
+    file_id = _file_id(source)
+    os.makedirs(os.path.dirname(os.path.abspath(replica)), exist_ok=True)
+    conn = sqlite3.connect(replica, uri=True, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("ATTACH DATABASE ? AS src", (f"file:{source}?mode=ro",))
+        meta = _meta(conn)
+        rebuilt = rebuild or meta.get("source") != source or meta.get("source_file") != file_id
+        if rebuilt:
+            # Readers go back to events.db until the new copy is complete.
+            set_replica(source, None)
+
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("CREATE TABLE IF NOT EXISTS replica_meta (key TEXT PRIMARY KEY, value TEXT)")
+        if rebuilt:
+            conn.execute("DROP TABLE IF EXISTS main.events")
+        created = not conn.execute(
+            "SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = 'events'"
+        ).fetchone()
+        if created:
+            (create_sql,) = conn.execute(
+                "SELECT sql FROM src.sqlite_master WHERE type = 'table' AND name = 'events'"
+            ).fetchone()
+            conn.execute(create_sql)
+        last_id = int(conn.execute("SELECT MAX(id) FROM main.events").fetchone()[0] or 0)
+        src_min, src_max = conn.execute("SELECT MIN(id), MAX(id) FROM src.events").fetchone()
+        src_max = int(src_max or 0)
+        if src_max < last_id:
+            conn.execute("DELETE FROM main.events")
+            last_id = 0
+            rebuilt = True
+        elif src_min is not None:
+            conn.execute("DELETE FROM main.events WHERE id < ?", (src_min,))
+        conn.executemany(
+            "INSERT OR REPLACE INTO replica_meta (key, value) VALUES (?, ?)",
+            [("source", source), ("source_file", file_id)],
+        )
+        conn.execute("COMMIT")
+
+        copied = 0
+        batch = max(1, batch_size)
+        while last_id < src_max:
+            upper = min(src_max, last_id + batch)
+            conn.execute("BEGIN IMMEDIATE")
+            cur = conn.execute(
+                "INSERT INTO main.events SELECT * FROM src.events WHERE id > ? AND id <= ?",
+                (last_id, upper),
+            )
+            copied += max(cur.rowcount, 0)
+            conn.execute(
+                "INSERT OR REPLACE INTO replica_meta (key, value) VALUES ('last_id', ?)",
+                (str(upper),),
+            )
+            conn.execute("COMMIT")
+            last_id = upper
+
+        for name, columns in REPLICA_INDEXES.items():
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON events ({columns})")
+        if created:
+            conn.execute("ANALYZE main")
+        conn.execute("DETACH DATABASE src")
+        return {"copied": copied, "last_id": last_id, "rebuilt": rebuilt}
+    finally:
+        conn.close()
+
+
+class ReplicaSyncer:
+    """
+    Background thread that keeps the sidecar replica in step with events.db
+    and marks it active for reads after each successful sync.
+    """
+
+    def __init__(self, source: str, replica: str, interval: float, batch_size: int) -> None:
+        self.source = source
+        self.replica = replica
+        self.interval = interval
+        self.batch_size = batch_size
+        self.syncs = 0
+        self.errors = 0
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> Optional[Dict[str, Any]]:
+        try:
+            result = sync_replica(self.source, self.replica, self.batch_size)
+        except (OSError, sqlite3.Error) as exc:
+            self.errors += 1
+            self.last_error = str(exc)
+            return None
+        set_replica(self.source, self.replica)
+        self.syncs += 1
+        self.last_result = result
+        return result
+
+    def _loop(self) -> None:
+        while True:
+            self.run_once()
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self) -> None:
+        if replica_matches(self.source, self.replica):
+            set_replica(self.source, self.replica)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="mng-events-replica", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "replica": self.replica,
+            "active": events.replica_for(self.source) is not None,
+            "syncs": self.syncs,
+            "errors": self.errors,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+        }
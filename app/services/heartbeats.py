@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import json
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import SystemNode, SystemReader
+
+NODE_FIELDS = ("node_id", "hostname", "ip", "last_seen", "meta_json")
+READER_FIELDS = ("reader_id", "node_id", "type", "conn", "last_seen", "last_read_at", "meta_json")
+
+
+class HeartbeatBuffer:
+    """
+    In-memory staging for edge-node heartbeats.
+
+    record() merges a heartbeat into the latest node/reader state held in
+    memory (served to /system and the readers API) and marks the rows dirty.
+    Dirty rows are written by one INSERT ... ON CONFLICT DO UPDATE per table
+    in a single transaction when the flush window elapses, so repeated
+    heartbeats from the same node cost one row write per window. A window of
+    0 writes synchronously.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], window_sec: float) -> None:
+        self.session_factory = session_factory
+        self.window_sec = window_sec
+        self.flushes = 0
+        self.received = 0
+        self._loaded = False
+        self._nodes: Dict[str, Dict[str, Any]] = {}
+        self._readers: Dict[str, Dict[str, Any]] = {}
+        self._dirty_nodes: Dict[str, Dict[str, Any]] = {}
+        self._dirty_readers: Dict[str, Dict[str, Any]] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def _ensure_loaded(self) -> None:
+        # Caller holds the lock.
+        if self._loaded:
+            return
+        session = self.session_factory()
+        try:
+            for node in session.scalars(select(SystemNode)):
+                self._nodes[node.node_id] = {f: getattr(node, f) for f in NODE_FIELDS}
+            for reader in session.scalars(select(SystemReader)):
+                self._readers[reader.reader_id] = {f: getattr(reader, f) for f in READER_FIELDS}
+        finally:
+            session.close()
+        self._loaded = True
+
+    def reset(self) -> None:
+        with self._lock:
+            self._loaded = False
+            self._nodes, self._readers = {}, {}
+            self._dirty_nodes, self._dirty_readers = {}, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def record(self, payload: Dict[str, Any]) -> None:
+        """
+        Merge one heartbeat (HeartbeatPayload.dict()). Fields a heartbeat
+        leaves empty keep their previous value, as before.
+        """
+        now = datetime.utcnow()
+        node_id = payload["node_id"]
+        with self._lock:
+            self._ensure_loaded()
+            node = dict(self._nodes.get(node_id) or {"node_id": node_id, "meta_json": None})
+            node["hostname"] = payload.get("hostname")
+            node["ip"] = payload.get("ip")
+            node["last_seen"] = now
+            if payload.get("meta"):
+                node["meta_json"] = json.dumps(payload["meta"])
+            self._nodes[node_id] = node
+            self._dirty_nodes[node_id] = node
+
+            for item in payload.get("readers") or []:
+                reader_id = item["reader_id"]
+                reader = dict(
+                    self._readers.get(reader_id) or {f: None for f in READER_FIELDS}
+                )
+                reader["reader_id"] = reader_id
+                reader["node_id"] = node_id
+                reader["type"] = item.get("type") or reader["type"]
+                reader["conn"] = item.get("conn") or reader["conn"]
+                reader["last_seen"] = now
+                reader["last_read_at"] = item.get("last_read_at") or reader["last_read_at"]
+                if item.get("meta"):
+                    reader["meta_json"] = json.dumps(item["meta"])
+                self._readers[reader_id] = reader
+                self._dirty_readers[reader_id] = reader
+            self.received += 1
+            if self.window_sec > 0 and self._timer is None:
+                self._timer = threading.Timer(self.window_sec, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if self.window_sec <= 0:
+            self.flush()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._dirty_nodes) + len(self._dirty_readers)
+
+    def flush(self) -> int:
+        """
+        Upsert every dirty node and reader in one transaction. Returns the
+        number of rows written.
+        """
+        with self._write_lock:
+            with self._lock:
+                nodes, self._dirty_nodes = self._dirty_nodes, {}
+                readers, self._dirty_readers = self._dirty_readers, {}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not nodes and not readers:
+                return 0
+            session = self.session_factory()
+            try:
+                _upsert(session, SystemNode, "node_id", NODE_FIELDS, list(nodes.values()))
+                _upsert(session, SystemReader, "reader_id", READER_FIELDS, list(readers.values()))
+                session.commit()
+            except Exception:
+                session.rollback()
+                with self._lock:
+                    # Keep anything newer that arrived meanwhile.
+                    self._dirty_nodes = {**nodes, **self._dirty_nodes}
+                    self._dirty_readers = {**readers, **self._dirty_readers}
+                raise
+            finally:
+                session.close()
+            self.flushes += 1
+            return len(nodes) + len(readers)
+
+    def nodes(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._ensure_loaded()
+            return [dict(n) for n in sorted(self._nodes.values(), key=lambda n: n["node_id"])]
+
+    def readers(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            self._ensure_loaded()
+            return {reader_id: dict(r) for reader_id, r in self._readers.items()}
+
+
+def _upsert(
+    session: Session, model: Any, key: str, fields: tuple, rows: List[Dict[str, Any]]
+) -> None:
+    if not rows:
+        return
+    stmt = sqlite_insert(model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={f: getattr(stmt.excluded, f) for f in fields if f != key},
+    )
+    # Stay well below SQLite's bound-variable limit.
+    for i in range(0, len(rows), 100):
+        session.execute(stmt, [{f: row.get(f) for f in fields} for row in rows[i : i + 100]])
+
+
+heartbeat_buffer = HeartbeatBuffer(SessionLocal, settings.heartbeat_flush_window_sec)
@@ -2,16 +2,23 @@ from __future__ import annotations
 
 import fcntl
 import json
+import logging
 import os
 import tempfile
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Optional, Set
 
 from sqlalchemy.orm import Session
 
+from ..config import settings
+from ..database import SessionLocal
 from ..models import Tag
 from .epc import normalize_epc
+from .metrics import known_tags_write_duration
 
+logger = logging.getLogger(__name__)
 
 def read_known_tags_safe(path: Path) -> Dict[str, Any]:
     if not path.exists():
@@ -105,3 +112,81 @@ def persist_db_to_json(session: Session, path: Path) -> None:
             "status": tag.status,
         }
     write_known_tags_atomic(path, payload)
+
+
+class KnownTagsPersister:
+    """
+    Coalesces known_tags.json rewrites.
+
+    schedule() marks a path dirty; the first call starts a timer and every
+    change within window_sec is written by a single persist_db_to_json when
+    it fires. Each write keeps the tmp + fsync + rename semantics. A path
+    whose write fails is logged and stays pending for the next window. A
+    window of 0 writes synchronously.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], window_sec: float) -> None:
+        self.session_factory = session_factory
+        self.window_sec = window_sec
+        self.writes = 0
+        self._pending: Set[Path] = set()
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def schedule(self, path: Path) -> None:
+        if self.window_sec <= 0:
+            self._write(path)
+            return
+        with self._lock:
+            self._pending.add(Path(path))
+            self._start_timer()
+
+    def _start_timer(self) -> None:
+        # Caller holds _lock.
+        if self._timer is None and self.window_sec > 0:
+            self._timer = threading.Timer(self.window_sec, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """
+        Write every pending path now. Returns the number of files written;
+        paths that fail are re-queued and retried after window_sec.
+        """
+        with self._lock:
+            paths, self._pending = self._pending, set()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        failed: Set[Path] = set()
+        for path in paths:
+            try:
+                self._write(path)
+            except Exception:
+                logger.exception("Writing %s failed; retrying in %ss", path, self.window_sec)
+                failed.add(path)
+        if failed:
+            with self._lock:
+                self._pending |= failed
+                self._start_timer()
+        return len(paths) - len(failed)
+
+    def _write(self, path: Path) -> None:
+        with self._write_lock:
+            started = time.perf_counter()
+            session = self.session_factory()
+            try:
+                persist_db_to_json(session, path)
+            finally:
+                session.close()
+            with self._lock:
+                self.writes += 1
+            known_tags_write_duration.observe(time.perf_counter() - started)
+
+
+known_tags_persister = KnownTagsPersister(SessionLocal, settings.known_tags_flush_window_sec)
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ..config import settings
+from .events import last_seen_event_range, last_seen_rows, events_watermark
+
+
+class LastSeenIndex:
+    """
+    Per-EPC last received_at and reader_id for one events.db, held in memory
+    and advanced from an events.id watermark like ReaderState.
+
+    lookup() is O(tags) once the index is warm. Until the first build has
+    finished it answers with chunked IN queries and warms the index in a
+    background thread, so the first /tags after startup does not wait for a
+    pass over every event. If events.db is replaced (new file id) or MAX(id)
+    goes backwards, the index is rebuilt.
+    """
+
+    def __init__(self, db_path: str, refresh_sec: float, batch_size: int) -> None:
+        self.db_path = db_path
+        self.refresh_sec = refresh_sec
+        self.batch_size = max(1, batch_size)
+        self.last_id = 0
+        self.source_file: Optional[str] = None
+        self.refreshes = 0
+        self.applied = 0
+        self.fallbacks = 0
+        self._tags: Dict[str, Dict[str, Any]] = {}
+        self._checked_at: Optional[float] = None
+        self._warming: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def warm(self) -> bool:
+        return self._checked_at is not None
+
+    def _add(self, tag: Optional[str], last_seen: Optional[str], reader_id: Optional[str]) -> None:
+        # Caller holds the lock.
+        if not tag or not last_seen:
+            return
+        current = self._tags.get(tag)
+        if current is None or last_seen >= current["last_seen"]:
+            self._tags[tag] = {"last_seen": last_seen, "reader_id": reader_id}
+
+    def apply(self, after_id: int, rows: List[Dict[str, Any]]) -> bool:
+        """
+        Fold rows, which must be every event with after_id < id <= rows[-1].id
+        (as returned by events_after). Ignored unless after_id is the current
+        watermark.
+        """
+        if not rows:
+            return False
+        with self._lock:
+            if self._checked_at is None or after_id != self.last_id:
+                return False
+            for row in rows:
+                self._add(row["tag"], row["received_at"], row["reader_id"])
+            self.last_id = rows[-1]["id"]
+            self.applied += len(rows)
+        return True
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Advance the index to the current MAX(id) and return the watermark.
+        Skipped when the last check is younger than refresh_sec.
+        """
+        with self._refresh_lock:
+            with self._lock:
+                fresh = (
+                    self._checked_at is not None
+                    and time.monotonic() - self._checked_at < self.refresh_sec
+                )
+            if fresh and not force:
+                return self.last_id
+            source_file, max_id = events_watermark(self.db_path)
+            with self._lock:
+                if source_file is not None and (
+                    source_file != self.source_file or max_id < self.last_id
+                ):
+                    # First build, or events.db was replaced or truncated.
+                    self._tags, self.last_id = {}, 0
+                    self.source_file = source_file
+                last = self.last_id
+            while last < max_id:
+                upper = min(max_id, last + self.batch_size)
+                rows = last_seen_event_range(self.db_path, last, upper)
+                with self._lock:
+                    if self.last_id != last:
+                        # apply() advanced the watermark meanwhile; continue from there.
+                        last = self.last_id
+                        continue
+                    for row in rows:
+                        self._add(row["tag"], row["last_seen"], row["reader_id"])
+                    self.last_id = last = upper
+            with self._lock:
+                self._checked_at = time.monotonic()
+                self.refreshes += 1
+            return self.last_id
+
+    def warm_up(self) -> None:
+        """
+        Build the index in a background thread unless that already started.
+        """
+        with self._lock:
+            if self._warming is not None and self._warming.is_alive():
+                return
+            self._warming = threading.Thread(
+                target=self.refresh, kwargs={"force": True}, name="mng-last-seen", daemon=True
+            )
+            self._warming.start()
+
+    def lookup(self, tags: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        {tag: {"last_seen", "reader_id"}} for the given tags that were seen.
+        """
+        if not self.warm:
+            self.warm_up()
+            self.fallbacks += 1
+            return last_seen_rows(self.db_path, tags)
+        self.refresh()
+        with self._lock:
+            return {tag: dict(self._tags[tag]) for tag in tags if tag in self._tags}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "warm": self.warm,
+            "last_id": self.last_id,
+            "tags": len(self._tags),
+            "refreshes": self.refreshes,
+            "applied": self.applied,
+            "fallbacks": self.fallbacks,
+        }
+
+
+_indexes: Dict[str, LastSeenIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_last_seen_index(db_path: str) -> LastSeenIndex:
+    """
+    Return the shared last-seen index for db_path, creating it on first use.
+    """
+    key = os.path.abspath(db_path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = LastSeenIndex(
+                key,
+                refresh_sec=settings.last_seen_refresh_sec,
+                batch_size=settings.rollup_batch_size,
+            )
+            _indexes[key] = index
+    return index
+
+
+def reset_last_seen_indexes() -> None:
+    with _indexes_lock:
+        _indexes.clear()
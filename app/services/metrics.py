@@ -0,0 +1,367 @@
+"""
+In-process metrics in the Prometheus text format.
+
+Request timings come from MetricsMiddleware (pure ASGI, so streaming
+responses are not buffered), query timings from the sqlite3 hook used by
+services/events.py and the SQLAlchemy hooks installed on the mng.db engine.
+Queries slower than SLOW_QUERY_MS are logged together with their EXPLAIN
+QUERY PLAN. Counters kept elsewhere (cf601d, executor pools, audit writer,
+...) are added at scrape time by the collectors passed to render().
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (name, type, help, [(labels, value)]) as produced by collectors.
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def lines(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        key = tuple(str(v) for v in labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: Any) -> float:
+        return self._values.get(tuple(str(v) for v in labels), 0.0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: Any, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, *labels: Any) -> None:
+        key = tuple(str(v) for v in labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: Any) -> int:
+        series = self._series.get(tuple(str(v) for v in labels))
+        return series[2] if series else 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        out: List[str] = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return out
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _add(self, metric: _Metric) -> Any:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def reset(self) -> None:
+        for metric in self._metrics.values():
+            metric.clear()
+
+    def render(self, families: Iterable[Family] = ()) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines += metric.header() + metric.lines()
+        for name, kind, help_text, samples in families:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests_in_progress = registry.gauge(
+    "nixstrav_http_requests_in_progress", "HTTP requests being served.", ["method"]
+)
+http_request_duration = registry.histogram(
+    "nixstrav_http_request_duration_seconds",
+    "HTTP request duration by route template, until the response body is sent.",
+    ["method", "route", "status"],
+)
+db_query_duration = registry.histogram(
+    "nixstrav_db_query_duration_seconds",
+    "Query duration; events queries are named after their services/events.py function.",
+    ["db", "query"],
+)
+db_slow_queries = registry.counter(
+    "nixstrav_db_slow_queries_total", "Queries slower than SLOW_QUERY_MS.", ["db", "query"]
+)
+cf601d_request_duration = registry.histogram(
+    "nixstrav_cf601d_request_duration_seconds",
+    "cf601d calls including retries, by endpoint and outcome.",
+    ["endpoint", "outcome"],
+)
+known_tags_write_duration = registry.histogram(
+    "nixstrav_known_tags_write_duration_seconds", "persist_db_to_json rewrites of known_tags.json."
+)
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request from the first byte received to the last body
+    chunk sent and labels it with the matched route template, so
+    /tags/{epc} is one series rather than one per EPC. Unmatched requests
+    (404s, static files) share the route label "other".
+    """
+
+    def __init__(self, app: Callable) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or not settings.metrics_enabled:
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = [500]
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_progress.dec(method)
+            route = getattr(scope.get("route"), "path", None) or "other"
+            http_request_duration.observe(time.perf_counter() - started, method, route, status[0])
+
+
+def _slow_query(db: str, query: str, elapsed: float, sql: str, plan: List[str]) -> None:
+    db_slow_queries.inc(db, query)
+    logger.warning(
+        "slow %s query %s: %.1f ms\n%s\nEXPLAIN QUERY PLAN:\n%s",
+        db,
+        query,
+        elapsed * 1000,
+        sql.strip(),
+        "\n".join(plan) or "(none)",
+    )
+
+
+def _plan(rows: Iterable[Sequence[Any]]) -> List[str]:
+    return [str(row[-1]) for row in rows]
+
+
+@contextmanager
+def timed_sqlite(
+    conn: sqlite3.Connection,
+    db: str,
+    query: str,
+    log: Optional[List[str]] = None,
+    timed: bool = True,
+) -> Iterator[sqlite3.Connection]:
+    """
+    Time the use of a borrowed sqlite3 connection as one named query. The
+    trace callback collects the statements run (and feeds log, if given),
+    so a slow query can be explained on the same connection. With
+    timed=False only log is fed.
+    """
+    if not (timed and settings.metrics_enabled):
+        if log is not None:
+            conn.set_trace_callback(log.append)
+        try:
+            yield conn
+        finally:
+            if log is not None:
+                conn.set_trace_callback(None)
+        return
+    statements: List[str] = []
+
+    def trace(sql: str) -> None:
+        statements.append(sql)
+        if log is not None:
+            log.append(sql)
+
+    conn.set_trace_callback(trace)
+    started = time.perf_counter()
+    try:
+        yield conn
+    finally:
+        elapsed = time.perf_counter() - started
+        conn.set_trace_callback(None)
+        db_query_duration.observe(elapsed, db, query)
+        if settings.slow_query_ms and elapsed * 1000 >= settings.slow_query_ms:
+            selects = [s for s in statements if s.lstrip().upper().startswith(("SELECT", "WITH"))]
+            sql = "\n".join(statements) or "(no statements)"
+            plan: List[str] = []
+            for statement in selects[:3]:
+                try:
+                    plan += _plan(conn.execute("EXPLAIN QUERY PLAN " + statement).fetchall())
+                except sqlite3.Error as exc:
+                    plan.append(f"(explain failed: {exc})")
+            _slow_query(db, query, elapsed, sql, plan)
+
+
+_TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+[\"`]?(\w+)", re.IGNORECASE)
+
+
+def statement_name(statement: str) -> str:
+    """
+    "SELECT tags", "INSERT audit_log", ...: verb and first table, a label
+    with bounded cardinality for ORM-generated SQL.
+    """
+    verb = (statement.lstrip().split(None, 1) or ["?"])[0].upper()
+    match = _TABLE_RE.search(statement)
+    return f"{verb} {match.group(1)}" if match else verb
+
+
+def instrument_engine(target: Engine, db: str = "mng") -> None:
+    """
+    Time every statement run on target and explain slow SELECTs.
+    """
+
+    @event.listens_for(target, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(target, "handle_error")
+    def _error(context) -> None:
+        stack = context.connection.info.get("query_started") if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+    @event.listens_for(target, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+        stack = conn.info.get("query_started")
+        if not stack:
+            return
+        elapsed = time.perf_counter() - stack.pop()
+        if not settings.metrics_enabled:
+            return
+        name = statement_name(statement)
+        db_query_duration.observe(elapsed, db, name)
+        if not settings.slow_query_ms or elapsed * 1000 < settings.slow_query_ms:
+            return
+        plan: List[str] = []
+        if not executemany and statement.lstrip().upper().startswith("SELECT"):
+            try:
+                rows = cursor.connection.execute("EXPLAIN QUERY PLAN " + statement, parameters or ())
+                plan = _plan(rows.fetchall())
+            except sqlite3.Error as exc:
+                plan = [f"(explain failed: {exc})"]
+        _slow_query(db, name, elapsed, statement, plan)
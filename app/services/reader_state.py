@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ..config import settings
+from .events import aggregate_event_range, events_watermark
+
+
+class ReaderState:
+    """
+    Per-reader event counters (last_event, fired_count, total) for one
+    events.db, held in memory and advanced from an events.id watermark.
+
+    refresh() only aggregates events past the watermark, at most once per
+    refresh_sec; the live-tail poller also feeds the batches it has already
+    read through apply(). Reading the state is O(readers). If events.db is
+    replaced (new file id) or MAX(id) goes backwards, the counters are
+    rebuilt.
+    """
+
+    def __init__(self, db_path: str, refresh_sec: float, batch_size: int) -> None:
+        self.db_path = db_path
+        self.refresh_sec = refresh_sec
+        self.batch_size = max(1, batch_size)
+        self.last_id = 0
+        self.source_file: Optional[str] = None
+        self.refreshes = 0
+        self.applied = 0
+        self._readers: Dict[str, Dict[str, Any]] = {}
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def _add(self, reader_id: Optional[str], count: int, fired: int, last: Optional[str]) -> None:
+        # Caller holds the lock.
+        state = self._readers.setdefault(
+            reader_id or "",
+            {"reader_id": reader_id, "last_event": None, "fired_count": 0, "total": 0},
+        )
+        state["total"] += count
+        state["fired_count"] += fired
+        if last and (state["last_event"] is None or last > state["last_event"]):
+            state["last_event"] = last
+
+    def apply(self, after_id: int, rows: List[Dict[str, Any]]) -> bool:
+        """
+        Fold rows, which must be every event with after_id < id <= rows[-1].id
+        (as returned by events_after). Ignored unless after_id is the current
+        watermark.
+        """
+        if not rows:
+            return False
+        with self._lock:
+            if self._checked_at is None or after_id != self.last_id:
+                return False
+            for row in rows:
+                self._add(row["reader_id"], 1, 1 if row.get("fired") == 1 else 0, row["received_at"])
+            self.last_id = rows[-1]["id"]
+            self.applied += len(rows)
+        return True
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Advance the counters to the current MAX(id) and return the watermark.
+        Skipped when the last check is younger than refresh_sec.
+        """
+        with self._refresh_lock:
+            with self._lock:
+                fresh = (
+                    self._checked_at is not None
+                    and time.monotonic() - self._checked_at < self.refresh_sec
+                )
+            if fresh and not force:
+                return self.last_id
+            source_file, max_id = events_watermark(self.db_path)
+            with self._lock:
+                if source_file is not None and (
+                    source_file != self.source_file or max_id < self.last_id
+                ):
+                    # First build, or events.db was replaced or truncated.
+                    self._readers, self.last_id = {}, 0
+                    self.source_file = source_file
+                last = self.last_id
+            while last < max_id:
+                upper = min(max_id, last + self.batch_size)
+                rows = aggregate_event_range(self.db_path, last, upper)
+                with self._lock:
+                    if self.last_id != last:
+                        # apply() advanced the watermark meanwhile; continue from there.
+                        last = self.last_id
+                        continue
+                    for row in rows:
+                        self._add(row["reader_id"], row["count"], row["fired_count"] or 0, row["last_event"])
+                    self.last_id = last = upper
+            with self._lock:
+                self._checked_at = time.monotonic()
+                self.refreshes += 1
+            return self.last_id
+
+    def readers(self) -> List[Dict[str, Any]]:
+        self.refresh()
+        with self._lock:
+            return [dict(r) for _, r in sorted(self._readers.items())]
+
+
+_states: Dict[str, ReaderState] = {}
+_states_lock = threading.Lock()
+
+
+def get_reader_state(db_path: str) -> ReaderState:
+    """
+    Return the shared reader state for db_path, creating it on first use.
+    """
+    key = os.path.abspath(db_path)
+    with _states_lock:
+        state = _states.get(key)
+        if state is None:
+            state = ReaderState(
+                key,
+                refresh_sec=settings.reader_state_refresh_sec,
+                batch_size=settings.rollup_batch_size,
+            )
+            _states[key] = state
+    return state
+
+
+def reset_reader_states() -> None:
+    with _states_lock:
+        _states.clear()
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import delete, func, inspect, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import EventRollup, RollupState
+from .events import aggregate_event_range, events_watermark
+
+STATE_NAME = "events"
+
+# (dimension, key) -> [count, fired_count, last_event]
+Buckets = Dict[Tuple[str, str], List[Any]]
+
+_refresh_lock = threading.Lock()
+
+
+def _fold(rows: List[Dict[str, Any]]) -> Buckets:
+    buckets: Buckets = {}
+
+    def add(dimension: str, key: str, row: Dict[str, Any]) -> None:
+        bucket = buckets.setdefault((dimension, key), [0, 0, None])
+        bucket[0] += row["count"]
+        bucket[1] += row["fired_count"] or 0
+        last = row["last_event"]
+        if last and (bucket[2] is None or last > bucket[2]):
+            bucket[2] = last
+
+    for row in rows:
+        if row["hour"]:
+            add("hour", row["hour"], row)
+            add("day", row["hour"][:10], row)
+        add("reader", row["reader_id"] or "", row)
+        add("reason", row["reason"] or "", row)
+    return buckets
+
+
+def _upsert(session: Session, buckets: Buckets) -> None:
+    if not buckets:
+        return
+    values = [
+        {
+            "dimension": dimension,
+            "key": key,
+            "count": count,
+            "fired_count": fired,
+            "last_event": last,
+        }
+        for (dimension, key), (count, fired, last) in buckets.items()
+    ]
+    stmt = sqlite_insert(EventRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[EventRollup.dimension, EventRollup.key],
+        set_={
+            "count": EventRollup.count + stmt.excluded.count,
+            "fired_count": EventRollup.fired_count + stmt.excluded.fired_count,
+            "last_event": func.max(
+                func.coalesce(EventRollup.last_event, ""),
+                func.coalesce(stmt.excluded.last_event, ""),
+            ),
+        },
+    )
+    # Stay well below SQLite's bound-variable limit.
+    for i in range(0, len(values), 150):
+        session.execute(stmt, values[i : i + 150])
+
+
+def ensure_rollup_state(bind: Engine) -> None:
+    """
+    create_all does not add columns; give an existing rollup_state the
+    source_file column. Rows without it are rebuilt on the next refresh.
+    """
+    columns = {c["name"] for c in inspect(bind).get_columns("rollup_state")}
+    if "source_file" not in columns:
+        with bind.begin() as conn:
+            conn.execute(text("ALTER TABLE rollup_state ADD COLUMN source_file VARCHAR(64)"))
+
+
+def _reset(session: Session, events_db: str, source_file: str | None) -> RollupState:
+    session.execute(delete(EventRollup))
+    state = session.get(RollupState, STATE_NAME)
+    if state is None:
+        state = RollupState(name=STATE_NAME, source=events_db, last_event_id=0)
+        session.add(state)
+    state.source = events_db
+    state.source_file = source_file
+    state.last_event_id = 0
+    state.updated_at = datetime.utcnow()
+    session.commit()
+    return state
+
+
+def refresh_rollups(session: Session, events_db: str) -> int:
+    """
+    Advance the rollup tables from the stored events.id watermark and return
+    the new watermark. Only events newer than the watermark are scanned; the
+    tables are rebuilt when events.db is replaced (new file id) or its
+    MAX(id) goes backwards.
+    """
+    with _refresh_lock:
+        state = session.get(RollupState, STATE_NAME)
+        source_file, max_id = events_watermark(events_db)
+        if source_file is None:
+            # events.db is missing for now; keep what has been rolled up.
+            return state.last_event_id if state is not None else 0
+        if (
+            state is None
+            or state.source != events_db
+            or state.source_file != source_file
+            or max_id < state.last_event_id
+        ):
+            state = _reset(session, events_db, source_file)
+        batch = max(1, settings.rollup_batch_size)
+        while state.last_event_id < max_id:
+            last = state.last_event_id
+            upper = min(max_id, last + batch)
+            claimed = session.execute(
+                update(RollupState)
+                .where(RollupState.name == STATE_NAME, RollupState.last_event_id == last)
+                .values(last_event_id=upper, updated_at=datetime.utcnow())
+            )
+            if claimed.rowcount != 1:
+                # Another worker advanced the watermark first.
+                session.rollback()
+                break
+            _upsert(session, _fold(aggregate_event_range(events_db, last, upper)))
+            session.commit()
+            session.refresh(state)
+        return state.last_event_id
+
+
+def _rows(session: Session, dimension: str, order_by, limit: int | None = None):
+    stmt = select(EventRollup).where(EventRollup.dimension == dimension).order_by(order_by)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return session.scalars(stmt).all()
+
+
+def rollup_events_per_day(session: Session, days: int = 14) -> List[Dict[str, Any]]:
+    rows = _rows(session, "day", EventRollup.key.desc(), days)
+    return [{"day": r.key, "count": r.count} for r in rows]
+
+
+def rollup_events_per_hour(session: Session, days: int = 7) -> List[Dict[str, Any]]:
+    cutoff = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d %H")
+    hour = func.substr(EventRollup.key, 12, 2).label("hour")
+    stmt = (
+        select(hour, func.sum(EventRollup.count).label("count"))
+        .where(EventRollup.dimension == "hour", EventRollup.key >= cutoff)
+        .group_by(hour)
+        .order_by(hour)
+    )
+    return [{"hour": h, "count": int(c)} for h, c in session.execute(stmt).all()]
+
+
+def rollup_top_reasons(session: Session, limit: int = 5) -> List[Dict[str, Any]]:
+    rows = _rows(session, "reason", EventRollup.count.desc(), limit)
+    return [{"reason": r.key or None, "count": r.count} for r in rows]
+
+
+def rollup_top_readers(session: Session, limit: int = 5) -> List[Dict[str, Any]]:
+    rows = _rows(session, "reader", EventRollup.count.desc(), limit)
+    return [{"reader_id": r.key or None, "count": r.count} for r in rows]
+
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from ..config import settings
+
+# Maps unit names to their `systemctl is-active` state ("active", "inactive", ...).
+Backend = Callable[[List[str]], Awaitable[Dict[str, str]]]
+
+
+async def systemctl_backend(units: List[str], timeout: float = 5.0) -> Dict[str, str]:
+    """
+    One `systemctl is-active unit...` per probe; it prints one state per unit,
+    in argument order.
+    """
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "systemctl",
+            "is-active",
+            *units,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except FileNotFoundError:
+        return {unit: "systemctl-not-found" for unit in units}
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return {unit: "timeout" for unit in units}
+    lines = out.decode().splitlines()
+    fallback = (err.decode().strip().splitlines() or ["unknown"])[-1]
+    return {
+        unit: (lines[i].strip() if i < len(lines) else fallback) for i, unit in enumerate(units)
+    }
+
+
+class StubBackend:
+    """
+    Backend for tests and hosts without systemd: every unit reports the state
+    set in states, "active" by default.
+    """
+
+    def __init__(self, states: Optional[Dict[str, str]] = None) -> None:
+        self.states: Dict[str, str] = dict(states or {})
+        self.calls = 0
+
+    async def __call__(self, units: List[str]) -> Dict[str, str]:
+        self.calls += 1
+        return {unit: self.states.get(unit, "active") for unit in units}
+
+
+class ServiceProber:
+    """
+    Probes a fixed list of systemd units on an interval from a task on the
+    event loop and caches the result, so /system and the services API never
+    fork a process. Every change of a unit's state is kept in a bounded
+    transition history.
+    """
+
+    def __init__(
+        self,
+        units: List[str],
+        backend: Backend,
+        interval_sec: float = 10.0,
+        history_size: int = 200,
+    ) -> None:
+        self.units = units
+        self.backend = backend
+        self.interval_sec = interval_sec
+        self.probes = 0
+        self.errors = 0
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=max(1, history_size))
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def reset(self) -> None:
+        self._status = {}
+        self.history.clear()
+
+    async def probe_once(self) -> List[Dict[str, Any]]:
+        try:
+            states = await self.backend(self.units)
+        except Exception as exc:
+            self.errors += 1
+            states = {unit: f"error: {exc}" for unit in self.units}
+        now = datetime.utcnow()
+        for unit in self.units:
+            raw = states.get(unit, "unknown")
+            previous = self._status.get(unit)
+            if previous is None or previous["raw"] != raw:
+                self.history.append(
+                    {
+                        "name": unit,
+                        "from": previous["raw"] if previous else None,
+                        "to": raw,
+                        "at": now,
+                    }
+                )
+                since = now
+            else:
+                since = previous["since"]
+            self._status[unit] = {
+                "name": unit,
+                "active": raw == "active",
+                "raw": raw,
+                "checked_at": now,
+                "since": since,
+            }
+        self.probes += 1
+        return self.snapshot()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [dict(self._status[unit]) for unit in self.units if unit in self._status]
+
+    async def statuses(self) -> List[Dict[str, Any]]:
+        """
+        Cached unit states; probes once first if nothing has been probed yet.
+        """
+        if len(self._status) < len(self.units):
+            return await self.probe_once()
+        return self.snapshot()
+
+    def transitions(self, limit: int = 50) -> List[Dict[str, Any]]:
+        return list(reversed(self.history))[:limit]
+
+    async def _run(self) -> None:
+        while True:
+            await self.probe_once()
+            await asyncio.sleep(self.interval_sec)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+def _backend() -> Backend:
+    if settings.service_probe_backend == "stub":
+        return StubBackend()
+    return systemctl_backend
+
+
+service_prober = ServiceProber(
+    [unit.strip() for unit in settings.service_probe_units.split(",") if unit.strip()],
+    _backend(),
+    interval_sec=settings.service_probe_interval_sec,
+    history_size=settings.service_probe_history_size,
+)
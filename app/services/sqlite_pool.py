@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from ..config import settings
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection that remembers which file generation it was opened on.
+    """
+
+    generation: int = 0
+
+
+class ReadOnlyPool:
+    """
+    Thread-safe pool of read-only sqlite3 connections to a single file.
+
+    Connections are opened with mode=ro, carry a prepared-statement cache and
+    the configured cache/mmap pragmas. When the file is replaced on disk
+    (different inode), idle connections are dropped and in-flight ones are
+    closed on release, so readers never keep serving a rotated-away file.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_idle: int = 4,
+        cache_size_kib: int = 16384,
+        mmap_size: int = 0,
+        cached_statements: int = 128,
+    ) -> None:
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self.generation = 0
+        self._file_id: Optional[Tuple[int, int]] = None
+        self._idle: List[PooledConnection] = []
+        self._lock = threading.Lock()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.db_path)
+        except OSError:
+            return None
+        return (st.st_dev, st.st_ino)
+
+    def _open(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            factory=PooledConnection,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = 1")
+        conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_kib)}")
+        if self.mmap_size:
+            conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        return conn
+
+    def _check_rotation(self) -> List[PooledConnection]:
+        # Caller holds the lock. Returns stale idle connections to close.
+        file_id = self._stat()
+        if file_id == self._file_id:
+            return []
+        self._file_id = file_id
+        self.generation += 1
+        stale, self._idle = self._idle, []
+        return stale
+
+    def acquire(self) -> PooledConnection:
+        with self._lock:
+            stale = self._check_rotation()
+            conn = self._idle.pop() if self._idle else None
+            generation = self.generation
+        for old in stale:
+            old.close()
+        if conn is None:
+            conn = self._open()
+            conn.generation = generation
+        return conn
+
+    def release(self, conn: PooledConnection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if conn.generation == self.generation and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self.generation += 1
+        for conn in idle:
+            conn.close()
+
+
+_pools: Dict[str, ReadOnlyPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> ReadOnlyPool:
+    """
+    Return the shared read-only pool for db_path, creating it on first use.
+    """
+    key = os.path.abspath(db_path)
+    pool = _pools.get(key)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ReadOnlyPool(
+                key,
+                max_idle=settings.events_pool_size,
+                cache_size_kib=settings.events_cache_size_kib,
+                mmap_size=settings.events_mmap_size,
+                cached_statements=settings.events_cached_statements,
+            )
+            _pools[key] = pool
+    return pool
+
+
+def close_pool(db_path: str) -> None:
+    with _pools_lock:
+        pool = _pools.pop(os.path.abspath(db_path), None)
+    if pool is not None:
+        pool.close()
+
+
+def close_all_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -1,52 +1,77 @@
-import subprocess
-from datetime import datetime
-from typing import Any, Dict, List
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 
 from ..config import settings
-from .events import last_events_per_reader, recent_errors
+from .events import recent_errors
+from .reader_state import get_reader_state
 
 
-def check_service_status(service_name: str) -> Dict[str, Any]:
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Heartbeats are naive UTC; events.db timestamps may carry an offset.
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _parse_event_ts(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
     try:
-        result = subprocess.run(
-            ["systemctl", "is-active", service_name],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            check=False,
-            text=True,
-        )
-        status = result.stdout.strip() or result.stderr.strip()
-        return {"name": service_name, "active": status == "active", "raw": status}
-    except FileNotFoundError:
-        return {"name": service_name, "active": False, "raw": "systemctl-not-found"}
+        return _naive_utc(datetime.fromisoformat(value))
+    except ValueError:
+        return None
 
 
-def reader_status_heuristic(events_db: str) -> List[Dict[str, Any]]:
-    readers = last_events_per_reader(events_db)
-    now = datetime.utcnow()
-    warn_sec = settings.reader_warn_sec
-    offline_sec = settings.reader_offline_sec
+def _activity_state(last_seen: Optional[datetime]) -> Dict[str, str]:
+    if last_seen is None:
+        return {"state": "unknown", "status": "UNKNOWN"}
+    delta = (datetime.utcnow() - last_seen).total_seconds()
+    if delta < settings.reader_warn_sec:
+        return {"state": "green", "status": "OK"}
+    if delta < settings.reader_offline_sec:
+        return {"state": "yellow", "status": "WARN"}
+    return {"state": "red", "status": "OFFLINE"}
+
+
+def reader_status(events_db: str, heartbeats: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Reader health from the in-memory event counters and the latest heartbeat.
+    The state follows the most recent of the last event and the heartbeat;
+    readers only known from heartbeats are listed with their heartbeat age.
+    """
+    readers = get_reader_state(events_db).readers()
     for r in readers:
-        last = r.get("last_event")
-        if last:
-            try:
-                dt = datetime.fromisoformat(last)
-                delta = (now - dt).total_seconds()
-                if delta < warn_sec:
-                    r["state"] = "green"
-                    r["status"] = "OK"
-                elif delta < offline_sec:
-                    r["state"] = "yellow"
-                    r["status"] = "WARN"
-                else:
-                    r["state"] = "red"
-                    r["status"] = "OFFLINE"
-            except Exception:
-                r["state"] = "unknown"
-                r["status"] = "UNKNOWN"
-        else:
-            r["state"] = "unknown"
-            r["status"] = "UNKNOWN"
+        activity = _parse_event_ts(r.get("last_event"))
+        hb = heartbeats.get(r["reader_id"])
+        if hb:
+            r.update(
+                node_id=hb["node_id"],
+                type=hb["type"],
+                conn=hb["conn"],
+                heartbeat_at=hb["last_seen"],
+                last_read_at=hb["last_read_at"],
+            )
+            heartbeat = _naive_utc(hb["last_seen"])
+            if heartbeat and (activity is None or heartbeat > activity):
+                activity = heartbeat
+        r.update(_activity_state(activity))
+    known = {r["reader_id"] for r in readers}
+    for reader_id in sorted(set(heartbeats) - known):
+        hb = heartbeats[reader_id]
+        readers.append(
+            {
+                "reader_id": reader_id,
+                "last_event": None,
+                "fired_count": 0,
+                "total": 0,
+                "node_id": hb["node_id"],
+                "type": hb["type"],
+                "conn": hb["conn"],
+                "heartbeat_at": hb["last_seen"],
+                "last_read_at": hb["last_read_at"],
+                **_activity_state(_naive_utc(hb["last_seen"])),
+            }
+        )
     return readers
 
 
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models import Tag, User
+from . import audit
+from .alias_generator import alias_allocator
+from .epc import normalize_epc
+
+TAG_FIELDS = ("alias", "alias_group", "room_number", "notes", "status")
+
+
+class BulkPayloadError(ValueError):
+    pass
+
+
+def parse_bulk_payload(body: str, content_type: str, max_rows: int) -> List[Dict[str, Any]]:
+    """
+    Parse CSV (with a header row) or NDJSON into a list of row dicts.
+    """
+    if "csv" in content_type:
+        reader = csv.DictReader(io.StringIO(body))
+        if not reader.fieldnames or "epc" not in [f.strip() for f in reader.fieldnames]:
+            raise BulkPayloadError("CSV header must contain an 'epc' column")
+        rows = [
+            {(k or "").strip(): (v.strip() if isinstance(v, str) else v) for k, v in r.items()}
+            for r in reader
+        ]
+    else:
+        rows = []
+        for lineno, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise BulkPayloadError(f"Line {lineno}: invalid JSON") from exc
+            if not isinstance(row, dict):
+                raise BulkPayloadError(f"Line {lineno}: expected an object")
+            rows.append(row)
+    if len(rows) > max_rows:
+        raise BulkPayloadError(f"Too many rows (max {max_rows})")
+    return rows
+
+
+def _clean(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _fields(tag: Tag) -> Dict[str, Any]:
+    return {field: getattr(tag, field) for field in TAG_FIELDS}
+
+
+def _existing_tags(session: Session, epcs: List[str]) -> Dict[str, Tag]:
+    found: Dict[str, Tag] = {}
+    for i in range(0, len(epcs), 500):
+        chunk = epcs[i : i + 500]
+        for tag in session.scalars(select(Tag).where(Tag.epc.in_(chunk))):
+            found[tag.epc] = tag
+    return found
+
+
+def _alias_owners(session: Session, aliases: List[str]) -> Dict[str, str]:
+    owners: Dict[str, str] = {}
+    for i in range(0, len(aliases), 500):
+        chunk = aliases[i : i + 500]
+        for epc, alias in session.execute(select(Tag.epc, Tag.alias).where(Tag.alias.in_(chunk))):
+            owners[alias] = epc
+    return owners
+
+
+def import_tags(
+    session: Session,
+    user: Optional[User],
+    rows: List[Dict[str, Any]],
+    upsert: bool = False,
+    dry_run: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Validate and apply many tag rows in one transaction.
+
+    Returns one result per input row with status created/updated/unchanged
+    or error. Invalid rows are reported and skipped; valid rows, together
+    with their audit entries, are committed in a single commit.
+    """
+    canonical = [normalize_epc(_clean(r.get("epc"))) for r in rows]
+    existing = _existing_tags(session, sorted({c for c in canonical if c}))
+    alias_owner = _alias_owners(
+        session, sorted({a for a in (_clean(r.get("alias")) for r in rows) if a})
+    )
+    # Aliases reserved in the allocator by this batch, and aliases it frees.
+    reserved: List[str] = []
+    released: List[str] = []
+    seen: set[str] = set()
+    results: List[Dict[str, Any]] = []
+    audit_entries: List[Dict[str, Any]] = []
+
+    for index, (row, epc) in enumerate(zip(rows, canonical), start=1):
+        result: Dict[str, Any] = {"row": index, "epc": epc or _clean(row.get("epc"))}
+        results.append(result)
+        if not epc:
+            result.update(status="error", error="Invalid EPC")
+            continue
+        if epc in seen:
+            result.update(status="error", error="Duplicate EPC in payload")
+            continue
+        seen.add(epc)
+        values = {field: _clean(row.get(field)) for field in TAG_FIELDS if field in row}
+        alias = values.get("alias")
+        if alias and alias_owner.get(alias, epc) != epc:
+            result.update(status="error", error="Alias already exists")
+            continue
+
+        tag = existing.get(epc)
+        if tag is not None:
+            if not upsert:
+                result.update(status="error", error="Tag already exists")
+                continue
+            before = _fields(tag)
+            for field, value in values.items():
+                if field == "alias" and not value:
+                    continue
+                if field == "status":
+                    value = value or tag.status
+                setattr(tag, field, value)
+            after = _fields(tag)
+            if after == before:
+                result.update(status="unchanged", alias=tag.alias)
+                continue
+            if after["alias"] != before["alias"]:
+                alias_owner.pop(before["alias"], None)
+                alias_owner[after["alias"]] = epc
+                alias_allocator.claim(after["alias"])
+                reserved.append(after["alias"])
+                released.append(before["alias"])
+            result.update(status="updated", alias=tag.alias)
+            audit_entries.append(
+                dict(action="tag_update", entity_type="tag", entity_id=epc, before=before, after=after)
+            )
+            continue
+
+        group = values.get("alias_group")
+        if alias:
+            alias_allocator.claim(alias)
+        else:
+            alias = alias_allocator.allocate(session, group)
+        reserved.append(alias)
+        tag = Tag(
+            epc=epc,
+            alias=alias,
+            alias_group=group,
+            room_number=values.get("room_number"),
+            notes=values.get("notes"),
+            status=values.get("status") or "active",
+        )
+        session.add(tag)
+        alias_owner[alias] = epc
+        result.update(status="created", alias=alias)
+        audit_entries.append(
+            dict(action="tag_create", entity_type="tag", entity_id=epc, after=_fields(tag))
+        )
+
+    if dry_run:
+        session.rollback()
+        for alias in reserved:
+            alias_allocator.release(alias)
+        return results
+    audit.add_actions(session, user, audit_entries)
+    try:
+        session.commit()
+    except Exception:
+        session.rollback()
+        for alias in reserved:
+            alias_allocator.release(alias)
+        raise
+    for alias in released:
+        alias_allocator.release(alias)
+    return results
@@ -0,0 +1,210 @@
+"""
+Server-side aggregation of cf601d tag reads for enrollment.
+
+cf601d only answers "which tags has the inventory seen so far" with a running
+read count per EPC. TagReadStream polls that list once for every connected
+enrollment page, turns count increments into reads, and keeps per-EPC state in
+a sliding window: an EPC is confirmed after confirm_reads reads within
+window_sec (the "3 confirmations in 3s" rule) and lost when it stops being
+read for a whole window. Subscribers only receive EPCs whose state or counters
+changed since the previous poll.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set
+
+from ..config import settings
+from .cf601 import Cf601Unavailable, cf601_client
+from .epc import normalize_epc
+from .event_stream import format_sse
+
+
+class TagReadState:
+    def __init__(self, epc: str, now: float) -> None:
+        self.epc = epc
+        self.first_seen = now
+        self.last_seen = now
+        self.count = 0
+        self.rssi: Optional[float] = None
+        self.max_rssi: Optional[float] = None
+        self.ant: Optional[int] = None
+        self.reads: Deque[float] = deque()
+        self.status: Optional[str] = None
+        self.source_counts = 0
+        self.source_ts: Any = None
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            "epc": self.epc,
+            "state": self.status,
+            "reads_in_window": len(self.reads),
+            "count": self.count,
+            "rssi": self.rssi,
+            "max_rssi": self.max_rssi,
+            "ant": self.ant,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "age_sec": round(now - self.last_seen, 3),
+        }
+
+
+class TagReadAggregator:
+    """
+    Per-EPC counters over the reads reported by cf601d. ingest() returns the
+    EPCs that changed; entries idle for forget_sec are dropped.
+    """
+
+    def __init__(self, window_sec: float = 3.0, confirm_reads: int = 3, forget_sec: float = 60.0) -> None:
+        self.window_sec = window_sec
+        self.confirm_reads = max(1, confirm_reads)
+        self.forget_sec = forget_sec
+        self.tags: Dict[str, TagReadState] = {}
+
+    def ingest(self, tags: List[Dict[str, Any]], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        now = time.time() if now is None else now
+        changed: Dict[str, TagReadState] = {}
+        for item in tags:
+            epc = normalize_epc(str(item.get("epc") or "").replace(" ", ""))
+            if not epc:
+                continue
+            state = self.tags.get(epc)
+            if state is None:
+                state = self.tags[epc] = TagReadState(epc, now)
+            counts = int(item.get("counts") or 0)
+            if counts:
+                if counts < state.source_counts:
+                    # Inventory was restarted; its counters start again from zero.
+                    state.source_counts = 0
+                new_reads = counts - state.source_counts
+                state.source_counts = counts
+            else:
+                # No counter: a new read timestamp is one read.
+                new_reads = 1 if item.get("ts") != state.source_ts else 0
+                state.source_ts = item.get("ts")
+            if new_reads <= 0:
+                continue
+            state.count += new_reads
+            state.reads.extend([now] * min(new_reads, self.confirm_reads))
+            state.last_seen = now
+            if item.get("rssi") is not None:
+                state.rssi = float(item["rssi"])
+                state.max_rssi = state.rssi if state.max_rssi is None else max(state.max_rssi, state.rssi)
+            state.ant = item.get("ant", state.ant)
+            changed[epc] = state
+
+        for epc, state in list(self.tags.items()):
+            while state.reads and now - state.reads[0] > self.window_sec:
+                state.reads.popleft()
+            if len(state.reads) >= self.confirm_reads or (state.status == "confirmed" and state.reads):
+                status = "confirmed"
+            else:
+                status = "pending" if state.reads else "lost"
+            if status != state.status:
+                state.status = status
+                changed[epc] = state
+            if now - state.last_seen > self.forget_sec:
+                del self.tags[epc]
+        return [state.to_dict(now) for state in changed.values()]
+
+    def snapshot(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        now = time.time() if now is None else now
+        return [
+            state.to_dict(now)
+            for state in sorted(self.tags.values(), key=lambda s: -s.last_seen)
+            if state.reads
+        ]
+
+
+class TagReadStream:
+    """
+    One cf601d poller shared by every enrollment stream. Starts with the first
+    subscriber and stops with the last; subscribers get batches of changed
+    EPCs and a status message whenever cf601d becomes (un)reachable.
+    """
+
+    def __init__(self, aggregator: TagReadAggregator, poll_sec: float, queue_size: int = 100) -> None:
+        self.aggregator = aggregator
+        self.poll_sec = poll_sec
+        self.queue_size = queue_size
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.available: Optional[bool] = None
+        self.polls = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, self.queue_size))
+        self.subscribers.add(queue)
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self.subscribers.discard(queue)
+
+    def publish(self, kind: str, data: Any) -> None:
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait((kind, data))
+            except asyncio.QueueFull:
+                # A stalled page only misses intermediate updates; the next
+                # change of the same EPC carries the full state again.
+                pass
+
+    async def poll_once(self) -> None:
+        try:
+            data = await cf601_client.post(settings.cf601d_tags_endpoint)
+            error = None
+        except Cf601Unavailable as exc:
+            data, error = None, str(exc)
+        except Exception as exc:
+            data, error = None, f"cf601d error: {exc}"
+        self.polls += 1
+        available = data is not None
+        if available != self.available:
+            self.available = available
+            self.publish("status", {"ok": available, "error": error})
+        # Ingest even without data so reads age out of the window.
+        changed = self.aggregator.ingest((data or {}).get("tags") or [])
+        if changed:
+            self.publish("tags", changed)
+
+    async def _run(self) -> None:
+        while self.subscribers:
+            await self.poll_once()
+            await asyncio.sleep(self.poll_sec)
+        self.available = None
+
+
+async def tag_read_events(stream: TagReadStream, queue: asyncio.Queue, keepalive_sec: float) -> AsyncIterator[str]:
+    """
+    text/event-stream body: current EPCs first, then "tags" and "status"
+    events as the shared poller produces them.
+    """
+    try:
+        yield "retry: 3000\n\n"
+        snapshot = stream.aggregator.snapshot()
+        if snapshot:
+            yield format_sse(snapshot, "tags")
+        while True:
+            try:
+                kind, data = await asyncio.wait_for(queue.get(), keepalive_sec)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(data, kind)
+    finally:
+        stream.unsubscribe(queue)
+
+
+tag_read_stream = TagReadStream(
+    TagReadAggregator(
+        window_sec=settings.enroll_confirm_window_sec,
+        confirm_reads=settings.enroll_confirm_reads,
+    ),
+    poll_sec=settings.enroll_stream_poll_sec,
+)
@@ -0,0 +1,200 @@
+"""
+Paginated, filtered and full-text searchable tag registry.
+
+tags_fts is an external-content FTS5 index over tags (epc, alias, room_number,
+notes) kept in sync by triggers, so every writer (ORM, bulk import,
+known_tags.json sync) updates it without knowing about it. Search terms are
+matched as prefixes, which also covers EPC prefixes. Without FTS5 in the
+SQLite build, search falls back to LIKE.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, func, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DatabaseError, OperationalError
+from sqlalchemy.orm import Session
+
+from ..models import Tag
+
+logger = logging.getLogger(__name__)
+
+FTS_COLUMNS = ("epc", "alias", "room_number", "notes")
+
+SORT_FIELDS = {
+    "alias": Tag.alias,
+    "epc": Tag.epc,
+    "status": Tag.status,
+    "alias_group": Tag.alias_group,
+    "room_number": Tag.room_number,
+    "created_at": Tag.created_at,
+    "updated_at": Tag.updated_at,
+}
+
+MAX_PAGE_SIZE = 200
+
+_COLS = ", ".join(FTS_COLUMNS)
+_NEW = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+_OLD = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+FTS_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS tags_fts USING fts5(
+        {_COLS}, content='tags', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tags_fts_ai AFTER INSERT ON tags BEGIN
+        INSERT INTO tags_fts(rowid, {_COLS}) VALUES (new.rowid, {_NEW});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tags_fts_ad AFTER DELETE ON tags BEGIN
+        INSERT INTO tags_fts(tags_fts, rowid, {_COLS}) VALUES ('delete', old.rowid, {_OLD});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tags_fts_au AFTER UPDATE OF {_COLS} ON tags BEGIN
+        INSERT INTO tags_fts(tags_fts, rowid, {_COLS}) VALUES ('delete', old.rowid, {_OLD});
+        INSERT INTO tags_fts(rowid, {_COLS}) VALUES (new.rowid, {_NEW});
+    END
+    """,
+]
+
+# Whether tags_fts exists, per database URL.
+_fts_ready: Dict[str, bool] = {}
+
+
+@dataclass
+class TagFilters:
+    q: Optional[str] = None
+    status: Optional[str] = None
+    alias_group: Optional[str] = None
+    room_number: Optional[str] = None
+    sort: str = "alias"
+    order: str = "asc"
+    page: int = 1
+    # None returns every match (the unpaginated GET /api/v1/tags).
+    page_size: Optional[int] = 50
+
+
+@dataclass
+class TagPage:
+    items: List[Tag]
+    total: int
+    page: int
+    page_size: Optional[int]
+
+    @property
+    def pages(self) -> int:
+        if not self.page_size:
+            return 1
+        return max(1, -(-self.total // self.page_size))
+
+
+def ensure_tag_search(bind: Engine) -> bool:
+    """
+    Create the tags_fts index, its triggers and the filter indexes. The FTS
+    index is rebuilt from tags when it fails the integrity check (first run,
+    or rowids renumbered by VACUUM). Returns False if FTS5 is unavailable.
+    """
+    for index in Tag.__table__.indexes:
+        index.create(bind=bind, checkfirst=True)
+    key = str(bind.url)
+    try:
+        with bind.begin() as conn:
+            for sql in FTS_SCHEMA:
+                conn.exec_driver_sql(sql)
+    except OperationalError as exc:
+        logger.warning("FTS5 unavailable, tag search falls back to LIKE: %s", exc)
+        _fts_ready[key] = False
+        return False
+    try:
+        with bind.begin() as conn:
+            conn.exec_driver_sql("INSERT INTO tags_fts(tags_fts, rank) VALUES ('integrity-check', 1)")
+    except DatabaseError:
+        logger.info("Rebuilding tags_fts")
+        with bind.begin() as conn:
+            conn.exec_driver_sql("INSERT INTO tags_fts(tags_fts) VALUES ('rebuild')")
+    _fts_ready[key] = True
+    return True
+
+
+def _fts_available(session: Session) -> bool:
+    bind = session.get_bind()
+    key = str(bind.url)
+    if key not in _fts_ready:
+        _fts_ready[key] = (
+            session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tags_fts'")
+            ).first()
+            is not None
+        )
+    return _fts_ready[key]
+
+
+def _terms(q: str) -> List[str]:
+    return re.findall(r"\w+", q)
+
+
+def match_expression(q: str) -> Optional[str]:
+    """
+    FTS5 query matching every term of q as a prefix, in any column.
+    """
+    terms = _terms(q)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def _search_clause(session: Session, q: str):
+    if _fts_available(session):
+        expr = match_expression(q)
+        if expr is None:
+            return None
+        return text("tags.rowid IN (SELECT rowid FROM tags_fts WHERE tags_fts MATCH :fts_q)").bindparams(
+            fts_q=expr
+        )
+    terms = _terms(q)
+    if not terms:
+        return None
+    columns = [Tag.epc, Tag.alias, Tag.room_number, Tag.notes]
+    return and_(*[or_(*[col.ilike(f"%{term}%") for col in columns]) for term in terms])
+
+
+def search_tags(session: Session, filters: TagFilters) -> TagPage:
+    """
+    One page of tags matching filters, with the total number of matches;
+    every match when filters.page_size is None. Raises ValueError for an
+    unknown sort field or order.
+    """
+    sort_column = SORT_FIELDS.get(filters.sort)
+    if sort_column is None or filters.order not in ("asc", "desc"):
+        raise ValueError(f"Invalid sort: {filters.sort} {filters.order}")
+    page_size = None if filters.page_size is None else max(1, min(filters.page_size, MAX_PAGE_SIZE))
+    page = 1 if page_size is None else max(1, filters.page)
+
+    clauses = []
+    if filters.status:
+        clauses.append(Tag.status == filters.status)
+    if filters.alias_group:
+        clauses.append(Tag.alias_group == filters.alias_group)
+    if filters.room_number:
+        clauses.append(Tag.room_number == filters.room_number)
+    if filters.q:
+        search = _search_clause(session, filters.q)
+        if search is not None:
+            clauses.append(search)
+
+    total = session.scalar(select(func.count()).select_from(Tag).where(*clauses)) or 0
+    ordering = sort_column.desc() if filters.order == "desc" else sort_column.asc()
+    stmt = select(Tag).where(*clauses).order_by(ordering, Tag.epc)
+    if page_size is not None:
+        stmt = stmt.limit(page_size).offset((page - 1) * page_size)
+    return TagPage(items=list(session.scalars(stmt).all()), total=total, page=page, page_size=page_size)
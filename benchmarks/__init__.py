@@ -0,0 +1,7 @@
+"""
+Synthetic-data benchmarks for services/events.py and the HTTP API.
+
+fixtures builds deterministic events.db / known_tags.json files, suite times
+the event queries and HTTP endpoints and compares them with stored baselines.
+Run through `python -m benchmarks` or the bench* Makefile targets.
+"""
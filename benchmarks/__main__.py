@@ -0,0 +1,97 @@
+"""
+python -m benchmarks generate|run --profile small|1m|10m
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from .fixtures import PROFILES, ensure_fixtures, profile_with
+
+ROOT = Path(__file__).resolve().parents[1]
+BASELINES = Path(__file__).resolve().parent / "baselines"
+
+
+def _profile(args: argparse.Namespace):
+    return profile_with(
+        args.profile,
+        events=args.events,
+        tags=args.tags,
+        readers=args.readers,
+        days=args.days,
+        unknown_ratio=args.unknown_ratio,
+        skew=args.skew,
+        seed=args.seed,
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("command", choices=["generate", "run"])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small")
+    parser.add_argument("--data-dir", type=Path, default=ROOT / "data" / "bench")
+    parser.add_argument("--events", type=int)
+    parser.add_argument("--tags", type=int)
+    parser.add_argument("--readers", type=int)
+    parser.add_argument("--days", type=int)
+    parser.add_argument("--unknown-ratio", type=float)
+    parser.add_argument("--skew", type=float)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--only", choices=["micro", "http"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", type=Path, help="default: benchmarks/baselines/<profile>.json")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, as a fraction")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore slowdowns smaller than this")
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    profile = _profile(args)
+    customized = profile != PROFILES[args.profile]
+    name = args.profile + ("-custom" if customized else "")
+    events_db, known_tags = ensure_fixtures(args.data_dir, name, profile)
+    print(f"fixtures: {events_db} ({profile.events} events), {known_tags} ({profile.tags} tags)")
+    if args.command == "generate":
+        return 0
+
+    from . import suite
+
+    suite.configure_env(events_db, known_tags, args.data_dir / name / "run")
+    results = []
+    if args.only in (None, "micro"):
+        results += suite.micro_benchmarks(str(events_db), profile, args.repeat)
+    if args.only in (None, "http"):
+        results += suite.http_benchmarks(profile, args.repeat)
+    report = suite.report(name, profile, results)
+    if args.output:
+        suite.save_report(args.output, report)
+
+    baseline_path = args.baseline or BASELINES / f"{name}.json"
+    if args.save_baseline:
+        suite.save_report(baseline_path, report)
+        print(suite.format_table(suite.compare(results, {}, args.threshold)))
+        print(f"baseline written to {baseline_path}")
+        return 0
+    baseline = suite.load_baseline(baseline_path)
+    if baseline is None:
+        print(suite.format_table(suite.compare(results, {}, args.threshold)))
+        print(f"no baseline at {baseline_path}; run with --save-baseline to store one")
+        return 0
+    if baseline.get("fixture") != profile.to_dict():
+        print(f"warning: {baseline_path} was recorded on a different fixture", file=sys.stderr)
+    rows = suite.compare(results, baseline, args.threshold, args.min_delta_ms)
+    print(suite.format_table(rows))
+    regressions = [row["name"] for row in rows if row["regressed"]]
+    if regressions:
+        print(
+            f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
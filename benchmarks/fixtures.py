@@ -0,0 +1,194 @@
+"""
+Deterministic synthetic events.db and known_tags.json fixtures.
+
+Events are appended in id order with received_at increasing over the time
+span, like the nixstrav core writes them. Tag popularity follows a Zipf
+distribution (skew), each tag is mostly read by its home reader, a fraction
+of reads come from EPCs missing from the whitelist (unknown_tag), and the
+remaining reasons are drawn from fixed weights. The same profile and seed
+always produce the same files.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import random
+import sqlite3
+from dataclasses import asdict, dataclass, field, replace
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+EVENTS_SCHEMA = """
+    CREATE TABLE events (
+        id INTEGER PRIMARY KEY,
+        reader_id TEXT,
+        tag TEXT,
+        ts_client TEXT,
+        received_at TEXT,
+        source_ip TEXT,
+        fired INTEGER,
+        reason TEXT
+    )
+"""
+
+# Reasons of whitelisted reads; reads of unknown EPCs are always unknown_tag.
+DEFAULT_REASONS = {"ok": 0.70, "cooldown": 0.24, "relay_error": 0.03, "inactive": 0.03}
+
+
+@dataclass(frozen=True)
+class FixtureProfile:
+    events: int
+    tags: int
+    readers: int
+    days: int
+    unknown_tags: int = 500
+    unknown_ratio: float = 0.02
+    skew: float = 1.1
+    home_reader_ratio: float = 0.8
+    reasons: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_REASONS))
+    end: str = "2025-01-01T00:00:00"
+    seed: int = 42
+
+    def to_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+PROFILES: Dict[str, FixtureProfile] = {
+    "small": FixtureProfile(events=100_000, tags=2_000, readers=8, days=30),
+    "1m": FixtureProfile(events=1_000_000, tags=20_000, readers=16, days=90),
+    "10m": FixtureProfile(events=10_000_000, tags=50_000, readers=32, days=365),
+}
+
+BATCH = 50_000
+
+
+def profile_with(name: str, **overrides: object) -> FixtureProfile:
+    """
+    PROFILES[name] with the non-None overrides applied.
+    """
+    return replace(PROFILES[name], **{k: v for k, v in overrides.items() if v is not None})
+
+
+def known_epc(i: int) -> str:
+    return f"E2801160{i:016X}"
+
+
+def unknown_epc(i: int) -> str:
+    return f"E2009999{i:016X}"
+
+
+def reader_id(i: int) -> str:
+    return f"r{i + 1:02d}"
+
+
+def _zipf_cum_weights(n: int, skew: float) -> List[float]:
+    return list(itertools.accumulate(1.0 / (rank ** skew) for rank in range(1, n + 1)))
+
+
+def _ts(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def generate_known_tags(path: Path, profile: FixtureProfile) -> None:
+    """
+    Write known_tags.json with profile.tags whitelisted EPCs.
+    """
+    from app.services.alias_generator import FRUIT_NAMES, TREE_NAMES
+
+    rng = random.Random(profile.seed)
+    payload: Dict[str, Dict[str, object]] = {}
+    for i in range(profile.tags):
+        group = "male_tree" if i % 2 == 0 else "female_fruit"
+        pool = TREE_NAMES if group == "male_tree" else FRUIT_NAMES
+        n = i // 2
+        alias = pool[n % len(pool)] if n < len(pool) else f"{pool[n % len(pool)]}-{n // len(pool) + 1}"
+        payload[known_epc(i)] = {
+            "alias": alias,
+            "alias_group": group,
+            "room_number": str(rng.randint(1, 60)),
+            "notes": rng.choice(["przy oknie", "korytarz", "magazyn", None, None, None]),
+            "status": "active" if rng.random() < 0.95 else rng.choice(["inactive", "lost"]),
+        }
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _event_rows(profile: FixtureProfile):
+    rng = random.Random(profile.seed)
+    cum_known = _zipf_cum_weights(profile.tags, profile.skew)
+    cum_unknown = _zipf_cum_weights(max(1, profile.unknown_tags), profile.skew)
+    reasons = list(profile.reasons)
+    cum_reasons = list(itertools.accumulate(profile.reasons.values()))
+    homes = [rng.randrange(profile.readers) for _ in range(profile.tags)]
+    end = datetime.fromisoformat(profile.end)
+    start = end - timedelta(days=profile.days)
+    step = profile.days * 86400 / max(1, profile.events)
+    for event_id in range(1, profile.events + 1):
+        received = start + timedelta(seconds=(event_id - 1) * step)
+        if rng.random() < profile.unknown_ratio:
+            tag = unknown_epc(rng.choices(range(len(cum_unknown)), cum_weights=cum_unknown)[0])
+            reader = rng.randrange(profile.readers)
+            reason = "unknown_tag"
+        else:
+            idx = rng.choices(range(profile.tags), cum_weights=cum_known)[0]
+            tag = known_epc(idx)
+            reader = homes[idx] if rng.random() < profile.home_reader_ratio else rng.randrange(profile.readers)
+            reason = rng.choices(reasons, cum_weights=cum_reasons)[0]
+        client = received - timedelta(milliseconds=rng.randint(5, 900))
+        yield (
+            event_id,
+            reader_id(reader),
+            tag,
+            _ts(client),
+            _ts(received),
+            f"192.168.67.{100 + reader}",
+            1 if reason == "ok" else 0,
+            reason,
+        )
+
+
+def generate_events_db(path: Path, profile: FixtureProfile) -> None:
+    """
+    Write events.db with profile.events rows, replacing any existing file.
+    """
+    tmp = path.with_suffix(".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(EVENTS_SCHEMA)
+        rows = _event_rows(profile)
+        while True:
+            batch = list(itertools.islice(rows, BATCH))
+            if not batch:
+                break
+            conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+
+
+def ensure_fixtures(directory: Path, name: str, profile: FixtureProfile) -> Tuple[Path, Path]:
+    """
+    (events.db, known_tags.json) for profile under directory/name, generated
+    only when missing or built from different parameters.
+    """
+    target = directory / name
+    target.mkdir(parents=True, exist_ok=True)
+    events_db = target / "events.db"
+    known_tags = target / "known_tags.json"
+    meta_path = target / "fixture.json"
+    meta = profile.to_dict()
+    current = json.loads(meta_path.read_text()) if meta_path.exists() else None
+    if current != meta or not events_db.exists() or not known_tags.exists():
+        generate_known_tags(known_tags, profile)
+        generate_events_db(events_db, profile)
+        meta_path.write_text(json.dumps(meta, indent=2))
+    return events_db, known_tags
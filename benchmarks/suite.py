@@ -0,0 +1,274 @@
+"""
+Microbenchmarks of services/events.py and end-to-end HTTP runs against the
+ASGI app, with baseline comparison.
+
+app.config reads the environment once, on first import, so the runner points
+MNG_DB, NIXSTRAV_EVENTS_DB and NIXSTRAV_KNOWN_TAGS_JSON at the fixtures before
+anything under app/ is imported; every app import here is deferred for that
+reason.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .fixtures import FixtureProfile, known_epc, reader_id
+
+
+@dataclass
+class Result:
+    name: str
+    group: str
+    runs: int
+    median_ms: float
+    p95_ms: float
+    min_ms: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def measure(name: str, group: str, fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Result:
+    for _ in range(warmup):
+        fn()
+    samples: List[float] = []
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return Result(
+        name=name,
+        group=group,
+        runs=len(samples),
+        median_ms=round(statistics.median(samples), 3),
+        p95_ms=round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        min_ms=round(samples[0], 3),
+    )
+
+
+def configure_env(events_db: Path, known_tags: Path, work_dir: Path) -> None:
+    """
+    Point the app at the fixtures, with a fresh mng.db. Must run before
+    app.config is imported.
+    """
+    work_dir.mkdir(parents=True, exist_ok=True)
+    mng_db = work_dir / "mng.db"
+    for suffix in ("", "-wal", "-shm"):
+        path = Path(str(mng_db) + suffix)
+        if path.exists():
+            path.unlink()
+    known_copy = work_dir / "known_tags.json"
+    known_copy.write_bytes(known_tags.read_bytes())
+    os.environ.update(
+        {
+            "MNG_DB": str(mng_db),
+            "NIXSTRAV_EVENTS_DB": str(events_db),
+            "NIXSTRAV_KNOWN_TAGS_JSON": str(known_copy),
+            "SERVICE_PROBE_BACKEND": "stub",
+            "EVENTS_PLAN_CHECK": "false",
+            "EVENTS_COUNT_CACHE_SEC": "0",
+            "DEV_INSECURE_COOKIES": "true",
+        }
+    )
+
+
+def _end_day(events_db: str) -> Tuple[str, str]:
+    from app.services.events import latest_events
+
+    last = latest_events(events_db, limit=1)[0]["received_at"]
+    return last[:10] + "T00:00:00", last
+
+
+def micro_benchmarks(events_db: str, profile: FixtureProfile, repeat: int) -> List[Result]:
+    from app.services import events
+    from app.services.events import EventFilters
+    from app.services.last_seen import LastSeenIndex
+    from app.services.reader_state import ReaderState
+
+    day_start, day_end = _end_day(events_db)
+    first = events.list_events(events_db, EventFilters(page_size=50))
+    whitelist = [known_epc(i) for i in range(profile.tags)]
+    hot_tag, reader = known_epc(0), reader_id(0)
+
+    def cold_index(cls):
+        return lambda: cls(events_db, refresh_sec=0, batch_size=50_000).refresh(force=True)
+
+    cases: List[Tuple[str, Callable[[], Any], int]] = [
+        ("list_events first page", lambda: events.list_events(events_db, EventFilters(page_size=50)), repeat),
+        ("list_events page 20", lambda: events.list_events(events_db, EventFilters(page=20, page_size=50)), repeat),
+        (
+            "list_events cursor",
+            lambda: events.list_events(events_db, EventFilters(page_size=50, cursor=first.next_cursor)),
+            repeat,
+        ),
+        ("list_events reader_id", lambda: events.list_events(events_db, EventFilters(reader_id=reader)), repeat),
+        ("list_events reason", lambda: events.list_events(events_db, EventFilters(reason="relay_error")), repeat),
+        ("list_events tag", lambda: events.list_events(events_db, EventFilters(tag=hot_tag)), repeat),
+        (
+            "list_events last day",
+            lambda: events.list_events(events_db, EventFilters(from_ts=day_start, to_ts=day_end)),
+            repeat,
+        ),
+        (
+            "export_events last day",
+            lambda: sum(1 for _ in events.export_events(events_db, EventFilters(from_ts=day_start))),
+            repeat,
+        ),
+        ("count_events all", lambda: events.count_events(events_db, EventFilters()), repeat),
+        ("events_per_day", lambda: events.events_per_day(events_db), repeat),
+        ("events_per_hour", lambda: events.events_per_hour(events_db), repeat),
+        ("top_reasons", lambda: events.top_reasons(events_db), repeat),
+        ("top_readers", lambda: events.top_readers(events_db), repeat),
+        ("unknown_tags", lambda: events.unknown_tags(events_db), repeat),
+        ("last_events_per_reader", lambda: events.last_events_per_reader(events_db), repeat),
+        ("latest_events", lambda: events.latest_events(events_db), repeat),
+        ("events_for_tag", lambda: events.events_for_tag(events_db, hot_tag), repeat),
+        ("events_for_reader", lambda: events.events_for_reader(events_db, reader), repeat),
+        ("last_seen_rows whitelist", lambda: events.last_seen_rows(events_db, whitelist), repeat),
+        ("max_event_id", lambda: events.max_event_id(events_db), repeat),
+        # One full pass each; single runs keep 10M profiles tractable.
+        ("ReaderState build", cold_index(ReaderState), 1),
+        ("LastSeenIndex build", cold_index(LastSeenIndex), 1),
+    ]
+    return [measure(name, "micro", fn, runs, warmup=1 if runs > 1 else 0) for name, fn, runs in cases]
+
+
+def http_benchmarks(profile: FixtureProfile, repeat: int) -> List[Result]:
+    import re
+
+    from fastapi.testclient import TestClient
+
+    results: List[Result] = []
+    started = time.perf_counter()
+    from app.main import app
+
+    client = TestClient(app, base_url="https://testserver")
+    client.__enter__()
+    try:
+        startup_ms = round((time.perf_counter() - started) * 1000, 3)
+        results.append(Result("startup", "http", 1, startup_ms, startup_ms, startup_ms))
+        page = client.get("/login")
+        token = re.search(r'name="csrf_token" value="([^"]+)"', page.text).group(1)
+        login = client.post(
+            "/login",
+            data={"username": "admin", "password": "admin", "csrf_token": token},
+            follow_redirects=False,
+        )
+        if login.status_code != 302:
+            raise RuntimeError(f"login failed: {login.status_code}")
+
+        def get(path: str, **params: Any) -> Callable[[], Any]:
+            def run() -> None:
+                resp = client.get(path, params=params)
+                if resp.status_code != 200:
+                    raise RuntimeError(f"GET {path} {params}: {resp.status_code}")
+
+            return run
+
+        day_start = _end_day(os.environ["NIXSTRAV_EVENTS_DB"])[0]
+        cases = [
+            ("GET /api/v1/events", get("/api/v1/events", page_size=50)),
+            ("GET /api/v1/events reader_id", get("/api/v1/events", reader_id=reader_id(0))),
+            ("GET /api/v1/events export ndjson day", get("/api/v1/events", export="ndjson", from_ts=day_start)),
+            ("GET /api/v1/events/stats/overview", get("/api/v1/events/stats/overview")),
+            ("GET /api/v1/tags", get("/api/v1/tags", page_size=50)),
+            ("GET /api/v1/tags last page", get("/api/v1/tags", page_size=50, page=max(1, profile.tags // 50))),
+            ("GET /api/v1/tags q", get("/api/v1/tags", q="Jodla")),
+            ("GET /api/v1/tags/{epc}", get(f"/api/v1/tags/{known_epc(0)}")),
+            ("GET / (dashboard)", get("/")),
+            ("GET /tags", get("/tags")),
+            ("GET /events", get("/events")),
+            ("GET /system", get("/system")),
+        ]
+        results.extend(measure(name, "http", fn, repeat) for name, fn in cases)
+    finally:
+        client.__exit__(None, None, None)
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    import sqlite3
+
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def report(
+    profile_name: str, profile: FixtureProfile, results: List[Result]
+) -> Dict[str, Any]:
+    return {
+        "profile": profile_name,
+        "fixture": profile.to_dict(),
+        "environment": environment(),
+        "results": {r.name: r.to_dict() for r in results},
+    }
+
+
+def compare(
+    results: List[Result],
+    baseline: Dict[str, Any],
+    threshold: float,
+    min_delta_ms: float = 2.0,
+) -> List[Dict[str, Any]]:
+    """
+    One row per result with its baseline median and ratio. A result
+    regresses when its median exceeds the baseline by more than threshold
+    (a fraction) and by more than min_delta_ms, which keeps sub-millisecond
+    noise out.
+    """
+    rows = []
+    base_results = baseline.get("results", {})
+    for r in results:
+        base: Optional[Dict[str, Any]] = base_results.get(r.name)
+        base_ms = base["median_ms"] if base else None
+        ratio = r.median_ms / base_ms if base_ms else None
+        regressed = (
+            base_ms is not None
+            and r.median_ms > base_ms * (1 + threshold)
+            and r.median_ms - base_ms > min_delta_ms
+        )
+        rows.append(
+            {
+                "name": r.name,
+                "group": r.group,
+                "median_ms": r.median_ms,
+                "baseline_ms": base_ms,
+                "ratio": round(ratio, 3) if ratio is not None else None,
+                "regressed": regressed,
+            }
+        )
+    return rows
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'benchmark':<42} {'median ms':>11} {'baseline':>11} {'ratio':>7}"]
+    for row in rows:
+        base = f"{row['baseline_ms']:.3f}" if row["baseline_ms"] is not None else "-"
+        ratio = f"{row['ratio']:.2f}" if row["ratio"] is not None else "-"
+        flag = "  REGRESSION" if row["regressed"] else ""
+        lines.append(f"{row['name']:<42} {row['median_ms']:>11.3f} {base:>11} {ratio:>7}{flag}")
+    return "\n".join(lines)
+
+
+def load_baseline(path: Path) -> Optional[Dict[str, Any]]:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def save_report(path: Path, data: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
@@ -1,6 +1,47 @@
+import sqlite3
 import sys
 from pathlib import Path
 
+import pytest
+
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+
+def _make_events_db(path, count=25):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        """
+        CREATE TABLE events (
+            id INTEGER PRIMARY KEY,
+            reader_id TEXT,
+            tag TEXT,
+            ts_client TEXT,
+            received_at TEXT,
+            source_ip TEXT,
+            fired INTEGER,
+            reason TEXT
+        )
+        """
+    )
+    rows = []
+    for i in range(1, count + 1):
+        # pairs of events share a timestamp to exercise the id tie-breaker
+        ts = f"2024-01-01T00:{i // 2:02d}:00"
+        reader = "r1" if i % 2 else "r2"
+        reason = "ok" if i % 3 else "unknown_tag"
+        rows.append((i, reader, f"E{i:03d}", ts, ts, "10.0.0.1", i % 2, reason))
+    conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+@pytest.fixture
+def make_events_db():
+    """
+    make_events_db(path, count=25) creates an events.db with count rows in
+    the core's schema and returns its path as a string.
+    """
+    return _make_events_db
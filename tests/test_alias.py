@@ -11,3 +11,43 @@ def test_generate_alias_picks_first_free():
     existing = {TREE_NAMES[0]}
     alias = generate_alias("male_tree", existing)
     assert alias == TREE_NAMES[1]
+
+
+def test_allocator_matches_generate_alias_and_reuses_released(tmp_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import Base
+    from app.models import Tag
+    from app.services.alias_generator import AliasAllocator
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'mng.db'}", future=True)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, future=True)()
+    session.add_all(
+        [
+            Tag(epc="E1", alias=TREE_NAMES[0]),
+            Tag(epc="E2", alias=TREE_NAMES[2]),
+            Tag(epc="E3", alias="Custom"),
+        ]
+    )
+    session.commit()
+
+    allocator = AliasAllocator()
+    existing = {TREE_NAMES[0], TREE_NAMES[2], "Custom"}
+    for _ in range(len(TREE_NAMES) + 3):
+        expected = generate_alias("male_tree", existing)
+        assert allocator.suggest(session, "male_tree") == expected
+        assert allocator.allocate(session, "male_tree") == expected
+        existing.add(expected)
+
+    allocator.release(TREE_NAMES[5])
+    allocator.release(f"{TREE_NAMES[1]}-2")
+    assert allocator.allocate(session, None) == TREE_NAMES[5]
+    assert allocator.allocate(session, "male_tree") == f"{TREE_NAMES[1]}-2"
+
+    # Aliases committed elsewhere are skipped on the indexed lookup.
+    session.add(Tag(epc="E4", alias="Jagoda"))
+    session.commit()
+    assert allocator.allocate(session, "female_fruit") == "Truskawka"
+    session.close()
@@ -0,0 +1,88 @@
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import AuditLog
+from app.services import audit
+from app.services.audit import AuditWriter, _row, ensure_audit_indexes, query_audit
+
+
+def test_audit_writer_batches_and_queries(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mng.db'}", future=True)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, future=True)
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+
+    writer = AuditWriter(Session, batch_size=100, interval_sec=5, queue_size=1000)
+    for i in range(30):
+        writer.submit(
+            _row(None, "tag_update" if i % 3 else "login", entity_type="tag", entity_id=f"E{i % 5}")
+        )
+    writer.flush()
+    assert writer.written == 30
+    assert len(commits) == 1
+
+    session = Session()
+    page = query_audit(session, limit=20)
+    assert len(page["items"]) == 20
+    rest = query_audit(session, limit=20, before_id=page["next_before_id"])
+    assert len(rest["items"]) == 10 and rest["next_before_id"] is None
+
+    logins = query_audit(session, action="login", limit=100)["items"]
+    assert len(logins) == 10
+    e1 = query_audit(session, entity_type="tag", entity_id="E1", limit=100)["items"]
+    assert {item["entity_id"] for item in e1} == {"E1"}
+    future = datetime.utcnow() + timedelta(minutes=1)
+    assert query_audit(session, from_ts=future)["items"] == []
+    session.close()
+
+    writer.submit(_row(None, "logout"))
+    writer.stop()
+    assert writer.written == 31
+
+    # A queue that overflows writes in the caller instead of dropping.
+    small = AuditWriter(Session, batch_size=100, interval_sec=5, queue_size=1)
+    small._ensure_started = lambda: None
+    small.submit(_row(None, "a"))
+    small.submit(_row(None, "b"))
+    assert small.overflow == 1 and small.written == 1
+
+
+def test_audit_writer_retries_failed_batch_row_by_row(tmp_path, caplog):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mng.db'}", future=True)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, future=True)
+
+    class FlakySession(Session.class_):
+        # Multi-row inserts fail; rows for action "bad" always fail.
+        def execute(self, statement, params=None, *args, **kwargs):
+            if isinstance(params, list) and (len(params) > 1 or params[0]["action"] == "bad"):
+                raise RuntimeError("disk I/O error")
+            return super().execute(statement, params, *args, **kwargs)
+
+    writer = AuditWriter(sessionmaker(bind=engine, class_=FlakySession), 100, 5, 1000)
+    for action in ("a", "bad", "b"):
+        writer.submit(_row(None, action))
+    with caplog.at_level(logging.WARNING, logger=audit.logger.name):
+        writer.stop()
+    assert writer.written == 2 and writer.dropped == 1 and writer.errors == 1
+    assert writer.stats()["dropped"] == 1
+    session = Session()
+    assert sorted(item["action"] for item in query_audit(session)["items"]) == ["a", "b"]
+    session.close()
+    dropped = [r for r in caplog.records if "dropped" in r.getMessage()]
+    assert len(dropped) == 1 and "'bad'" in dropped[0].getMessage() and dropped[0].exc_info
+
+
+def test_ensure_audit_indexes_on_existing_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mng.db'}", future=True)
+    AuditLog.__table__.create(bind=engine)
+    for index in AuditLog.__table__.indexes:
+        index.drop(bind=engine)
+    ensure_audit_indexes(engine)
+    names = {ix["name"] for ix in inspect(engine).get_indexes("audit_log")}
+    assert {"ix_audit_log_ts", "ix_audit_log_user_ts", "ix_audit_log_entity"} <= names
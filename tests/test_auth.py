@@ -29,3 +29,44 @@ def test_authenticate_user_success_and_fail(tmp_path):
     finally:
         session.close()
         engine.dispose()
+
+
+def test_session_user_cache_skips_db_and_evicts_on_change(tmp_path):
+    from types import SimpleNamespace
+
+    from sqlalchemy import event
+
+    from app.security import get_session_user, user_cache
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'auth.db'}", future=True)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, future=True)
+    queries = []
+    event.listen(engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    session = Session()
+    user_cache.invalidate()
+    try:
+        user = User(username="op", password_hash="x", role=UserRole.operator.value, is_active=True)
+        session.add(user)
+        session.commit()
+        request = SimpleNamespace(session={"user_id": user.id})
+        lookup = Session()
+
+        queries.clear()
+        assert get_session_user(request, lookup).username == "op"
+        assert len(queries) == 1
+        cached = get_session_user(request, lookup)
+        assert len(queries) == 1
+        assert cached.role == UserRole.operator.value and cached.password_hash == ""
+
+        lookup.close()
+
+        user.is_active = False
+        session.commit()
+        lookup = Session()
+        assert get_session_user(request, lookup).is_active is False
+        lookup.close()
+    finally:
+        user_cache.invalidate()
+        session.close()
+        engine.dispose()
@@ -0,0 +1,57 @@
+import json
+import sqlite3
+
+from benchmarks.fixtures import ensure_fixtures, known_epc, profile_with
+from benchmarks.suite import Result, compare
+
+
+def _rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT * FROM events ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+def test_fixtures_are_deterministic_and_shaped(tmp_path):
+    profile = profile_with("small", events=3000, tags=50, readers=4, days=2)
+    events_a, tags_a = ensure_fixtures(tmp_path / "a", "p", profile)
+    events_b, tags_b = ensure_fixtures(tmp_path / "b", "p", profile)
+    rows = _rows(events_a)
+    assert rows == _rows(events_b)
+    assert tags_a.read_bytes() == tags_b.read_bytes()
+
+    known = json.loads(tags_a.read_text())
+    assert len(known) == 50 and len({m["alias"] for m in known.values()}) == 50
+    assert [r[0] for r in rows] == list(range(1, 3001))
+    assert [r[4] for r in rows] == sorted(r[4] for r in rows)
+    for _, reader, tag, _, _, _, fired, reason in rows:
+        assert (tag in known) == (reason != "unknown_tag")
+        assert fired == (1 if reason == "ok" else 0)
+    # Zipf skew: the top-ranked tag is the most read one.
+    counts = {}
+    for row in rows:
+        counts[row[2]] = counts.get(row[2], 0) + 1
+    assert max(counts, key=counts.get) == known_epc(0)
+
+    # Unchanged parameters reuse the files; new ones regenerate them.
+    mtime = events_a.stat().st_mtime_ns
+    ensure_fixtures(tmp_path / "a", "p", profile)
+    assert events_a.stat().st_mtime_ns == mtime
+    ensure_fixtures(tmp_path / "a", "p", profile_with("small", events=10, tags=50, readers=4, days=2))
+    assert len(_rows(events_a)) == 10
+
+
+def test_compare_flags_only_real_slowdowns():
+    baseline = {"results": {"a": {"median_ms": 10.0}, "b": {"median_ms": 0.5}, "c": {"median_ms": 10.0}}}
+    results = [
+        Result("a", "micro", 5, 13.0, 14.0, 12.0),
+        Result("b", "micro", 5, 1.5, 1.6, 1.4),
+        Result("c", "micro", 5, 12.0, 12.0, 12.0),
+        Result("d", "micro", 5, 1.0, 1.0, 1.0),
+    ]
+    rows = {row["name"]: row for row in compare(results, baseline, threshold=0.25)}
+    assert rows["a"]["regressed"] and rows["a"]["ratio"] == 1.3
+    assert not rows["b"]["regressed"]  # 3x, but within the noise floor
+    assert not rows["c"]["regressed"]
+    assert rows["d"]["baseline_ms"] is None and not rows["d"]["regressed"]
@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.cf601 import Cf601Client, Cf601Unavailable
+
+
+def _client(handler, **kwargs):
+    kwargs.setdefault("backoff_sec", 0)
+    return Cf601Client("http://cf601d", transport=httpx.MockTransport(handler), **kwargs)
+
+
+def test_client_reuses_connection_pool_and_records_latency():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(200, json={"epc": "E2"})
+
+    client = _client(handler)
+
+    async def scenario():
+        first = client._http()
+        for _ in range(5):
+            assert await client.post("/GetTagInfo") == {"epc": "E2"}
+        assert client._http() is first
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert calls == ["/GetTagInfo"] * 5
+    stats = client.stats()["endpoints"]["/GetTagInfo"]
+    assert stats["calls"] == 5 and stats["errors"] == 0
+
+
+def test_client_retries_safe_reads_only():
+    attempts = {"/GetTagInfo": 0, "/StartCounting": 0}
+
+    def handler(request):
+        attempts[request.url.path] += 1
+        if attempts[request.url.path] < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"ok": True})
+
+    client = _client(handler, retries=2)
+
+    async def scenario():
+        assert await client.post("/GetTagInfo") == {"ok": True}
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.post("/StartCounting")
+
+    asyncio.run(scenario())
+    assert attempts == {"/GetTagInfo": 3, "/StartCounting": 1}
+    assert client.stats()["endpoints"]["/GetTagInfo"]["retries"] == 2
+
+
+def test_circuit_opens_after_failures_and_recovers():
+    up = {"value": False}
+    attempts = []
+
+    def handler(request):
+        attempts.append(1)
+        if not up["value"]:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={})
+
+    client = _client(handler, retries=0, breaker_threshold=2, breaker_reset_sec=0.05)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(Cf601Unavailable):
+                await client.post("/getPorts")
+        assert client.stats()["circuit"] == "open"
+        with pytest.raises(Cf601Unavailable):
+            await client.post("/getPorts")
+        assert len(attempts) == 2
+
+        up["value"] = True
+        await asyncio.sleep(0.06)
+        assert await client.post("/getPorts") == {}
+        assert client.stats()["circuit"] == "closed"
+
+    asyncio.run(scenario())
@@ -0,0 +1,71 @@
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from app.services import dashboard
+from app.services.dashboard import DashboardCache
+from app.services.events import capture_queries
+
+
+def test_dashboard_snapshot_is_shared_until_new_events(tmp_path, make_events_db):
+    db = make_events_db(tmp_path / "events.db", 30)
+    cache = DashboardCache(max_age_sec=3600)
+
+    async def scenario():
+        # Concurrent first requests share one build.
+        first, second = await asyncio.gather(cache.get(db), cache.get(db))
+        assert first is second and cache.builds == 1
+        # The second caller may have waited on the build or hit its result.
+        hits = cache.hits
+        with capture_queries() as log:
+            again = await cache.get(db)
+        assert cache.hits == hits + 1
+        return first, again, log
+
+    first, again, log = asyncio.run(scenario())
+    assert again is first
+    # A hit only asks for the watermark.
+    assert len(log) == 1 and "MAX(id)" in log[0]
+    assert first["last_event_id"] == 30 and len(first["events"]) == 20
+    assert all(e["reason"] in ("relay_error", "unknown_tag") for e in first["problems"])
+
+    conn = sqlite3.connect(db)
+    conn.execute(
+        "INSERT INTO events VALUES (31, 'r1', 'EX', 'z', '2024-02-01T00:00:00', 'ip', 0, 'unknown_tag')"
+    )
+    conn.commit()
+    conn.close()
+    fresh = asyncio.run(cache.get(db))
+    assert cache.builds == 2
+    assert fresh["events"][0]["id"] == 31 and fresh["unknown"][0]["tag"] == "EX"
+
+
+def test_cancelled_request_does_not_strand_waiters(tmp_path, monkeypatch, make_events_db):
+    db = make_events_db(tmp_path / "events.db", 30)
+    cache = DashboardCache(max_age_sec=3600)
+    started, release = threading.Event(), threading.Event()
+    slow = dashboard.latest_events
+
+    def latest_events(*args, **kwargs):
+        started.set()
+        release.wait(5)
+        return slow(*args, **kwargs)
+
+    monkeypatch.setattr(dashboard, "latest_events", latest_events)
+
+    async def scenario():
+        first = asyncio.create_task(cache.get(db))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        second = asyncio.create_task(cache.get(db))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await asyncio.wait_for(second, 5)
+
+    snapshot = asyncio.run(scenario())
+    assert snapshot["last_event_id"] == 30 and cache.builds == 1
+    assert asyncio.run(cache.get(db)) is snapshot
@@ -0,0 +1,54 @@
+import threading
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.database import Base, apply_storage_profile
+from app.models import AuditLog, SystemNode
+
+
+def test_storage_profile_applied_and_concurrent_writers_do_not_lock(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'mng.db'}", connect_args={"check_same_thread": False}, future=True
+    )
+    apply_storage_profile(engine, settings)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False, future=True)
+
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == settings.mng_busy_timeout_ms
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+
+    threads, rounds = 8, 25
+    errors = []
+
+    def worker(n):
+        for i in range(rounds):
+            session = Session()
+            try:
+                node = session.get(SystemNode, f"n{n}") or SystemNode(node_id=f"n{n}")
+                node.hostname = f"host-{i}"
+                session.add(node)
+                session.add(AuditLog(action="bench", entity_id=f"{n}:{i}"))
+                session.commit()
+                session.scalar(select(func.count()).select_from(AuditLog))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                session.close()
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+    assert errors == []
+    session = Session()
+    try:
+        assert session.scalar(select(func.count()).select_from(AuditLog)) == threads * rounds
+    finally:
+        session.close()
+    engine.dispose()
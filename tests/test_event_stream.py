@@ -0,0 +1,103 @@
+import asyncio
+import os
+import sqlite3
+
+from app.services.event_stream import EventBroadcaster, backlog_for, format_sse, sse_events
+
+
+def _insert(db, rows):
+    conn = sqlite3.connect(db)
+    conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def test_broadcaster_fans_out_new_events_with_filters_and_backpressure(tmp_path, make_events_db):
+    db = make_events_db(tmp_path / "events.db", count=5)
+    broadcaster = EventBroadcaster(db, poll_interval=3600, batch_size=100, queue_size=2)
+
+    async def scenario():
+        everything = broadcaster.subscribe()
+        only_r3 = broadcaster.subscribe(reader_id="r3")
+        # The shared poller starts at the current end of the table.
+        for _ in range(100):
+            if broadcaster.last_id is not None:
+                break
+            await asyncio.sleep(0.01)
+        assert broadcaster.last_id == 5
+
+        _insert(
+            db,
+            [
+                (6, "r3", "E006", "2024-01-02T00:00:00", "2024-01-02T00:00:00", None, 1, "ok"),
+                (7, "r1", "E007", "2024-01-02T00:01:00", "2024-01-02T00:01:00", None, 0, "ok"),
+                (8, "r1", "E008", "2024-01-02T00:02:00", "2024-01-02T00:02:00", None, 0, "ok"),
+            ],
+        )
+        assert await broadcaster.poll_once() == 3
+        assert broadcaster.last_id == 8
+
+        assert [(await only_r3.get(0.1))["id"]] == [6]
+        assert await only_r3.get(0.01) is None
+        # Queue holds two events; the third is dropped and counted, not blocking.
+        assert [(await everything.get(0.1))["id"] for _ in range(2)] == [6, 7]
+        assert everything.take_dropped() == 1
+        assert broadcaster.stats()["dropped"] == 1
+
+        broadcaster.unsubscribe(everything)
+        broadcaster.unsubscribe(only_r3)
+
+    asyncio.run(scenario())
+
+
+def test_format_sse():
+    assert format_sse({"id": 3}, "event", 3) == 'id: 3\nevent: event\ndata: {"id":3}\n\n'
+
+
+def test_broadcaster_resets_subscribers_when_events_db_is_replaced(tmp_path, make_events_db):
+    db = make_events_db(tmp_path / "events.db", count=5)
+    broadcaster = EventBroadcaster(db, poll_interval=3600, batch_size=100, queue_size=10)
+
+    async def scenario():
+        sub = broadcaster.subscribe()
+        broadcaster._task.cancel()
+        assert await broadcaster.poll_once() == 0 and broadcaster.last_id == 5
+        _insert(db, [(6, "r1", "E006", "2024-01-02T00:00:00", "2024-01-02T00:00:00", None, 1, "ok")])
+        assert await broadcaster.poll_once() == 1
+
+        # Rotated to a file whose MAX(id) is higher: nothing from it is
+        # passed off as new, and the subscriber is told to reload.
+        rotated = make_events_db(tmp_path / "rotated.db", count=8)
+        os.replace(rotated, db)
+        assert await broadcaster.poll_once() == 0
+        assert broadcaster.last_id == 8 and broadcaster.stats()["resets"] == 1
+        assert sub.queue.empty() and sub.take_reset() == "rotated"
+
+        _insert(db, [(9, "r2", "E009", "2024-01-03T00:00:00", "2024-01-03T00:00:00", None, 1, "ok")])
+        assert await broadcaster.poll_once() == 1
+        assert (await sub.get(0.1))["id"] == 9 and sub.take_reset() is None
+
+        # SSE: the reset is sent before the first event from the new file,
+        # whose ids restart below the last one sent.
+        stream = sse_events(broadcaster, sub, [{"id": 50}], keepalive_sec=0.01)
+        chunks = [await stream.__anext__() for _ in range(2)]
+        sub.mark_reset("rotated")
+        sub.offer({"id": 1, "tag": "E001"})
+        chunks += [await stream.__anext__() for _ in range(2)]
+        await stream.aclose()
+        assert chunks[2].startswith("event: reset") and chunks[3].startswith("id: 1\n")
+
+        # A Last-Event-ID further back than one queue is replayed in part and flagged.
+        _insert(
+            db,
+            [(i, "r2", f"E{i:03d}", "2024-01-03T00:00:00", "2024-01-03T00:00:00", None, 1, "ok")
+             for i in range(10, 13)],
+        )
+        resumed = broadcaster.subscribe()
+        backlog = await backlog_for(broadcaster, resumed, 0)
+        assert [row["id"] for row in backlog] == list(range(1, 11))
+        assert resumed.take_reset() == "backlog_truncated"
+        assert len(await backlog_for(broadcaster, resumed, 2)) == 10 and resumed.take_reset() is None
+        broadcaster.unsubscribe(resumed)
+
+    asyncio.run(scenario())
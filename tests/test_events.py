@@ -0,0 +1,72 @@
+import csv
+import gzip
+import io
+import os
+
+import pytest
+
+from app.services.event_export import encode_events
+from app.services.events import EventFilters, decode_cursor, export_events, list_events
+
+
+def test_list_events_cursor_walks_all_rows_once(tmp_path, make_events_db):
+    db = make_events_db(tmp_path / "events.db")
+    seen = []
+    cursor = None
+    while True:
+        page = list_events(db, EventFilters(page_size=7, cursor=cursor))
+        assert page.total == 25
+        seen += [e["id"] for e in page.items]
+        if not page.next_cursor:
+            break
+        cursor = page.next_cursor
+    assert sorted(seen, reverse=True) == seen
+    assert seen == list(range(25, 0, -1))
+
+
+def test_list_events_prev_cursor_returns_previous_page(tmp_path, make_events_db):
+    db = make_events_db(tmp_path / "events.db")
+    first = list_events(db, EventFilters(page_size=10))
+    assert first.prev_cursor is None
+    second = list_events(db, EventFilters(page_size=10, cursor=first.next_cursor))
+    back = list_events(db, EventFilters(page_size=10, cursor=second.prev_cursor))
+    assert [e["id"] for e in back.items] == [e["id"] for e in first.items]
+    assert back.prev_cursor is None
+
+
+def test_list_events_cursor_respects_filters(tmp_path, make_events_db):
+    db = make_events_db(tmp_path / "events.db")
+    filters = EventFilters(reader_id="r1", page_size=5)
+    page = list_events(db, filters)
+    assert all(e["reader_id"] == "r1" for e in page.items)
+    filters.cursor = page.next_cursor
+    page2 = list_events(db, filters)
+    assert all(e["reader_id"] == "r1" for e in page2.items)
+    assert page2.items[0]["id"] < page.items[-1]["id"]
+
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_export_events_streams_csv_and_gzip(tmp_path, make_events_db):
+    db = make_events_db(tmp_path / "events.db")
+    filters = EventFilters(reason="unknown_tag")
+    chunks = list(encode_events(export_events(db, filters, batch_size=2), "csv", chunk_size=64))
+    assert len(chunks) > 1
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert len(rows) == 8
+    assert {r["reason"] for r in rows} == {"unknown_tag"}
+
+    packed = b"".join(encode_events(export_events(db, filters), "ndjson", gzip=True))
+    lines = gzip.decompress(packed).decode("utf-8").splitlines()
+    assert len(lines) == 8
+
+
+def test_pooled_connection_reopens_after_file_replaced(tmp_path, make_events_db):
+    db = make_events_db(tmp_path / "events.db", count=5)
+    assert list_events(db, EventFilters()).items[0]["id"] == 5
+    replacement = make_events_db(tmp_path / "events.new.db", count=3)
+    os.replace(replacement, db)
+    assert list_events(db, EventFilters()).items[0]["id"] == 3
@@ -0,0 +1,62 @@
+import os
+import sqlite3
+
+import pytest
+import typer
+
+from app.cli import events_explain
+from app.config import settings
+from app.services.events import EventFilters, last_seen_for_tags, list_events, replica_for, set_replica
+from app.services.events_index import explain_queries, sync_replica
+
+
+def test_explain_flags_full_scans_and_replica_indexes_fix_them(tmp_path, make_events_db):
+    source = make_events_db(tmp_path / "events.db", count=30)
+    plans = {p.name: p for p in explain_queries(source)}
+    assert plans["list_events reader_id"].full_scan
+    assert plans["last_seen_for_tags"].full_scan
+    assert not plans["events_after"].full_scan
+
+    replica = str(tmp_path / "events_index.db")
+    assert sync_replica(source, replica, batch_size=7) == {"copied": 30, "last_id": 30, "rebuilt": True}
+    plans = {p.name: p for p in explain_queries(replica)}
+    assert not plans["list_events reader_id"].full_scan
+    assert not plans["last_seen_for_tags"].full_scan
+    assert not plans["events_for_tag"].temp_btree
+
+
+def test_replica_syncs_incrementally_and_serves_reads(tmp_path, make_events_db):
+    source = make_events_db(tmp_path / "events.db", count=10)
+    replica = str(tmp_path / "events_index.db")
+    sync_replica(source, replica)
+
+    conn = sqlite3.connect(source)
+    conn.execute("DELETE FROM events WHERE id <= 2")
+    conn.execute(
+        "INSERT INTO events VALUES (11, 'r1', 'E011', '2024-01-02T00:00:00', '2024-01-02T00:00:00', NULL, 1, 'ok')"
+    )
+    conn.commit()
+    conn.close()
+    assert sync_replica(source, replica) == {"copied": 1, "last_id": 11, "rebuilt": False}
+
+    set_replica(source, replica)
+    try:
+        assert replica_for(source) == os.path.abspath(replica)
+        page = list_events(source, EventFilters(page_size=100))
+        assert [e["id"] for e in page.items][0] == 11
+        assert len(page.items) == 9
+        assert last_seen_for_tags(source, ["E011"]) == {"E011": "2024-01-02T00:00:00"}
+    finally:
+        set_replica(source, None)
+
+    # Replacing events.db (new inode) rebuilds the replica.
+    os.replace(make_events_db(tmp_path / "new.db", count=3), source)
+    assert sync_replica(source, replica) == {"copied": 3, "last_id": 3, "rebuilt": True}
+
+
+def test_events_explain_replica_requires_replica_db(monkeypatch, capsys):
+    monkeypatch.setattr(settings, "events_replica_db", "")
+    with pytest.raises(typer.Exit) as exc:
+        events_explain(db=None, replica=True, as_json=False, strict=False)
+    assert exc.value.exit_code == 1
+    assert "EVENTS_REPLICA_DB is not set" in capsys.readouterr().err
@@ -0,0 +1,34 @@
+import asyncio
+import threading
+
+from app.executor import BlockingPool
+
+
+def test_blocking_pool_runs_off_loop_and_tracks_queue():
+    pool = BlockingPool("test", max_workers=1)
+    release = threading.Event()
+    loop_thread = threading.get_ident()
+
+    def slow():
+        release.wait(5)
+        return threading.get_ident()
+
+    async def scenario():
+        first = asyncio.ensure_future(pool.run(slow))
+        second = asyncio.ensure_future(pool.run(slow))
+        await asyncio.sleep(0.05)
+        stats = pool.stats()
+        assert stats["active"] == 1
+        assert stats["queued"] == 1
+        release.set()
+        return await asyncio.gather(first, second)
+
+    try:
+        idents = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    assert loop_thread not in idents
+    stats = pool.stats()
+    assert stats["completed"] == 2
+    assert stats["queued"] == 0
+    assert stats["wait_max_ms"] > 0
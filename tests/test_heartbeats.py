@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import SystemNode, SystemReader
+from app.services.heartbeats import HeartbeatBuffer
+
+
+def test_heartbeats_coalesce_into_one_upsert_transaction(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mng.db'}", future=True)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, future=True)
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+
+    buffer = HeartbeatBuffer(Session, window_sec=3600)
+    read_at = datetime(2024, 1, 1, 12, 0, 0)
+    for i in range(5):
+        buffer.record(
+            {
+                "node_id": "n1",
+                "hostname": f"host-{i}",
+                "readers": [
+                    {"reader_id": "r1", "type": "cf601", "last_read_at": read_at},
+                    {"reader_id": "r2", "conn": "usb" if i == 0 else None},
+                ],
+            }
+        )
+    # Served from memory before anything is written.
+    assert buffer.nodes()[0]["hostname"] == "host-4"
+    assert buffer.readers()["r2"]["conn"] == "usb"
+    assert buffer.pending() == 3
+
+    commits.clear()
+    assert buffer.flush() == 3
+    assert len(commits) == 1
+    assert buffer.flush() == 0
+
+    session = Session()
+    try:
+        assert session.get(SystemNode, "n1").hostname == "host-4"
+        readers = {r.reader_id: r for r in session.scalars(select(SystemReader))}
+        assert readers["r1"].last_read_at == read_at
+        assert readers["r2"].conn == "usb"
+        assert readers["r2"].node_id == "n1"
+    finally:
+        session.close()
+
+    # A fresh buffer starts from what was persisted.
+    assert HeartbeatBuffer(Session, window_sec=0).readers()["r1"]["type"] == "cf601"
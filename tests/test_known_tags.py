@@ -1,4 +1,12 @@
-from app.services.known_tags import atomic_write_known_tags, load_known_tags
+import logging
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Tag
+from app.services import known_tags
+from app.services.known_tags import KnownTagsPersister, atomic_write_known_tags, load_known_tags
 
 
 def test_atomic_write_known_tags(tmp_path):
@@ -17,3 +25,58 @@ def test_load_known_tags_handles_invalid_json(tmp_path):
     path = tmp_path / "known_tags.json"
     path.write_text("{bad json", encoding="utf-8")
     assert load_known_tags(path) == {}
+
+
+def test_persister_coalesces_changes_into_one_write(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mng.db'}", future=True)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, future=True)
+    path = tmp_path / "known_tags.json"
+    persister = KnownTagsPersister(Session, window_sec=60)
+    session = Session()
+    try:
+        for i in range(5):
+            session.add(Tag(epc=f"E{i}", alias=f"A{i}"))
+            session.commit()
+            persister.schedule(path)
+        assert not path.exists()
+        assert persister.pending() == 1
+        assert persister.flush() == 1
+        assert persister.writes == 1
+        assert sorted(load_known_tags(path)) == [f"E{i}" for i in range(5)]
+        assert persister.flush() == 0
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def test_persister_requeues_paths_whose_write_fails(tmp_path, monkeypatch, caplog):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mng.db'}", future=True)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, future=True)
+    good, bad = tmp_path / "known_tags.json", tmp_path / "missing" / "known_tags.json"
+    persister = KnownTagsPersister(Session, window_sec=60)
+    write = known_tags.persist_db_to_json
+
+    def persist(session, path):
+        if path == bad:
+            raise OSError("read-only file system")
+        return write(session, path)
+
+    monkeypatch.setattr(known_tags, "persist_db_to_json", persist)
+    try:
+        persister.schedule(good)
+        persister.schedule(bad)
+        with caplog.at_level(logging.ERROR, logger=known_tags.logger.name):
+            assert persister.flush() == 1
+        assert persister.writes == 1 and good.exists()
+        assert persister.pending() == 1 and persister._timer is not None
+        assert any(str(bad) in r.getMessage() for r in caplog.records)
+
+        monkeypatch.setattr(known_tags, "persist_db_to_json", write)
+        bad.parent.mkdir()
+        assert persister.flush() == 1
+        assert persister.pending() == 0 and persister._timer is None and bad.exists()
+    finally:
+        persister.flush()
+        engine.dispose()
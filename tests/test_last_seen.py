@@ -0,0 +1,69 @@
+import os
+import sqlite3
+
+from app.services.events import events_after, last_seen_for_tags, last_seen_rows
+from app.services.last_seen import LastSeenIndex
+from app.services.sqlite_pool import close_pool
+
+
+def _append(db, start, count, tag="E001", reader="r9", ts="2030-01-01T00:00:00"):
+    conn = sqlite3.connect(db)
+    conn.executemany(
+        "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(i, reader, tag, ts, ts, "10.0.0.1", 1, "ok") for i in range(start, start + count)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_chunked_fallback_handles_large_whitelists(tmp_path, make_events_db):
+    db = make_events_db(tmp_path / "events.db", 30)
+    seen = {r["tag"] for r in events_after(db, 0, 100)}
+    # Well past SQLite's 999 host-parameter limit.
+    tags = [f"X{i:05d}" for i in range(5000)] + sorted(seen)
+    rows = last_seen_rows(db, tags)
+    assert set(rows) == seen
+    assert last_seen_for_tags(db, tags) == {tag: r["last_seen"] for tag, r in rows.items()}
+
+
+def test_index_matches_fallback_and_follows_new_events(tmp_path, make_events_db):
+    db = make_events_db(tmp_path / "events.db", 30)
+    tags = sorted({r["tag"] for r in events_after(db, 0, 100)}) + ["NEVER"]
+    index = LastSeenIndex(db, refresh_sec=3600, batch_size=7)
+
+    # Cold: answered by the chunked queries while the index warms up.
+    assert index.lookup(tags) == last_seen_rows(db, tags)
+    assert index.fallbacks == 1
+    index._warming.join()
+    assert index.warm and index.last_id == 30
+    assert index.lookup(tags) == last_seen_rows(db, tags)
+
+    _append(db, 31, 2, tag="E001")
+    assert index.apply(30, events_after(db, 30))
+    assert index.lookup(["E001"]) == {"E001": {"last_seen": "2030-01-01T00:00:00", "reader_id": "r9"}}
+
+    # Not fed by the poller: picked up on the next refresh.
+    _append(db, 33, 1, tag="E002", reader="r8")
+    index.refresh(force=True)
+    assert index.lookup(tags) == last_seen_rows(db, tags)
+
+    # events.db replaced with a shorter file: the index is rebuilt.
+    close_pool(db)
+    (tmp_path / "events.db").unlink()
+    make_events_db(tmp_path / "events.db", 5)
+    index.refresh(force=True)
+    assert index.last_id == 5
+    assert index.lookup(tags) == last_seen_rows(db, tags)
+
+    # Rotated to a file with the same MAX(id): the file id changes, so the
+    # index is rebuilt rather than kept at the old rows.
+    rotated = make_events_db(tmp_path / "rotated.db", 5)
+    conn = sqlite3.connect(rotated)
+    conn.execute("UPDATE events SET reader_id = 'r7'")
+    conn.commit()
+    conn.close()
+    os.replace(rotated, db)
+    index.refresh(force=True)
+    assert index.last_id == 5
+    assert index.lookup(tags) == last_seen_rows(db, tags)
+    assert {r["reader_id"] for r in index.lookup(tags).values()} == {"r7"}
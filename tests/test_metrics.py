@@ -0,0 +1,91 @@
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.config import settings
+from app.services import metrics
+from app.services.events import EventFilters, capture_queries, events_for_tag, export_events
+from app.services.metrics import (
+    MetricsMiddleware,
+    MetricsRegistry,
+    db_query_duration,
+    db_slow_queries,
+    http_request_duration,
+    instrument_engine,
+    statement_name,
+)
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    hist = registry.histogram("t_seconds", "Test.", ["route"], buckets=(0.1, 1.0))
+    hist.observe(0.05, '/a"b')
+    hist.observe(0.1, '/a"b')
+    hist.observe(3.0, '/a"b')
+    registry.counter("t_total", "Count.").inc(amount=2)
+    body = registry.render([("t_gauge", "gauge", "Gauge.", [({"pool": "cpu"}, 3)])])
+    assert "# TYPE t_seconds histogram" in body
+    assert 't_seconds_bucket{route="/a\\"b",le="0.1"} 2' in body
+    assert 't_seconds_bucket{route="/a\\"b",le="+Inf"} 3' in body
+    assert 't_seconds_count{route="/a\\"b"} 3' in body
+    assert "t_total 2.0" in body
+    assert 't_gauge{pool="cpu"} 3' in body
+
+
+def test_middleware_labels_requests_by_route_template():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        return {"id": item_id}
+
+    app.add_middleware(MetricsMiddleware)
+    with TestClient(app) as client:
+        for item_id in ("a", "b"):
+            assert client.get(f"/items/{item_id}").status_code == 200
+        assert client.get("/missing").status_code == 404
+    assert http_request_duration.count("GET", "/items/{item_id}", 200) >= 2
+    assert http_request_duration.count("GET", "other", 404) >= 1
+
+
+def test_query_hooks_and_slow_query_log(tmp_path, monkeypatch, caplog, make_events_db):
+    db = make_events_db(tmp_path / "events.db", 10)
+    before = db_query_duration.count("events", "events_for_tag")
+    with capture_queries() as log:
+        events_for_tag(db, "E001")
+    assert log, "capture_queries still sees the SQL"
+    assert db_query_duration.count("events", "events_for_tag") == before + 1
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'mng.db'}", future=True)
+    instrument_engine(engine, db="test")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE tags (epc TEXT PRIMARY KEY)"))
+        conn.execute(text("INSERT INTO tags VALUES ('E1')"))
+    assert statement_name("SELECT tags.epc FROM tags WHERE x") == "SELECT tags"
+
+    monkeypatch.setattr(settings, "slow_query_ms", 1e-6)
+    with caplog.at_level(logging.WARNING, logger=metrics.logger.name):
+        events_for_tag(db, "E002")
+        with engine.connect() as conn:
+            conn.execute(text("SELECT epc FROM tags WHERE epc = :epc"), {"epc": "E1"}).all()
+    plans = [r.getMessage() for r in caplog.records if "EXPLAIN QUERY PLAN" in r.getMessage()]
+    assert any("events_for_tag" in m and "SCAN events" in m for m in plans)
+    assert any("SELECT tags" in m and "SEARCH tags" in m for m in plans)
+    assert db_slow_queries.value("test", "SELECT tags") >= 1
+    assert db_query_duration.count("test", "INSERT tags") == 1
+
+
+def test_streaming_export_is_not_timed_as_a_query(tmp_path, monkeypatch, caplog, make_events_db):
+    db = make_events_db(tmp_path / "events.db", 10)
+    monkeypatch.setattr(settings, "slow_query_ms", 1e-6)
+    before = db_query_duration.count("events", "export_events")
+    with caplog.at_level(logging.WARNING, logger=metrics.logger.name):
+        with capture_queries() as log:
+            rows = export_events(db, EventFilters(), batch_size=3)
+            first = next(rows)
+            rest = list(rows)
+    assert first and len(rest) == 9 and log
+    assert db_query_duration.count("events", "export_events") == before
+    assert not [r for r in caplog.records if "export_events" in r.getMessage()]
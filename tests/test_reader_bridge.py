@@ -0,0 +1,155 @@
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "tools" / "reader-bridge"))
+
+from tag_table import TagTable, parse_since, tags_payload  # noqa: E402
+
+
+def _epcs(tags):
+    return [t["epc"] for t in tags]
+
+
+def test_tag_table_is_bounded_and_returns_only_changes():
+    table = TagTable(max_size=3, ttl_sec=10)
+    for i, epc in enumerate(["a", "b", "c", "a", "d"]):
+        table.update(epc, rssi=-50, ant=1, channel=0, now=float(i))
+
+    # "b" was the least recently seen when "d" pushed the table over max_size.
+    seq, everything = table.since(0, now=4.0)
+    assert seq == 5 and _epcs(everything) == ["d", "a", "c"]
+    assert everything[1]["counts"] == 2 and everything[1]["first_ts"] == 0.0
+
+    assert table.since(seq, now=4.0) == (seq, [])
+    table.update("c", rssi=-40, ant=1, channel=0, now=5.0)
+    assert _epcs(table.since(seq, now=5.0)[1]) == ["c"]
+    assert _epcs(table.since(0, ts=3.5, now=5.0)[1]) == ["c", "d"]
+
+    # Tags idle for longer than ttl_sec are no longer returned.
+    assert _epcs(table.since(0, now=14.5)[1]) == ["c"]
+
+
+def test_tags_payload_validates_since_and_resets_after_restart():
+    for bad in ({"since": "abc"}, {"since": -1}, {"since": 1.5}, {"since": [1]}, {"since_ts": "x"},
+                {"since_ts": "nan"}, {"since_ts": True}):
+        with pytest.raises(ValueError):
+            parse_since(bad)
+    assert parse_since({}) == (0, None)
+    assert parse_since({"since": "7", "since_ts": 3}) == (7, 3.0)
+
+    table = TagTable(max_size=10, ttl_sec=60)
+    table.update("a", -50, 1, 0, now=1.0)
+    table.update("b", -50, 1, 0, now=2.0)
+    body = tags_payload(table, {"since": 1}, now=3.0)
+    assert body["seq"] == 2 and _epcs(body["tags"]) == ["b"] and not body["reset"]
+    # A client still holding the seq of a table from before a restart.
+    body = tags_payload(table, {"since": 500}, now=3.0)
+    assert body["reset"] and body["seq"] == 2 and _epcs(body["tags"]) == ["b", "a"]
+
+
+def _check_consistent(results, errors):
+    for seq, tags in results:
+        seqs = [t["seq"] for t in tags]
+        if seqs != sorted(seqs, reverse=True) or (seqs and seqs[0] > seq):
+            errors.append((seq, seqs[:5]))
+        if len({t["epc"] for t in tags}) != len(tags):
+            errors.append(("duplicate epc", seq))
+
+
+def test_tag_table_snapshots_stay_consistent_under_concurrent_reads():
+    table = TagTable(max_size=200, ttl_sec=60, publish_sec=0.001)
+    stop = threading.Event()
+    errors = []
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            table.update(f"E{i % 500:04d}", -50, 1, 0)
+            i += 1
+
+    def reader():
+        seq = 0
+        while not stop.is_set():
+            try:
+                new_seq, tags = table.since(seq)
+            except Exception as exc:  # pragma: no cover - the failure being tested for
+                errors.append(exc)
+                return
+            _check_consistent([(new_seq, tags)], errors)
+            if new_seq < seq:
+                errors.append(("seq went back", seq, new_seq))
+            seq = new_seq
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.5)
+    stop.set()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert table.seq > 1000
+    assert len(table) <= 200
+
+
+def test_tags_endpoint_under_load():
+    # The /tags handler (tags_payload) against a live InventoryThread, as
+    # bridge.py wires them, with answers round-tripped through JSON.
+    from inventory import TAG_TABLE_SIZE, InventoryThread
+
+    class SimulatedReader:
+        """Stands in for UHFPrimeReader.dll: a new read on every call."""
+
+        def __init__(self):
+            self.calls = 0
+
+        def GetTagUii(self, hcomm, tag, timeout):
+            self.calls += 1
+            code = bytes([0xE2, 0x00]) + (self.calls % 1500).to_bytes(10, "big")
+            tag.m_len = len(code)
+            for i, b in enumerate(code):
+                tag.m_code[i] = b
+            tag.m_rssi = -500
+            tag.m_ant = 1
+            return 0
+
+    reader = SimulatedReader()
+    thread = InventoryThread(reader, 0)
+    thread.start()
+    errors = []
+    results = []
+    seen = []
+
+    def poll():
+        seq, epcs = 0, set()
+        for _ in range(300):
+            body = json.loads(json.dumps(tags_payload(thread.info, {"since": seq})))
+            if body["reset"] or body["seq"] < seq:
+                errors.append(("seq went back", seq, body["seq"]))
+            results.append((body["seq"], body["tags"]))
+            epcs.update(_epcs(body["tags"]))
+            seq = body["seq"]
+        seen.append((seq, epcs))
+
+    pollers = [threading.Thread(target=poll) for _ in range(4)]
+    for t in pollers:
+        t.start()
+    for t in pollers:
+        t.join()
+    thread.stop()
+    thread.join()
+
+    _check_consistent(results, errors)
+    assert errors == []
+    final_seq, final = thread.info.since(0)
+    assert len(final) <= TAG_TABLE_SIZE
+    # Every poller followed the table forward and picked up the tags it holds.
+    assert len(seen) == 4 and all(seq > 0 and epcs for seq, epcs in seen)
+    assert max(seq for seq, _ in seen) <= final_seq
+    epc = final[0]["epc"]
+    assert epc.startswith("e2 00 ") and len(epc.split()) == 12
@@ -0,0 +1,94 @@
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from app.services.events import events_after, last_events_per_reader
+from app.services.reader_state import ReaderState
+from app.services.sqlite_pool import close_pool
+from app.services.system_status import _activity_state, _parse_event_ts, reader_status
+
+
+def _append(db, start, count):
+    conn = sqlite3.connect(db)
+    conn.executemany(
+        "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (i, "r3" if i % 2 else "r1", f"E{i:03d}", "2024-01-02T00:00:00",
+             "2024-01-02T00:00:00", "10.0.0.1", 1, "ok")
+            for i in range(start, start + count)
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_reader_state_matches_group_by_incrementally(tmp_path, make_events_db):
+    db = make_events_db(tmp_path / "events.db", 25)
+    state = ReaderState(db, refresh_sec=3600, batch_size=7)
+    assert state.readers() == last_events_per_reader(db)
+    assert state.last_id == 25
+
+    _append(db, 26, 5)
+    # Throttled: nothing new until the interval passes or events are fed in.
+    assert state.readers() != last_events_per_reader(db)
+    rows = events_after(db, 25)
+    assert state.apply(25, rows)
+    assert not state.apply(25, rows)
+    assert state.readers() == last_events_per_reader(db)
+
+    _append(db, 31, 4)
+    state.refresh(force=True)
+    assert state.readers() == last_events_per_reader(db)
+
+    # events.db replaced with a shorter file: counters are rebuilt.
+    close_pool(db)
+    (tmp_path / "events.db").unlink()
+    make_events_db(tmp_path / "events.db", 10)
+    state.refresh(force=True)
+    assert state.readers() == last_events_per_reader(db)
+    assert state.last_id == 10
+
+    # Rotated to a file with the same MAX(id): rebuilt by file id.
+    rotated = make_events_db(tmp_path / "rotated.db", 10)
+    conn = sqlite3.connect(rotated)
+    conn.execute("UPDATE events SET fired = 1")
+    conn.commit()
+    conn.close()
+    os.replace(rotated, db)
+    state.refresh(force=True)
+    assert state.readers() == last_events_per_reader(db)
+    assert state.last_id == 10
+
+
+def test_reader_status_uses_newest_of_event_and_heartbeat(tmp_path, make_events_db):
+    db = make_events_db(tmp_path / "events.db", 4)
+    now = datetime.utcnow()
+    heartbeats = {
+        "r1": {"node_id": "n1", "type": "cf601", "conn": "usb", "last_seen": now, "last_read_at": None},
+        "r9": {"node_id": "n1", "type": None, "conn": None, "last_seen": now, "last_read_at": None},
+    }
+    readers = {r["reader_id"]: r for r in reader_status(db, heartbeats)}
+    assert readers["r1"]["state"] == "green" and readers["r1"]["total"] == 2
+    assert readers["r2"]["state"] == "red"
+    assert readers["r9"]["total"] == 0 and readers["r9"]["state"] == "green"
+
+
+def test_reader_status_handles_offset_timestamps(tmp_path, make_events_db):
+    aware = datetime.now(timezone(timedelta(hours=2)))
+    assert _parse_event_ts(aware.isoformat()).tzinfo is None
+    assert _activity_state(_parse_event_ts(aware.isoformat()))["state"] == "green"
+    assert _activity_state(_parse_event_ts("2026-10-17T12:00:00+00:00"))["state"] in ("green", "yellow", "red")
+
+    db = make_events_db(tmp_path / "events.db", 4)
+    conn = sqlite3.connect(db)
+    conn.execute("UPDATE events SET received_at = ? WHERE reader_id = 'r1'", (aware.isoformat(),))
+    conn.commit()
+    conn.close()
+    old = datetime.utcnow() - timedelta(days=1)
+    heartbeats = {
+        "r1": {"node_id": "n1", "type": None, "conn": None, "last_seen": old, "last_read_at": None},
+        "r9": {"node_id": "n1", "type": None, "conn": None, "last_seen": aware, "last_read_at": None},
+    }
+    readers = {r["reader_id"]: r for r in reader_status(db, heartbeats)}
+    assert readers["r1"]["state"] == "green"
+    assert readers["r9"]["state"] == "green"
@@ -0,0 +1,86 @@
+import os
+import sqlite3
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.services.events import events_per_day, top_readers, top_reasons
+from app.services.rollups import (
+    ensure_rollup_state,
+    refresh_rollups,
+    rollup_events_per_day,
+    rollup_top_readers,
+    rollup_top_reasons,
+)
+
+
+def _session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mng.db'}", future=True)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, future=True)()
+
+
+def test_rollups_match_full_scan_and_advance_incrementally(tmp_path, monkeypatch, make_events_db):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "rollup_batch_size", 4)
+    db = make_events_db(tmp_path / "events.db", count=10)
+    session = _session(tmp_path)
+    try:
+        assert refresh_rollups(session, db) == 10
+
+        conn = sqlite3.connect(db)
+        conn.executemany(
+            "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (11, "r3", "E011", "2024-01-02T10:00:00", "2024-01-02T10:00:00", None, 1, "ok"),
+                (12, "r1", "E012", "2024-01-02T11:00:00", "2024-01-02T11:00:00", None, 0, "relay_error"),
+            ],
+        )
+        conn.commit()
+        conn.close()
+        assert refresh_rollups(session, db) == 12
+
+        assert rollup_events_per_day(session) == events_per_day(db)
+        assert rollup_top_reasons(session, limit=10) == top_reasons(db, limit=10)
+        assert sorted(rollup_top_readers(session), key=lambda r: r["reader_id"]) == sorted(
+            top_readers(db), key=lambda r: r["reader_id"]
+        )
+    finally:
+        session.close()
+
+
+def test_rollups_rebuild_when_events_db_is_replaced(tmp_path, make_events_db):
+    db = make_events_db(tmp_path / "events.db", count=10)
+    session = _session(tmp_path)
+    try:
+        assert refresh_rollups(session, db) == 10
+        # A rotated file with the same MAX(id) but different rows.
+        rotated = make_events_db(tmp_path / "rotated.db", count=10)
+        conn = sqlite3.connect(rotated)
+        conn.execute("UPDATE events SET reason = 'relay_error'")
+        conn.commit()
+        conn.close()
+        os.replace(rotated, db)
+        assert refresh_rollups(session, db) == 10
+        assert rollup_top_reasons(session, limit=10) == top_reasons(db, limit=10)
+        assert rollup_top_reasons(session) == [{"reason": "relay_error", "count": 10}]
+    finally:
+        session.close()
+
+
+def test_ensure_rollup_state_adds_source_file(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mng.db'}", future=True)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE rollup_state (name VARCHAR(32) PRIMARY KEY, source VARCHAR(512) NOT NULL,"
+                " last_event_id INTEGER NOT NULL, updated_at DATETIME)"
+            )
+        )
+    ensure_rollup_state(engine)
+    ensure_rollup_state(engine)
+    with engine.connect() as conn:
+        columns = [row[1] for row in conn.execute(text("PRAGMA table_info(rollup_state)"))]
+    assert "source_file" in columns
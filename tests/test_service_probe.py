@@ -0,0 +1,36 @@
+import asyncio
+
+from app.services.service_probe import ServiceProber, StubBackend, systemctl_backend
+
+
+def test_prober_caches_states_and_records_transitions():
+    backend = StubBackend({"b.service": "inactive"})
+    prober = ServiceProber(["a.service", "b.service"], backend, interval_sec=0.01)
+
+    async def scenario():
+        first = await prober.statuses()
+        assert [(s["name"], s["active"]) for s in first] == [("a.service", True), ("b.service", False)]
+        # Served from the cache until the next probe.
+        await prober.statuses()
+        assert backend.calls == 1
+
+        backend.states["b.service"] = "active"
+        prober.start()
+        while backend.calls < 3:
+            await asyncio.sleep(0.01)
+        await prober.stop()
+        return await prober.statuses()
+
+    statuses = asyncio.run(scenario())
+    assert all(s["active"] for s in statuses)
+    b = statuses[1]
+    assert b["since"] <= b["checked_at"]
+    history = prober.transitions()
+    assert history[0] == {"name": "b.service", "from": "inactive", "to": "active", "at": b["since"]}
+    assert len(history) == 3
+
+
+def test_systemctl_backend_reports_every_unit():
+    states = asyncio.run(systemctl_backend(["a.service", "b.service"]))
+    assert set(states) == {"a.service", "b.service"}
+    assert all(isinstance(v, str) and v for v in states.values())
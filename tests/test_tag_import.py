@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import AuditLog, Tag
+from app.services.alias_generator import TREE_NAMES
+from app.services.tag_import import BulkPayloadError, import_tags, parse_bulk_payload
+
+EPC_A = "E20000172211014418900001"
+EPC_B = "E20000172211014418900002"
+
+
+def _session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mng.db'}", future=True)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, future=True)()
+
+
+def test_parse_bulk_payload_csv_and_ndjson():
+    csv_body = "epc,alias,room_number\n%s,Dab,12\n%s,,\n" % (EPC_A, EPC_B)
+    rows = parse_bulk_payload(csv_body, "text/csv", max_rows=10)
+    assert [r["epc"] for r in rows] == [EPC_A, EPC_B]
+    assert rows[0]["room_number"] == "12"
+
+    nd_body = '{"epc": "%s"}\n\n{"epc": "%s", "alias_group": "female_fruit"}\n' % (EPC_A, EPC_B)
+    rows = parse_bulk_payload(nd_body, "application/x-ndjson", max_rows=10)
+    assert rows[1]["alias_group"] == "female_fruit"
+
+    with pytest.raises(BulkPayloadError):
+        parse_bulk_payload(nd_body, "application/x-ndjson", max_rows=1)
+    with pytest.raises(BulkPayloadError):
+        parse_bulk_payload("alias\nDab\n", "text/csv", max_rows=10)
+
+
+def test_import_tags_single_transaction_with_per_row_results(tmp_path):
+    session = _session(tmp_path)
+    try:
+        session.add(Tag(epc=EPC_A, alias=TREE_NAMES[0]))
+        session.commit()
+        rows = [
+            {"epc": "xx" + EPC_A.lower(), "room_number": "7"},
+            {"epc": EPC_B},
+            {"epc": EPC_B},
+            {"epc": "nope"},
+            {"epc": "E20000172211014418900003", "alias": TREE_NAMES[0]},
+        ]
+        results = import_tags(session, None, rows, upsert=True)
+        assert [r["status"] for r in results] == ["updated", "created", "error", "error", "error"]
+        assert results[1]["alias"] == TREE_NAMES[1]
+        assert session.get(Tag, EPC_A).room_number == "7"
+        assert session.scalar(select(func.count()).select_from(AuditLog)) == 2
+
+        again = import_tags(session, None, [{"epc": EPC_B}])
+        assert again[0]["error"] == "Tag already exists"
+    finally:
+        session.close()
@@ -0,0 +1,36 @@
+from app.services.tag_reads import TagReadAggregator
+
+EPC = "e2 00 00 11 22 33 44 55 66 77 88 99"
+
+
+def _tag(counts, rssi=-50.0):
+    return {"epc": EPC, "counts": counts, "rssi": rssi, "ant": 1}
+
+
+def test_aggregator_confirms_in_window_and_reports_only_changes():
+    agg = TagReadAggregator(window_sec=3.0, confirm_reads=3, forget_sec=60.0)
+
+    [first] = agg.ingest([_tag(1)], now=0.0)
+    assert first["epc"] == "E20000112233445566778899"
+    assert first["state"] == "pending" and first["count"] == 1
+
+    # Same running count from cf601d: nothing new to push.
+    assert agg.ingest([_tag(1)], now=0.5) == []
+
+    [second] = agg.ingest([_tag(3, rssi=-40.0)], now=1.0)
+    assert second["state"] == "confirmed"
+    assert second["count"] == 3 and second["max_rssi"] == -40.0
+
+    # Reads that fall out of the window without new ones: tag is lost.
+    [lost] = agg.ingest([_tag(3)], now=5.0)
+    assert lost["state"] == "lost" and agg.snapshot(now=5.0) == []
+
+    # Inventory restart resets cf601d's counter; reads count again from zero.
+    [again] = agg.ingest([_tag(2)], now=6.0)
+    assert again["state"] == "pending" and again["count"] == 5
+
+    # Two reads spread over more than the window never confirm.
+    slow = TagReadAggregator(window_sec=1.0, confirm_reads=2)
+    slow.ingest([{"epc": "E2" * 12, "ts": 1}], now=0.0)
+    [late] = slow.ingest([{"epc": "E2" * 12, "ts": 2}], now=2.0)
+    assert late["state"] == "pending" and late["reads_in_window"] == 1 and late["count"] == 2
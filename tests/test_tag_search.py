@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Tag
+from app.services.tag_import import import_tags
+from app.services.tag_search import TagFilters, ensure_tag_search, match_expression, search_tags
+
+
+def _session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mng.db'}", future=True)
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(bind=engine, future=True)()
+
+
+def _epcs(page):
+    return [t.epc for t in page.items]
+
+
+def test_match_expression_prefixes_every_term():
+    assert match_expression("Dąb 12") == '"Dąb"* "12"*'
+    assert match_expression(' "* ') is None
+
+
+def test_search_filters_sorts_and_paginates(tmp_path):
+    engine, session = _session(tmp_path)
+    try:
+        # Tags written before the index exists are picked up by the rebuild.
+        session.add(Tag(epc="E2000000000000000000A001", alias="Brzoza", room_number="12", status="lost"))
+        session.commit()
+        assert ensure_tag_search(engine)
+        rows = [
+            {"epc": f"E2000000000000000000B{i:03d}", "alias": f"Jodla-{i}", "room_number": str(i % 3),
+             "alias_group": "male_tree", "notes": "przy oknie" if i % 2 else None}
+            for i in range(1, 121)
+        ]
+        assert all(r["status"] == "created" for r in import_tags(session, None, rows))
+
+        everything = search_tags(session, TagFilters(page_size=50))
+        assert everything.total == 121 and everything.pages == 3 and len(everything.items) == 50
+        last = search_tags(session, TagFilters(page=3, page_size=50))
+        assert len(last.items) == 21
+        unpaginated = search_tags(session, TagFilters(page=3, page_size=None))
+        assert len(unpaginated.items) == 121 and unpaginated.pages == 1 and unpaginated.page == 1
+
+        # EPC prefix, accent-insensitive word prefix and AND of terms.
+        assert search_tags(session, TagFilters(q="E2000000000000000000A")).total == 1
+        assert search_tags(session, TagFilters(q="okn")).total == 60
+        assert search_tags(session, TagFilters(q="jodla okn")).total == 60
+        assert search_tags(session, TagFilters(q="Jodla-7")).total == 11  # 7, 70-79
+
+        filtered = search_tags(session, TagFilters(q="przy", room_number="0", sort="epc", order="desc"))
+        assert filtered.total == 20
+        assert _epcs(filtered) == sorted(_epcs(filtered), reverse=True)
+        assert search_tags(session, TagFilters(status="lost")).total == 1
+        assert search_tags(session, TagFilters(alias_group="male_tree")).total == 120
+
+        # Triggers keep the index in step with updates and deletes.
+        tag = session.get(Tag, "E2000000000000000000A001")
+        tag.notes = "zlamana galaz"
+        session.commit()
+        assert _epcs(search_tags(session, TagFilters(q="galaz"))) == ["E2000000000000000000A001"]
+        session.delete(tag)
+        session.commit()
+        assert search_tags(session, TagFilters(q="galaz")).total == 0
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO tags_fts(tags_fts, rank) VALUES ('integrity-check', 1)"))
+
+        with pytest.raises(ValueError):
+            search_tags(session, TagFilters(sort="notes"))
+    finally:
+        session.close()
@@ -1,25 +1,34 @@
-import time
-import threading
 from ctypes import *
 
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 import serial.tools.list_ports
 
+from inventory import InventoryThread
+from tag_table import tags_payload
+
 DLL_NAME = "UHFPrimeReader.dll"
 DEFAULT_BAUD = 115200
 
 
 class Api:
+    # The DLL is loaded on first use, so the module imports without it.
     def __init__(self):
-        self.lib = cdll.LoadLibrary(DLL_NAME)
-        self.lib.OpenDevice.restype = c_int32
-        self.lib.CloseDevice.restype = c_int32
-        self.lib.GetDevicePara.restype = c_int32
-        self.lib.SetDevicePara.restype = c_int32
-        self.lib.GetTagUii.restype = c_int32
-        self.lib.InventoryContinue.restype = c_int32
-        self.lib.InventoryStop.restype = c_int32
+        self._lib = None
+
+    @property
+    def lib(self):
+        if self._lib is None:
+            lib = cdll.LoadLibrary(DLL_NAME)
+            lib.OpenDevice.restype = c_int32
+            lib.CloseDevice.restype = c_int32
+            lib.GetDevicePara.restype = c_int32
+            lib.SetDevicePara.restype = c_int32
+            lib.GetTagUii.restype = c_int32
+            lib.InventoryContinue.restype = c_int32
+            lib.InventoryStop.restype = c_int32
+            self._lib = lib
+        return self._lib
 
     def OpenDevice(self, hComm, port, baudrate):
         return self.lib.OpenDevice(byref(hComm), port, baudrate)
@@ -74,56 +83,6 @@ class DevicePara(Structure):
     _fields_ = DeviceFullInfo._fields_
 
 
-class TagInfo(Structure):
-    _fields_ = [
-        ("m_no", c_ushort),
-        ("m_rssi", c_short),
-        ("m_ant", c_ubyte),
-        ("m_channel", c_ubyte),
-        ("m_crc", c_ubyte * 2),
-        ("m_pc", c_ubyte * 2),
-        ("m_len", c_ubyte),
-        ("m_code", c_ubyte * 255),
-    ]
-
-
-def hex_array_to_string(array, length):
-    if length <= 0:
-        return ""
-    return " ".join(hex(array[i]).replace("0x", "").zfill(2) for i in range(length))
-
-
-class InventoryThread(threading.Thread):
-    def __init__(self, api, hcomm):
-        super().__init__(daemon=True)
-        self.api = api
-        self.hcomm = hcomm
-        self.info = {}
-        self._stop = threading.Event()
-
-    def stop(self):
-        self._stop.set()
-
-    def run(self):
-        while not self._stop.is_set():
-            tag = TagInfo()
-            res = self.api.GetTagUii(self.hcomm, tag, 1000)
-            if res != 0:
-                continue
-            length = tag.m_len
-            if length <= 0:
-                continue
-            epc = hex_array_to_string(list(tag.m_code), length)
-            self.info[epc] = {
-                "epc": epc,
-                "rssi": tag.m_rssi / 10,
-                "ant": tag.m_ant,
-                "channel": tag.m_channel,
-                "counts": self.info.get(epc, {}).get("counts", 0) + 1,
-                "ts": time.time(),
-            }
-
-
 app = Flask(__name__)
 CORS(app)
 api = Api()
@@ -184,11 +143,16 @@ def start_inventory():
 
 @app.post("/tags")
 def tags():
+    # {"since": seq} returns only tags read after the seq of a previous answer.
+    data = request.get_json(force=True, silent=True) or {}
     t = state.get("thread")
     if not t:
-        return jsonify({"ok": True, "tags": []})
-    tags_sorted = sorted(t.info.values(), key=lambda x: x["ts"], reverse=True)
-    return jsonify({"ok": True, "tags": tags_sorted})
+        return jsonify({"ok": True, "tags": [], "seq": 0, "reset": False})
+    # Served from the table's published snapshot; never blocks the inventory loop.
+    try:
+        return jsonify(tags_payload(t.info, data))
+    except ValueError as exc:
+        return jsonify({"ok": False, "error": str(exc)}), 400
 
 
 @app.post("/stop")
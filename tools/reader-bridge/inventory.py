@@ -0,0 +1,53 @@
+# The inventory loop, kept free of Flask and the DLL so tests can drive it
+# with a simulated reader.
+import threading
+from ctypes import Structure, c_short, c_ubyte, c_ushort
+
+from tag_table import TagTable
+
+# Tags not read for TAG_TTL_SEC, or beyond TAG_TABLE_SIZE, are dropped.
+TAG_TABLE_SIZE = 1000
+TAG_TTL_SEC = 300
+
+
+class TagInfo(Structure):
+    _fields_ = [
+        ("m_no", c_ushort),
+        ("m_rssi", c_short),
+        ("m_ant", c_ubyte),
+        ("m_channel", c_ubyte),
+        ("m_crc", c_ubyte * 2),
+        ("m_pc", c_ubyte * 2),
+        ("m_len", c_ubyte),
+        ("m_code", c_ubyte * 255),
+    ]
+
+
+def hex_array_to_string(array, length):
+    if length <= 0:
+        return ""
+    return " ".join(hex(array[i]).replace("0x", "").zfill(2) for i in range(length))
+
+
+class InventoryThread(threading.Thread):
+    def __init__(self, api, hcomm):
+        super().__init__(daemon=True)
+        self.api = api
+        self.hcomm = hcomm
+        self.info = TagTable(TAG_TABLE_SIZE, TAG_TTL_SEC)
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            tag = TagInfo()
+            res = self.api.GetTagUii(self.hcomm, tag, 1000)
+            if res != 0:
+                continue
+            length = tag.m_len
+            if length <= 0:
+                continue
+            epc = hex_array_to_string(list(tag.m_code), length)
+            self.info.update(epc, tag.m_rssi / 10, tag.m_ant, tag.m_channel)
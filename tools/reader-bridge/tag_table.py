@@ -0,0 +1,133 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class TagTable:
+    """
+    Tags seen by the inventory loop, kept in last-seen order.
+
+    Every read moves the EPC to the end and stamps it with the next sequence
+    number, so the table is ordered by seq: updates are O(1), entries idle for
+    longer than ttl_sec (or beyond max_size) fall off the front, and since(seq)
+    walks back from the end only as far as the tags that changed.
+
+    Only the inventory thread writes. Readers (Flask request threads) never
+    touch the live table: they read the last published snapshot, an immutable
+    (seq, tags newest first) tuple swapped in by reference. The writer
+    publishes at most every publish_sec; a reader that finds the snapshot
+    behind and older than that publishes it itself under the table lock.
+    """
+
+    def __init__(self, max_size=1000, ttl_sec=300.0, publish_sec=0.05):
+        self.max_size = max_size
+        self.ttl_sec = ttl_sec
+        self.publish_sec = publish_sec
+        self.seq = 0
+        self._tags = OrderedDict()
+        self._lock = threading.Lock()
+        self._snapshot = (0, ())
+        self._published_at = 0.0
+
+    def __len__(self):
+        return len(self._snapshot[1])
+
+    def update(self, epc, rssi, ant, channel, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            previous = self._tags.pop(epc, None)
+            self.seq += 1
+            # Entries are never modified once stored, so snapshots can share them.
+            self._tags[epc] = {
+                "epc": epc,
+                "rssi": rssi,
+                "ant": ant,
+                "channel": channel,
+                "counts": (previous["counts"] if previous else 0) + 1,
+                "first_ts": previous["first_ts"] if previous else now,
+                "ts": now,
+                "seq": self.seq,
+            }
+            self._expire(now)
+            if now - self._published_at >= self.publish_sec:
+                self._publish(now)
+
+    def _expire(self, now):
+        # Caller holds the lock.
+        while self._tags:
+            epc, oldest = next(iter(self._tags.items()))
+            if len(self._tags) <= self.max_size and now - oldest["ts"] <= self.ttl_sec:
+                break
+            del self._tags[epc]
+
+    def _publish(self, now):
+        # Caller holds the lock.
+        self._expire(now)
+        self._snapshot = (self.seq, tuple(reversed(self._tags.values())))
+        self._published_at = now
+
+    def snapshot(self, now=None):
+        """
+        (seq, tags newest first) as of the last publish; a consistent view
+        that the inventory loop never mutates.
+        """
+        now = time.time() if now is None else now
+        snapshot = self._snapshot
+        if snapshot[0] != self.seq and now - self._published_at >= self.publish_sec:
+            with self._lock:
+                if self._snapshot[0] != self.seq:
+                    self._publish(now)
+                snapshot = self._snapshot
+        return snapshot
+
+    def since(self, seq=0, ts=None, now=None):
+        """
+        (snapshot seq, tags updated after seq and after ts when given, newest
+        first). Pass the returned seq back to receive only later changes. A
+        seq beyond the table's own came from an earlier table (the inventory
+        was restarted) and gets the full snapshot.
+        """
+        now = time.time() if now is None else now
+        snapshot_seq, tags = self.snapshot(now)
+        if seq > snapshot_seq:
+            seq = 0
+        changed = []
+        for tag in tags:
+            if tag["seq"] <= seq or (ts is not None and tag["ts"] <= ts):
+                break
+            if now - tag["ts"] > self.ttl_sec:
+                break
+            changed.append(tag)
+        return snapshot_seq, changed
+
+
+def parse_since(data):
+    """
+    (since, since_ts) from a /tags request body. Raises ValueError when
+    since is not a non-negative integer or since_ts not a finite number.
+    """
+    since, since_ts = data.get("since"), data.get("since_ts")
+    try:
+        if isinstance(since, (bool, float)):
+            raise TypeError
+        since = int(since or 0)
+        if since_ts is not None:
+            if isinstance(since_ts, bool):
+                raise TypeError
+            since_ts = float(since_ts)
+    except (TypeError, ValueError):
+        raise ValueError("since must be an integer and since_ts a number")
+    if since < 0 or (since_ts is not None and not math.isfinite(since_ts)):
+        raise ValueError("since must be >= 0 and since_ts finite")
+    return since, since_ts
+
+
+def tags_payload(table, data, now=None):
+    """
+    The /tags answer for table. reset is true when since came from an
+    earlier table and the full snapshot is returned instead of a diff.
+    """
+    since, since_ts = parse_since(data)
+    seq, changed = table.since(since, since_ts, now)
+    return {"ok": True, "tags": changed, "seq": seq, "reset": since > seq}